@@ -64,7 +64,9 @@ def fixture_load_cfg():
     keys = ('file_root', 'config_dir', 'data_dir', 'custom_static_dir',
             'store_file', 'actions_dir', 'doc_dir', 'server_dir', 'host',
             'port', 'use_x_forwarded_for', 'use_x_forwarded_host',
-            'secure_proxy_ssl_header', 'box_name', 'develop')
+            'secure_proxy_ssl_header', 'box_name', 'sqlite_journal_mode',
+            'sqlite_synchronous', 'sqlite_cache_size', 'sqlite_mmap_size',
+            'sqlite_busy_timeout', 'develop')
     saved_state = {}
     for key in keys:
         saved_state[key] = getattr(cfg, key)
@@ -4,10 +4,16 @@
 MoinMoin wiki parser
 """
 
+import collections
+import hashlib
 import logging
+import os
 import re
+import subprocess
 import sys
+import time
 import urllib
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
 from pathlib import Path
 from xml.sax.saxutils import escape
@@ -29,6 +35,26 @@ WIKI_ICONS = {
     '{*}': 'star_on',
 }
 
+WHITESPACE_RE = re.compile(r'\s*')
+PLAIN_TEXT_END_RE = re.compile(r"''|`|{{|__|\[\[")
+WIKI_LINK_RE = re.compile(r'(?: |^)([A-Z][a-z0-9]+([A-Z][a-z0-9]+)+)(?: |$)')
+URL_RE = re.compile(r'(https?://[^<> ]+[^<> .:\(\)])')
+ESCAPED_WIKI_WORD_RE = re.compile(r'([^A-Za-z]|^)!')
+EMPTY_LINE_RE = re.compile(r'^\s+$')
+BLANK_LINE_RE = re.compile(r'^\s*$')
+TABLE_OF_CONTENTS_RE = re.compile(r'<<TableOfContents(?:\((\d*)\))?>>')
+HEADING_RE = re.compile(r'(=+) (.+) (=+)')
+HORIZONTAL_RULE_RE = re.compile(r'---(-+)')
+TABLE_STYLE_RE = re.compile(r'.*<tablestyle=(.*)>.*')
+LIST_ITEM_RE = re.compile(r'(\s+)(\*|\.|\d\.|I\.|A\.)\s+(.*)')
+SPACE_LIST_RE = re.compile(r'(\s+)')
+COMMENT_RE = re.compile(r'\/\* (.+) \*\/')
+ADMONITION_RE = re.compile(r'{{{#!wiki\s(.*)')
+CATEGORY_RE = re.compile(r'Category(\w+)')
+ANCHOR_RE = re.compile(r'<<Anchor\((.+)\)>>')
+INCLUDE_RE = re.compile(r'<<Include\((.+)\)>>')
+PARAGRAPH_BREAKERS = ('{{{', '##', '----', '||')
+
 
 class Element:
     """Represents an element of a MoinMoin wiki page."""
@@ -712,80 +738,99 @@ def resolve_url(url, context):
     return url
 
 
-def split_formatted(text, delimiter, end_delimiter=None):
+def find_formatted(line, position, delimiter, end_delimiter=None):
     """
-    Split formatted text marked by delimiter, if it is found at beginning.
+    Find formatted text marked by delimiter, if it is found at position.
     A distinct end delmiter can be specified, or it is same as delimiter.
-    Return (formatted_text, remaining_text) if it is found.
-    Return (None, text) otherwise.
+    Return (formatted_text, position_after_end_delimiter) if it is found.
+    Return (None, position) otherwise.
+
+    Without an end delimiter, the rest of the line except its last character
+    is taken as formatted text.
+
+    >>> find_formatted("a '''b''' c", 2, "'''")
+    ('b', 9)
+    >>> find_formatted("a '''b''' c", 0, "'''")
+    (None, 0)
+    >>> find_formatted('~-small', 0, '~-', '-~')
+    ('smal', 7)
     """
+    if not line.startswith(delimiter, position):
+        return (None, position)
+
     end_delimiter = end_delimiter or delimiter
-    content = None
-    if text.startswith(delimiter):
-        text = text[len(delimiter):]
-        end = text.find(end_delimiter)
-        content = text[:end]
-        text = text[end:][len(end_delimiter):]
+    start = position + len(delimiter)
+    end = line.find(end_delimiter, start)
+    if end < 0:
+        return (line[start:-1], len(line))
 
-    return (content, text)
+    return (line[start:end], end + len(end_delimiter))
 
 
 def parse_text(line, context=None, parse_links=True):
     """
     Parse a line of MoinMoin wiki text.
     Returns a list of objects representing text.
+
+    The line is scanned once from start to end. At each position, markup is
+    recognized by its start delimiter and anything up to the next delimiter
+    is plain text.
     """
     result = []
-    while line:
+    position = 0
+    while position < len(line):
         # Icons
-        for icon_text, icon_name in WIKI_ICONS.items():
-            if line.lstrip().startswith(icon_text):
-                target = f'{ICONS_DIR}/{WIKI_ICONS[line.strip()]}.png'
+        start = WHITESPACE_RE.match(line, position).end()
+        for icon_text in WIKI_ICONS:
+            if line.startswith(icon_text, start):
+                icon_name = WIKI_ICONS[line[position:].strip()]
+                target = f'{ICONS_DIR}/{icon_name}.png'
                 result.append(
                     EmbeddedAttachment(target, [PlainText(icon_text)],
                                        'height=26'))
-                line = line.lstrip().replace(icon_text, '', 1)
+                position = start + len(icon_text)
                 break
 
         # Smaller text
-        content, line = split_formatted(line, '~-', '-~')
+        content, position = find_formatted(line, position, '~-', '-~')
         if content:
             result.append(SmallerTextWarning())
-            line = content + line
+            line = content + line[position:]
+            position = 0
             # continue processing line
 
         # Bold text
-        content, line = split_formatted(line, "'''")
+        content, position = find_formatted(line, position, "'''")
         if content:
             result.append(BoldText(parse_text(content, context)))
             continue
 
         # Italic text
-        content, line = split_formatted(line, "''")
+        content, position = find_formatted(line, position, "''")
         if content:
             result.append(ItalicText(parse_text(content, context)))
             continue
 
         # Monospace text
-        content, line = split_formatted(line, '`')
+        content, position = find_formatted(line, position, '`')
         if content:
             result.append(MonospaceText(content))
             continue
 
         # Code text
-        content, line = split_formatted(line, '{{{', '}}}')
+        content, position = find_formatted(line, position, '{{{', '}}}')
         if content:
             result.append(CodeText(content))
             continue
 
         # Underline text
-        content, line = split_formatted(line, '__')
+        content, position = find_formatted(line, position, '__')
         if content:
             result.append(UnderlineText(content))
             continue
 
         # Links
-        content, line = split_formatted(line, '[[', ']]')
+        content, position = find_formatted(line, position, '[[', ']]')
         if content:
             target, _, remaining = content.partition('|')
             target = target.strip()
@@ -814,7 +859,7 @@ def parse_text(line, context=None, parse_links=True):
             continue
 
         # Embedded
-        content, line = split_formatted(line, '{{', '}}')
+        content, position = find_formatted(line, position, '{{', '}}')
         if content:
             target, _, remaining = content.partition('|')
             text = None
@@ -843,11 +888,13 @@ def parse_text(line, context=None, parse_links=True):
             result.append(link)
             continue
 
-        # Plain text and URLs
-        content = re.split(r"''|`|{{|__|\[\[", line)[0]
-        if content:
-            line = line.replace(content, '', 1)
-            result += parse_plain_text(content, parse_links=parse_links)
+        # Plain text and URLs, up to the next markup
+        match = PLAIN_TEXT_END_RE.search(line, position)
+        end = match.start() if match else len(line)
+        if end > position:
+            result += parse_plain_text(line[position:end],
+                                       parse_links=parse_links)
+            position = end
             continue
 
         break
@@ -859,9 +906,8 @@ def parse_plain_text(content, parse_links=True):
     """Parse a line or plain text and generate plain text and URL objects."""
     result = []
     while content:
-        wiki_link_match = re.search(
-            r'(?: |^)([A-Z][a-z0-9]+([A-Z][a-z0-9]+)+)(?: |$)', content)
-        link_match = re.search(r'(https?://[^<> ]+[^<> .:\(\)])', content)
+        wiki_link_match = WIKI_LINK_RE.search(content)
+        link_match = URL_RE.search(content)
         if parse_links and link_match and link_match.span(0)[0] == 0:
             link = link_match.group(1)
             result.append(Url(link))
@@ -882,7 +928,7 @@ def parse_plain_text(content, parse_links=True):
             text = content[:end]
 
             # Replace occurrences of !WikiText with WikiText
-            text = re.sub(r'([^A-Za-z]|^)!', r'\g<1>', text)
+            text = ESCAPED_WIKI_WORD_RE.sub(r'\g<1>', text)
 
             result.append(PlainText(text))
 
@@ -947,7 +993,7 @@ def parse_list(list_data, context=None):
             break
 
         else:
-            content = list_data.pop(0)[2]
+            content = list_data.popleft()[2]
             new_content = ''
             in_code_block = False
             for line in content.splitlines(True):
@@ -978,11 +1024,11 @@ def parse_multiline_codetext(starting_line, pending_lines):
                 + Returns the parsed CodeText and the remaining lines.
     """
     if starting_line.strip().startswith('{{{') and '}}}' not in starting_line:
-        is_admonition = re.match(r'{{{#!wiki\s(.*)', starting_line)
+        is_admonition = ADMONITION_RE.match(starting_line)
         if not is_admonition:
             texts = []
             while pending_lines:
-                line = pending_lines.pop(0)
+                line = pending_lines.popleft()
                 if line.strip().startswith('}}}'):
                     break
                 else:
@@ -1001,11 +1047,11 @@ def parse_multiline_wiki_admonition(starting_line, pending_lines, context):
                 + Returns the parsed admonition and the remaining lines.
     """
     if starting_line.strip().startswith('{{{') and '}}}' not in starting_line:
-        admonition = re.match(r'{{{#!wiki\s(.*)', starting_line)
+        admonition = ADMONITION_RE.match(starting_line)
         if admonition:
             lines = []
             while pending_lines:
-                line = pending_lines.pop(0)
+                line = pending_lines.popleft()
                 if line == '}}}':
                     break
 
@@ -1431,52 +1477,54 @@ PlainText(' dialog. ')])])])]
 
     """
     elements = []
-    lines = text.split('\n')
+    lines = collections.deque(text.split('\n'))
 
     # Skip lines before begin_marker, if given.
     if begin_marker:
         removed_lines = []
         while lines:
-            line = lines.pop(0)
+            line = lines.popleft()
             removed_lines.append(line)
             if line.startswith(begin_marker):
                 break
 
         if not lines:  # No begin marker found
-            lines = removed_lines
+            lines = collections.deque(removed_lines)
 
     while lines:
-        line = lines.pop(0)
+        line = lines.popleft()
+        stripped_line = line.strip()
         # Empty line
-        match = re.match(r'^\s+$', line)
+        match = EMPTY_LINE_RE.match(line)
         if match:
             continue
 
         # End of included file
-        if end_marker and line.strip().startswith(end_marker):
+        if end_marker and stripped_line.startswith(end_marker):
             break  # end parsing
 
         # Handle macros when file is not included.
-        if line.strip().startswith('## BEGIN_INCLUDE'):
+        if stripped_line.startswith('## BEGIN_INCLUDE'):
             elements.append(BeginInclude())
             continue
 
-        if line.strip().startswith('## END_INCLUDE'):
+        if stripped_line.startswith('## END_INCLUDE'):
             elements.append(EndInclude())
             continue
 
         # Comment, not rendered
-        if line.strip().startswith('##'):
+        if stripped_line.startswith('##'):
             continue
 
         # Processing instructions, not rendered
-        if line.strip() and \
-           line.strip().split()[0] in ('#format', '#redirect', '#refresh',
-                                       '#pragma', '#deprecated', '#language'):
+        if stripped_line and \
+           stripped_line.split()[0] in ('#format', '#redirect', '#refresh',
+                                        '#pragma', '#deprecated',
+                                        '#language'):
             continue
 
         # Table of Contents
-        match = re.match(r'<<TableOfContents(?:\((\d*)\))?>>', line)
+        match = TABLE_OF_CONTENTS_RE.match(line)
         if match:
             level = match.group(1)
             if level:
@@ -1486,7 +1534,7 @@ PlainText(' dialog. ')])])])]
             continue
 
         # Heading
-        match = re.match(r'(=+) (.+) (=+)', line)
+        match = HEADING_RE.match(line)
         if match:
             level = len(match.group(1))
             content = match.group(2)
@@ -1494,43 +1542,41 @@ PlainText(' dialog. ')])])])]
             continue
 
         # Horizontal rule
-        match = re.match(r'---(-+)', line)
+        match = HORIZONTAL_RULE_RE.match(line)
         if match:
             dashes = len(match.group(1)) + 3
             elements.append(HorizontalRule(dashes))
             continue
 
         # Table
-        if line.strip().startswith('||'):
+        if stripped_line.startswith('||'):
             rows = []
             style = None
-            match = re.match(r'.*<tablestyle=(.*)>.*', line)
+            match = TABLE_STYLE_RE.match(line)
             if match:
                 style = match.group(1).strip('\'"')
 
             rows.append(parse_table_row(line, context))
             while lines and lines[0].strip().startswith('||'):
-                line = lines.pop(0)
+                line = lines.popleft()
                 rows.append(parse_table_row(line, context))
 
             elements.append(Table(rows, style))
             continue
 
         # List
-        list_item_re = re.compile(r'(\s+)(\*|\.|\d\.|I\.|A\.)\s+(.*)')
-        space_list_re = re.compile(r'(\s+)')
-        match = list_item_re.match(line) or space_list_re.match(line)
-        if match or re.match(r'\s+', line):
+        match = LIST_ITEM_RE.match(line) or SPACE_LIST_RE.match(line)
+        if match:
             # Collect lines until end of List is reached.
             list_lines = []
             next_list_item = line
             top_indent = len(match.group(1))
 
-            if line.strip().startswith('{{{') and '}}}' not in line:
+            if stripped_line.startswith('{{{') and '}}}' not in line:
                 # Multi-line code text or admonition may not have expected
                 # indentation
                 while lines:
-                    line = lines.pop(0)
+                    line = lines.popleft()
                     if line.strip() == '}}}':
                         next_list_item += '\n}}}'
                         break
@@ -1539,9 +1585,9 @@ PlainText(' dialog. ')])])])]
 
             while lines:
                 candidate = lines[0]
-                if re.match(r'^\s*$', candidate):
+                if BLANK_LINE_RE.match(candidate):
                     # Eat up empty lines
-                    lines.pop(0)
+                    lines.popleft()
                     next_list_item += '\n'
                     continue
 
@@ -1549,11 +1595,11 @@ PlainText(' dialog. ')])])])]
                     # Not part of list
                     break
 
-                match = list_item_re.match(candidate)
+                match = LIST_ITEM_RE.match(candidate)
                 if match:
                     # New item in list
                     list_lines.append(next_list_item)
-                    next_list_item = lines.pop(0)
+                    next_list_item = lines.popleft()
                 else:
                     # More content in same list item
                     if candidate.strip().startswith('{{{') \
@@ -1561,7 +1607,7 @@ PlainText(' dialog. ')])])])]
                         # Multi-line code text or admonition may not
                         # have expected indentation
                         while lines:
-                            line = lines.pop(0)
+                            line = lines.popleft()
                             if line.strip() == '}}}':
                                 next_list_item += '\n}}}'
                                 break
@@ -1570,9 +1616,9 @@ PlainText(' dialog. ')])])])]
                     elif (candidate.strip().startswith('{{')
                           and next_list_item[-1] != '\n'):
                         # Add line break before inline image
-                        next_list_item += ' <<BR>>\n' + lines.pop(0)
+                        next_list_item += ' <<BR>>\n' + lines.popleft()
                     else:
-                        next_list_item += '\n' + lines.pop(0)
+                        next_list_item += '\n' + lines.popleft()
 
             # finish list
             list_lines.append(next_list_item)
@@ -1580,7 +1626,7 @@ PlainText(' dialog. ')])])])]
             # Parse List info for each line.
             list_data = []
             for line in list_lines:
-                match = list_item_re.match(line)
+                match = LIST_ITEM_RE.match(line)
                 if match:
                     indent = len(match.group(1))
                     marker = match.group(2)
@@ -1593,19 +1639,19 @@ PlainText(' dialog. ')])])])]
 
                     content = ' ' * indent + line.lstrip(match.group(2) + ' ')
                 else:
-                    match = space_list_re.match(line)
+                    match = SPACE_LIST_RE.match(line)
                     indent = len(match.group(1))
                     list_type = ListType.SPACED
                     content = line
 
                 list_data.append((list_type, indent, content))
 
-            new_list, _ = parse_list(list_data, context)
+            new_list, _ = parse_list(collections.deque(list_data), context)
             elements.append(new_list)
             continue
 
         # Comment
-        match = re.match(r'\/\* (.+) \*\/', line)
+        match = COMMENT_RE.match(line)
         if match:
             content = match.group(1)
             content = parse_plain_text(content)
@@ -1625,21 +1671,21 @@ PlainText(' dialog. ')])])])]
             continue
 
         # Category
-        match = re.match(r'Category(\w+)', line)
+        match = CATEGORY_RE.match(line)
         if match:
             content = match.group(1)
             elements.append(Category(content))
             continue
 
         # Anchor
-        match = re.match(r'<<Anchor\((.+)\)>>', line)
+        match = ANCHOR_RE.match(line)
         if match:
             content = match.group(1)
             elements.append(Paragraph([Anchor(content)]))
             continue
 
         # Include
-        match = re.match(r'<<Include\((.+)\)>>', line)
+        match = INCLUDE_RE.match(line)
         if match:
             contents = match.group(1).split(',')
             page = contents.pop(0)
@@ -1670,17 +1716,13 @@ PlainText(' dialog. ')])])])]
                         break
 
                     # If any of the syntax that ends a paragraph
-                    paragraph_breakers = ['{{{', '##', '----', '||']
-                    if any([
-                            True for breaker in paragraph_breakers
-                            if lines[0].strip().startswith(breaker)
-                    ]):
+                    if lines[0].strip().startswith(PARAGRAPH_BREAKERS):
                         break
 
-                    if re.match(r'\s+(\*|\.|\d\.|I\.|A\.)\s+.*', lines[0]):
+                    if LIST_ITEM_RE.match(lines[0]):
                         break
 
-                    line = lines.pop(0)
+                    line = lines.popleft()
                     space_line = line.rstrip(br) if br in line else line + ' '
                     texts.extend(parse_text(space_line, context))
 
@@ -2041,6 +2083,119 @@ def generate_docbook(parsed_wiki, context=None):
     return doc_out
 
 
+def get_output_path(in_file):
+    """Return the path of the Docbook file generated from a wiki file."""
+    name = in_file.name
+    if name.endswith('.raw.wiki'):
+        name = name[:-len('.raw.wiki')]
+
+    return in_file.with_name(name + '.xml')
+
+
+def _get_cache_key(wiki_text, context, begin_marker, end_marker):
+    """Return a key identifying the Docbook output for the given input.
+
+    The parser's own source is part of the key so that changes to the parser
+    invalidate all results.
+
+    """
+    digest = hashlib.sha256()
+    digest.update(Path(__file__).read_bytes())
+    for value in (context['name'], context['language'], context['title'],
+                  begin_marker, end_marker, wiki_text):
+        digest.update(str(value).encode() + b'\0')
+
+    return digest.hexdigest()
+
+
+def _read_cache(cache_dir, key):
+    """Return the cached Docbook for a key or None."""
+    try:
+        return (cache_dir / key).read_text()
+    except OSError:
+        return None
+
+
+def _write_cache(cache_dir, key, doc_out):
+    """Store the Docbook for a key."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    temp_path = cache_dir / f'{key}.{os.getpid()}.tmp'
+    temp_path.write_text(doc_out)
+    temp_path.replace(cache_dir / key)
+
+
+def format_docbook(doc_out):
+    """Format Docbook output the same way as xmllint --format."""
+    process = subprocess.run(['xmllint', '--format', '-'], input=doc_out,
+                             stdout=subprocess.PIPE, check=True, text=True)
+    return process.stdout
+
+
+def convert_file(in_file, begin_marker=None, end_marker=None, cache_dir=None):
+    """Convert a wiki file into a formatted Docbook file next to it.
+
+    Docbook output is cached by content hash in cache_dir, if given. The
+    output file is only written if its content changes. Return whether the
+    page had to be parsed.
+
+    """
+    wiki_text = in_file.read_text()
+    context = get_context(in_file)
+    key = _get_cache_key(wiki_text, context, begin_marker, end_marker)
+    doc_out = _read_cache(cache_dir, key) if cache_dir else None
+    parsed = doc_out is None
+    if parsed:
+        parsed_wiki = parse_wiki(wiki_text, context, begin_marker=begin_marker,
+                                 end_marker=end_marker)
+        doc_out = format_docbook(generate_docbook(parsed_wiki, context))
+        if cache_dir:
+            _write_cache(cache_dir, key, doc_out)
+
+    out_file = get_output_path(in_file)
+    if not out_file.exists() or out_file.read_text() != doc_out:
+        out_file.write_text(doc_out)
+
+    return parsed
+
+
+def convert_files(in_files, begin_marker=None, end_marker=None,
+                  cache_dir=None, jobs=None):
+    """Convert many wiki files using a pool of processes.
+
+    Return the number of pages that had to be parsed.
+
+    """
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(convert_file, in_file, begin_marker, end_marker,
+                            cache_dir) for in_file in in_files
+        ]
+        return sum(future.result() for future in futures)
+
+
+def benchmark(in_files, begin_marker=None, end_marker=None, rounds=3):
+    """Print the time taken to parse and generate the given pages."""
+    pages = []
+    for in_file in in_files:
+        pages.append((in_file.read_text(), get_context(in_file)))
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for wiki_text, context in pages:
+            parsed_wiki = parse_wiki(wiki_text, context,
+                                     begin_marker=begin_marker,
+                                     end_marker=end_marker)
+            generate_docbook(parsed_wiki, context)
+
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    print(f'{len(pages)} pages, best of {rounds}: {best:.3f}s '
+          f'({best / max(len(pages), 1) * 1000:.1f}ms per page)')
+    return best
+
+
 if __name__ == '__main__':
     import argparse
     import doctest
@@ -2055,6 +2210,22 @@ if __name__ == '__main__':
                         help='Start parsing at this line')
     parser.add_argument('--end-marker', default='## END_INCLUDE',
                         help='Stop parsing at this line')
+    parser.add_argument(
+        '--batch', action='store_true',
+        help='Write formatted Docbook of each input file into a .xml file '
+        'next to it, using multiple processes')
+    parser.add_argument('--jobs', type=int,
+                        help='Number of processes in batch mode (default: '
+                        'number of CPUs)')
+    parser.add_argument('--cache-dir', type=Path,
+                        help='Reuse Docbook output of unchanged pages from '
+                        'this directory in batch mode')
+    parser.add_argument(
+        '--benchmark', action='store_true',
+        help='Print time taken to parse input files instead of converting')
+    parser.add_argument('--max-time', type=float,
+                        help='Fail the benchmark if parsing all input files '
+                        'takes longer than this many seconds')
     parser.add_argument('input', type=Path, nargs='*',
                         help='input file path(s)')
     arguments = parser.parse_args()
@@ -2066,6 +2237,24 @@ if __name__ == '__main__':
         if num_failed > 0:
             sys.exit(1)
 
+    if arguments.benchmark:
+        time_taken = benchmark(arguments.input, arguments.begin_marker,
+                               arguments.end_marker)
+        if arguments.max_time and time_taken > arguments.max_time:
+            print(f'Parsing took longer than {arguments.max_time}s',
+                  file=sys.stderr)
+            sys.exit(1)
+
+        sys.exit(0)
+
+    if arguments.batch:
+        num_parsed = convert_files(arguments.input, arguments.begin_marker,
+                                   arguments.end_marker, arguments.cache_dir,
+                                   arguments.jobs)
+        print(f'Parsed {num_parsed} of {len(arguments.input)} pages',
+              file=sys.stderr)
+        sys.exit(0)
+
     for in_file in arguments.input:
         with in_file.open() as wiki_file:
             wiki_text = wiki_file.read()
@@ -7,8 +7,8 @@ import sys
 
 from . import __version__
 from . import app as app_module
-from . import (cfg, frontpage, glib, log, menu, module_loader, setup, utils,
-               web_framework, web_server)
+from . import (cfg, frontpage, glib, log, menu, module_loader, profiler, setup,
+               utils, web_framework, web_server)
 
 if utils.is_axes_old():
     import axes
@@ -40,12 +40,19 @@ def parse_arguments():
                         help='list package dependencies for essential modules')
     parser.add_argument('--list-apps', default=False, nargs='*',
                         help='list apps')
+    parser.add_argument(
+        '--profile-startup', action='store_true', default=False,
+        help='log time taken by each phase of startup and the slowest apps')
+    parser.add_argument(
+        '--profile-startup-output', default=None, metavar='FILE',
+        help='write cProfile statistics of startup to this file')
 
     return parser.parse_args()
 
 
 def run_setup_and_exit(app_ids, allow_install=True):
     """Run setup on all essential apps and exit."""
+    app_module.wait_for_apps_post_init()
     error_code = 0
     try:
         setup.run_setup_on_apps(app_ids, allow_install)
@@ -124,22 +131,40 @@ def main():
 
     log.init()
 
-    web_framework.init()
-    web_framework.post_init()
+    if arguments.profile_startup:
+        profiler.count_subprocesses()
+
+    if arguments.profile_startup_output:
+        profiler.start_profiling()
+
+    with profiler.measure('web_framework.init'):
+        web_framework.init()
+
+    with profiler.measure('web_framework.post_init'):
+        web_framework.post_init()
 
     logger.info('FreedomBox Service (Plinth) version - %s', __version__)
     for config_file in cfg.config_files:
         logger.info('Configuration loaded from file - %s', config_file)
     logger.info('Script prefix - %s', cfg.server_dir)
 
-    module_loader.include_urls()
+    with profiler.measure('module_loader.include_urls'):
+        module_loader.include_urls()
 
-    menu.init()
+    with profiler.measure('menu.init'):
+        menu.init()
 
-    module_loader.load_modules()
-    app_module.apps_init()
-    app_module.apps_post_init()
-    frontpage.add_custom_shortcuts()
+    with profiler.measure('module_loader.load_modules'):
+        module_loader.load_modules()
+
+    with profiler.measure('app.apps_init'):
+        app_module.apps_init()
+
+    with profiler.measure('app.apps_post_init'):
+        app_module.apps_post_init()
+
+    with profiler.measure('frontpage.add_custom_shortcuts'):
+        frontpage.add_custom_shortcuts()
 
     if arguments.setup is not False:
         run_setup_and_exit(arguments.setup, allow_install=True)
@@ -149,9 +174,18 @@ def main():
 
     setup.run_setup_in_background()
 
-    glib.run()
+    with profiler.measure('glib.run'):
+        glib.run()
+
+    with profiler.measure('web_server.init'):
+        web_server.init()
+
+    if arguments.profile_startup_output:
+        profiler.stop_profiling(arguments.profile_startup_output)
+
+    if arguments.profile_startup:
+        profiler.log_results()
 
-    web_server.init()
     web_server.run(on_web_server_stop)
 
 
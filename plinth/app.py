@@ -4,17 +4,25 @@ Base class for all Freedombox applications.
 """
 
 import collections
+import concurrent.futures
 import enum
 import inspect
 import logging
+import threading
+import time
 
-from plinth import cfg
+from plinth import cfg, profiler
 from plinth.signals import post_app_loading
 
 from . import clients as clients_module
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of apps running post initialization at the same time
+MAX_POST_INIT_WORKERS = 8
+
+_post_init_completed = threading.Event()
+
 
 class App:
     """Implement common functionality for an app.
@@ -502,7 +510,8 @@ def apps_init():
     """Create apps by constructing them with components."""
     from . import module_loader  # noqa  # Avoid circular import
     for module_name, module in module_loader.loaded_modules.items():
-        _initialize_module(module_name, module)
+        with profiler.measure('app.apps_init', module_name):
+            _initialize_module(module_name, module)
 
     _sort_apps()
 
@@ -573,8 +582,99 @@ def _initialize_module(module_name, module):
 
 
 def apps_post_init():
-    """Run post initialization on each app."""
-    for app in App.list():
+    """Run post initialization on each app.
+
+    Apps are post initialized in parallel on a pool of threads. An app is only
+    post initialized after all the apps it depends on. Return when essential
+    apps, and the apps they depend on, are done. Remaining apps continue in
+    the background.
+
+    """
+    apps = {app.app_id: app for app in App.list()}
+    dependencies = {
+        app_id: {
+            dependency
+            for dependency in app.info.depends if dependency in apps
+        }
+        for app_id, app in apps.items()
+    }
+    dependents = collections.defaultdict(list)
+    for app_id, app_dependencies in dependencies.items():
+        for dependency in app_dependencies:
+            dependents[dependency].append(app_id)
+
+    essential_apps = set()
+    pending = [app_id for app_id, app in apps.items() if app.info.is_essential]
+    while pending:
+        app_id = pending.pop()
+        if app_id not in essential_apps:
+            essential_apps.add(app_id)
+            pending += dependencies[app_id]
+
+    remaining_apps = set(apps)
+    lock = threading.Lock()
+    essential_apps_completed = threading.Event()
+    errors = []
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=MAX_POST_INIT_WORKERS, thread_name_prefix='post-init')
+
+    def _on_completed():
+        """Finish after all apps are post initialized."""
+        executor.shutdown(wait=False)
+        logger.debug('App initialization completed.')
+        post_app_loading.send_robust(sender="app")
+        stop_measuring()
+        _post_init_completed.set()
+
+    def _run(app_id):
+        """Post initialize an app and then the apps waiting for it."""
+        try:
+            _post_init_app(apps[app_id])
+        except Exception as exception:
+            errors.append(exception)
+
+        ready_apps = []
+        with lock:
+            remaining_apps.discard(app_id)
+            for dependent in dependents[app_id]:
+                dependencies[dependent].discard(app_id)
+                if not dependencies[dependent]:
+                    ready_apps.append(dependent)
+
+            if not remaining_apps & essential_apps:
+                essential_apps_completed.set()
+
+            is_completed = not remaining_apps
+
+        for ready_app_id in ready_apps:
+            executor.submit(_run, ready_app_id)
+
+        if is_completed:
+            _on_completed()
+
+    # Returning early only waits for essential apps, measure until all done
+    stop_measuring = profiler.start_measuring('app.apps_post_init (all apps)')
+    _post_init_completed.clear()
+    if not essential_apps:
+        essential_apps_completed.set()
+
+    if not apps:
+        _on_completed()
+
+    # Apps are already sorted with essential apps first
+    for app_id, app_dependencies in dependencies.items():
+        if not app_dependencies:
+            executor.submit(_run, app_id)
+
+    essential_apps_completed.wait()
+    if errors and cfg.develop:
+        raise errors[0]
+
+
+def _post_init_app(app):
+    """Run post initialization of an app and enable it if needed."""
+    start_time = time.monotonic()
+    with profiler.measure('app.apps_post_init', app.app_id):
         try:
             app.post_init()
             if not app.needs_setup() and app.is_enabled():
@@ -582,8 +682,16 @@ def apps_post_init():
         except Exception as exception:
             logger.exception('Exception while running post init for %s: %s',
                              app.app_id, exception)
-            if cfg.develop:
-                raise
+            raise
+
+    logger.debug('Post initialized app %s in %.3f seconds', app.app_id,
+                 time.monotonic() - start_time)
+
 
-    logger.debug('App initialization completed.')
-    post_app_loading.send_robust(sender="app")
+def wait_for_apps_post_init(timeout=None):
+    """Wait until all apps are post initialized.
+
+    Return whether post initialization completed before timeout.
+
+    """
+    return _post_init_completed.wait(timeout)
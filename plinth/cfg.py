@@ -44,6 +44,17 @@ secure_proxy_ssl_header = 'HTTP_X_FORWARDED_PROTO'
 # [Misc] section
 box_name = 'FreedomBox'
 
+# [Database] section
+# Tuning of the SQLite database in store_file. See
+# https://www.sqlite.org/pragma.html for the meaning of these values. A
+# negative cache size is in KiB and a positive one is in pages. Memory mapped
+# I/O is disabled when mmap size is 0. Busy timeout is in seconds.
+sqlite_journal_mode = 'WAL'
+sqlite_synchronous = 'NORMAL'
+sqlite_cache_size = -2000
+sqlite_mmap_size = 0
+sqlite_busy_timeout = 30
+
 # Other globals
 develop = False
 
@@ -124,6 +135,11 @@ def read_file(config_path):
         ('Network', 'use_x_forwarded_for', 'bool'),
         ('Network', 'use_x_forwarded_host', 'bool'),
         ('Misc', 'box_name', 'string'),
+        ('Database', 'sqlite_journal_mode', 'string'),
+        ('Database', 'sqlite_synchronous', 'string'),
+        ('Database', 'sqlite_cache_size', 'int'),
+        ('Database', 'sqlite_mmap_size', 'int'),
+        ('Database', 'sqlite_busy_timeout', 'int'),
     )
 
     for section, name, datatype in config_items:
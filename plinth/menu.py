@@ -1,6 +1,9 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 
-from django.urls import reverse_lazy
+import collections
+
+from django.urls import get_script_prefix, reverse_lazy
+from django.utils import translation
 
 from plinth import app
 
@@ -10,6 +13,16 @@ class Menu(app.FollowerComponent):
 
     _all_menus = set()
 
+    # Children of each menu, indexed by the url_name of the parent
+    _children = collections.defaultdict(list)
+
+    # Sorted children of each menu, indexed by parent url_name and language
+    _sorted_children = collections.defaultdict(dict)
+
+    # Prefix trees of URLs of children of each menu, indexed by parent
+    # url_name and script prefix
+    _url_tries = collections.defaultdict(dict)
+
     def __init__(self, component_id, name=None, short_description=None,
                  icon=None, url_name=None, url_args=None, url_kwargs=None,
                  parent_url_name=None, order=50, advanced=False):
@@ -51,6 +64,7 @@ class Menu(app.FollowerComponent):
 
         url = reverse_lazy(url_name, args=url_args, kwargs=url_kwargs)
 
+        self.parent_url_name = parent_url_name
         self.name = name
         self.short_description = short_description
         self.icon = icon
@@ -61,30 +75,100 @@ class Menu(app.FollowerComponent):
         self.url_name = url_name
         self.url_args = url_args
         self.url_kwargs = url_kwargs
-        self.parent_url_name = parent_url_name
 
         # Add self to global list of menu items.
         self._all_menus.add(self)
+        self._children[parent_url_name].append(self)
+        self._clear_caches(parent_url_name)
+
+    @property
+    def name(self):
+        """Return the label of the menu item."""
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        """Set the label of the menu item and resort the menu."""
+        self._name = value
+        self._clear_caches(self.parent_url_name, urls=False)
+
+    @property
+    def order(self):
+        """Return the numerical rank of the item within the menu."""
+        return self._order
+
+    @order.setter
+    def order(self, value):
+        """Set the numerical rank of the item and resort the menu."""
+        self._order = value
+        self._clear_caches(self.parent_url_name, urls=False)
+
+    @classmethod
+    def _clear_caches(cls, parent_url_name, urls=True):
+        """Forget the sorted children and URLs of a menu."""
+        cls._sorted_children.pop(parent_url_name, None)
+        if urls:
+            cls._url_tries.pop(parent_url_name, None)
+
+    def remove(self):
+        """Remove the menu item from the global list of menu items."""
+        self._all_menus.discard(self)
+        if self in self._children[self.parent_url_name]:
+            self._children[self.parent_url_name].remove(self)
+
+        self._clear_caches(self.parent_url_name)
 
     @property
     def items(self):
         """Return the list of children for this menu item."""
-        return [
-            item for item in self._all_menus
-            if item.parent_url_name == self.url_name
-        ]
+        return list(self._children.get(self.url_name, []))
 
     def sorted_items(self):
         """Return menu items in sorted order according to current locale."""
-        return sorted(self.items, key=lambda x: (x.order, x.name.lower()))
+        sorted_children = self._sorted_children[self.url_name]
+        language = translation.get_language()
+        items = sorted_children.get(language)
+        if items is None:
+            items = sorted(self.items, key=lambda x: (x.order, x.name.lower()))
+            sorted_children[language] = items
+
+        return list(items)
+
+    def _get_url_trie(self):
+        """Return a prefix tree of the URLs of children of this menu.
+
+        Each node is a dictionary mapping a character to the next node. The
+        None key of a node holds the item whose URL ends at that node.
+
+        """
+        url_tries = self._url_tries[self.url_name]
+        script_prefix = get_script_prefix()
+        trie = url_tries.get(script_prefix)
+        if trie is None:
+            trie = {}
+            for item in self.items:
+                node = trie
+                for character in str(item.url):
+                    node = node.setdefault(character, {})
+
+                node.setdefault(None, item)
+
+            url_tries[script_prefix] = trie
+
+        return trie
 
     def active_item(self, request):
-        """Return the first active item (e.g. submenu) that is found."""
-        for item in self.items:
-            if request.path.startswith(str(item.url)):
-                return item
+        """Return the item (e.g. submenu) with the longest URL matching."""
+        node = self._get_url_trie()
+        active_item = node.get(None)
+        for character in request.path:
+            node = node.get(character)
+            if node is None:
+                break
+
+            active_item = node.get(None, active_item)
 
-        return None
+        return active_item
 
 
 main_menu = None
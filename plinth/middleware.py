@@ -16,7 +16,7 @@ from stronghold.utils import is_view_func_public
 
 from plinth import app as app_module
 from plinth import setup
-from plinth.utils import is_user_admin
+from plinth.utils import get_user_groups, is_user_admin, reverse_cached
 
 from . import operation as operation_module
 from . import views
@@ -34,6 +34,29 @@ def _collect_operations_results(request, app):
             messages.success(request, operation.message)
 
 
+def _get_app(request):
+    """Return the app that the requested URL belongs to, if any.
+
+    Django resolves the URL before calling process_view() of the middleware.
+    Reuse that resolution and remember the app in the request.
+    """
+    if hasattr(request, 'app'):
+        return request.app
+
+    request.app = None
+    resolver_match = request.resolver_match
+    if not resolver_match:
+        try:
+            resolver_match = urls.resolve(request.path_info)
+        except urls.Resolver404:
+            return None
+
+    if resolver_match.namespaces:
+        request.app = app_module.App.get(resolver_match.namespaces[0])
+
+    return request.app
+
+
 class SetupMiddleware(MiddlewareMixin):
     """Django middleware to show pre-setup message and setup progress."""
 
@@ -42,32 +65,22 @@ class SetupMiddleware(MiddlewareMixin):
         """Handle a request as Django middleware request handler."""
         # Don't interfere with login page
         user_requests_login = request.path.startswith(
-            urls.reverse(settings.LOGIN_URL))
+            reverse_cached(settings.LOGIN_URL))
         if user_requests_login:
             return
 
-        # Perform a URL resolution. This is slightly inefficient as
-        # Django will do this resolution again.
-        try:
-            resolver_match = urls.resolve(request.path_info)
-        except urls.Resolver404:
-            return
-
-        if not resolver_match.namespaces or not len(resolver_match.namespaces):
+        app = _get_app(request)
+        if not app:
             # Requested URL does not belong to any application
             return
 
-        app_id = resolver_match.namespaces[0]
-        app = app_module.App.get(app_id)
-
         is_admin = is_user_admin(request)
         # Collect and show operations' results to admins
         if is_admin:
             _collect_operations_results(request, app)
 
         # Check if application is up-to-date
-        if app.get_setup_state() == \
-           app_module.App.SetupState.UP_TO_DATE:
+        if app.get_setup_state() == app_module.App.SetupState.UP_TO_DATE:
             return
 
         if not is_admin:
@@ -75,7 +88,7 @@ class SetupMiddleware(MiddlewareMixin):
 
         # Only allow logged-in users to access any setup page
         view = login_required(views.SetupView.as_view())
-        return view(request, app_id=app_id)
+        return view(request, app_id=app.app_id)
 
 
 class AdminRequiredMiddleware(MiddlewareMixin):
@@ -84,8 +97,7 @@ class AdminRequiredMiddleware(MiddlewareMixin):
     @staticmethod
     def check_user_group(view_func, request):
         if hasattr(view_func, 'GROUP_NAME'):
-            return request.user.groups.filter(
-                name=getattr(view_func, 'GROUP_NAME')).exists()
+            return view_func.GROUP_NAME in get_user_groups(request)
 
     @staticmethod
     def process_view(request, view_func, view_args, view_kwargs):
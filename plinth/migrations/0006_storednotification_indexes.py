@@ -0,0 +1,26 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Django migration for adding indexes to the notification model.
+"""
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plinth', '0005_storednotification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='storednotification',
+            index=models.Index(fields=['dismissed', 'last_update_time'],
+                               name='notification_dismissed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storednotification',
+            index=models.Index(fields=['app_id', 'dismissed'],
+                               name='notification_app_id_idx'),
+        ),
+    ]
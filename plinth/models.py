@@ -87,3 +87,14 @@ class StoredNotification(models.Model):
     user = models.CharField(max_length=128, null=True, default=None)
     group = models.CharField(max_length=128, null=True, default=None)
     dismissed = models.BooleanField(default=False)
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """Meta properties of the stored notification model."""
+        indexes = [
+            # Listing notifications to show and purging dismissed ones
+            models.Index(fields=['dismissed', 'last_update_time'],
+                         name='notification_dismissed_idx'),
+            # Listing notifications of an app
+            models.Index(fields=['app_id', 'dismissed'],
+                         name='notification_app_id_idx'),
+        ]
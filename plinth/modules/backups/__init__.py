@@ -3,11 +3,14 @@
 FreedomBox app to manage backup archives.
 """
 
+import concurrent.futures
+import contextlib
 import json
 import logging
 import os
 import pathlib
 import re
+import time
 
 import paramiko
 from django.utils.text import get_valid_filename
@@ -30,6 +33,8 @@ _description = [
 MANIFESTS_FOLDER = '/var/lib/plinth/backups-manifests/'
 # session variable name that stores when a backup file should be deleted
 SESSION_PATH_VARIABLE = 'fbx-backups-upload-path'
+# session variable name that stores name and size of a chunked upload
+SESSION_UPLOAD_VARIABLE = 'fbx-backups-upload-info'
 
 
 class BackupsApp(app_module.App):
@@ -37,7 +42,7 @@ class BackupsApp(app_module.App):
 
     app_id = 'backups'
 
-    _version = 3
+    _version = 4
 
     def __init__(self):
         """Create components for the app."""
@@ -54,7 +59,8 @@ class BackupsApp(app_module.App):
                               'backups:index', parent_url_name='system')
         self.add(menu_item)
 
-        packages = Packages('packages-backups', ['borgbackup', 'sshfs'])
+        packages = Packages('packages-backups',
+                            ['borgbackup', 'sshfs', 'zstd'])
         self.add(packages)
 
     @staticmethod
@@ -65,6 +71,15 @@ class BackupsApp(app_module.App):
         interval = 180 if cfg.develop else 3600
         glib.schedule(interval, backup_by_schedule)
 
+        # Refresh the archive indexes every 6 hours (every 15 minutes in debug
+        # mode) to pick up changes made to repositories outside FreedomBox.
+        interval = 900 if cfg.develop else 6 * 3600
+        glib.schedule(interval, refresh_archive_indexes)
+
+        # Unmount remote repositories that are no longer being used every 5
+        # minutes.
+        glib.schedule(300, unmount_idle_repositories)
+
     def setup(self, old_version):
         """Install and configure the app."""
         super().setup(old_version)
@@ -78,7 +93,8 @@ class BackupsApp(app_module.App):
             _show_schedule_setup_notification()
 
 
-def _backup_handler(packet, encryption_passphrase=None):
+def _backup_handler(packet, encryption_passphrase=None, compression=None,
+                    chunker_params=None):
     """Performs backup operation on packet."""
     if not os.path.exists(MANIFESTS_FOLDER):
         os.makedirs(MANIFESTS_FOLDER)
@@ -96,36 +112,137 @@ def _backup_handler(packet, encryption_passphrase=None):
         json.dump(manifests, manifest_file)
 
     paths = packet.directories + packet.files
-    paths.append(manifest_path)
-    arguments = ['create-archive', '--path', packet.path]
+    arguments = [
+        'create-archive', '--path', packet.path, '--root', packet.root,
+        '--manifest', manifest_path
+    ]
     if packet.archive_comment:
         arguments += ['--comment', packet.archive_comment]
 
+    if compression:
+        arguments += ['--compression', compression]
+
+    if chunker_params:
+        arguments += ['--chunker-params', chunker_params]
+
     arguments += ['--paths'] + paths
     input_data = ''
     if encryption_passphrase:
         input_data = json.dumps(
             {'encryption_passphrase': encryption_passphrase})
 
-    actions.superuser_run('backups', arguments, input=input_data.encode())
+    output = actions.superuser_run('backups', arguments,
+                                   input=input_data.encode())
+    try:
+        packet.archive_info = json.loads(output)['archive']
+    except (TypeError, ValueError, KeyError):
+        pass
 
 
 def backup_by_schedule(data):
-    """Check if backups need to be taken and run the operation."""
+    """Check if backups need to be taken and run the operation.
+
+    Repositories are checked and backed up concurrently so that a slow
+    repository does not delay the others. When apps have to be stopped for
+    the backup, they are stopped once for all the repositories that are due.
+
+    """
+    from . import repository as repository_module
+    repositories = repository_module.get_repositories()
+    with concurrent.futures.ThreadPoolExecutor(len(repositories)) as executor:
+        due_periods = dict(
+            zip(repositories,
+                executor.map(_get_schedule_due_periods, repositories)))
+        due_repositories = [
+            repository for repository in repositories
+            if due_periods[repository]
+        ]
+
+        with contextlib.ExitStack() as stack:
+            if due_repositories and not api._is_snapshot_available():
+                components = []
+                for repository in due_repositories:
+                    for component in repository.schedule.get_components():
+                        if component not in components:
+                            components.append(component)
+
+                stack.enter_context(api.quiesce_apps(components))
+
+            futures = [
+                executor.submit(_run_schedule_backup, repository,
+                                due_periods[repository])
+                for repository in due_repositories
+            ]
+            concurrent.futures.wait(futures)
+
+
+def _get_schedule_due_periods(repository):
+    """Return periods due for backup, handle errors as backup failures."""
+    try:
+        periods = repository.schedule.get_due_periods()
+    except Exception as exception:
+        logger.exception('Error running scheduled backup: %s', exception)
+        _show_schedule_error_notification(repository, is_error=True,
+                                          exception=exception)
+        return None
+
+    if not periods:
+        _show_schedule_error_notification(repository, is_error=False)
+
+    return periods
+
+
+def _run_schedule_backup(repository, periods):
+    """Run a scheduled backup of a repository while holding its lock."""
+    if not repository.lock.acquire(blocking=False):
+        logger.warning('Skipping scheduled backup of repository %s, another '
+                       'operation is in progress', repository.uuid)
+        return
+
+    start_time = time.monotonic()
+    try:
+        repository.schedule.run_backup(periods)
+        _show_schedule_error_notification(repository, is_error=False)
+    except Exception as exception:
+        logger.exception('Error running scheduled backup: %s', exception)
+        _show_schedule_error_notification(repository, is_error=True,
+                                          exception=exception)
+    finally:
+        repository.lock.release()
+        logger.info('Scheduled backup of repository %s took %.1f seconds',
+                    repository.uuid,
+                    time.monotonic() - start_time)
+
+
+def refresh_archive_indexes(data):
+    """Refresh the archive index of all usable and mounted repositories."""
     from . import repository as repository_module
     for repository in repository_module.get_repositories():
         try:
-            repository.schedule.run_schedule()
-            _show_schedule_error_notification(repository, is_error=False)
+            if repository.is_usable() and repository.is_mounted:
+                repository.refresh_archive_index()
         except Exception as exception:
-            logger.exception('Error running scheduled backup: %s', exception)
-            _show_schedule_error_notification(repository, is_error=True,
-                                              exception=exception)
+            logger.warning('Unable to refresh archive index of %s: %s',
+                           repository.uuid, exception)
 
 
-def get_exported_archive_apps(path):
-    """Get list of apps included in exported archive file."""
+def unmount_idle_repositories(data):
+    """Unmount remote repositories that have been idle for a while."""
+    from . import repository as repository_module
+    repository_module.unmount_idle_ssh_sessions()
+
+
+def get_exported_archive_apps(path, partial=False):
+    """Get list of apps included in exported archive file.
+
+    If partial is True, the file is still being uploaded. An empty list is
+    returned if the manifest is not part of the data available so far.
+
+    """
     arguments = ['get-exported-archive-apps', '--path', path]
+    if partial:
+        arguments.append('--partial')
+
     output = actions.superuser_run('backups', arguments)
     return output.splitlines()
 
@@ -5,12 +5,13 @@ API for performing backup and restore.
 Backups can be full disk backups or backup of individual applications.
 
 TODO:
-- Implement snapshots by calling to snapshots module.
 - Handles errors during backup and service start/stop.
 - Implement unit tests.
 """
 
+import contextlib
 import logging
+import threading
 
 from plinth import action_utils, actions
 from plinth import app as app_module
@@ -20,6 +21,11 @@ from .components import BackupRestore
 
 logger = logging.getLogger(__name__)
 
+# Apps that are currently locked and have their services stopped. Maps
+# component ID to the number of users and the original state of the services.
+_quiesced_components = {}
+_quiesce_lock = threading.Lock()
+
 
 class BackupError:
     """Represent an backup/restore operation error."""
@@ -56,6 +62,9 @@ class Packet:
         path is the full path of an (possibly exported) archive.
         TODO: create two variables out of it as it's distinct information.
 
+        archive_info may be set by the backup handler to information about
+        the created archive, such as its statistics.
+
         """
         self.operation = operation
         self.scope = scope
@@ -63,6 +72,7 @@ class Packet:
         self.components = components
         self.path = path
         self.archive_comment = archive_comment
+        self.archive_info = None
         self.errors = []
 
         self.directories = []
@@ -108,32 +118,48 @@ def restore_full(restore_handler):
 
 def backup_apps(backup_handler, path, app_ids=None, encryption_passphrase=None,
                 archive_comment=None):
-    """Backup data belonging to a set of applications."""
+    """Backup data belonging to a set of applications.
+
+    Return the packet that was passed to the backup handler.
+
+    """
     if not app_ids:
         components = get_all_components_for_backup()
     else:
         components = get_components_in_order(app_ids)
 
+    packet = Packet('backup', 'apps', '/', components, path, archive_comment)
     if _is_snapshot_available():
-        snapshot = _take_snapshot()
-        backup_root = snapshot['mount_path']
-        snapshotted = True
-    else:
-        _lockdown_apps(components, lockdown=True)
-        original_state = _shutdown_services(components)
-        backup_root = '/'
-        snapshotted = False
+        _backup_apps_from_snapshot(backup_handler, packet,
+                                   encryption_passphrase)
+        return packet
 
-    packet = Packet('backup', 'apps', backup_root, components, path,
-                    archive_comment)
-    _run_operation(backup_handler, packet,
-                   encryption_passphrase=encryption_passphrase)
+    with quiesce_apps(components):
+        _run_operation(backup_handler, packet,
+                       encryption_passphrase=encryption_passphrase)
+
+    return packet
+
+
+def _backup_apps_from_snapshot(backup_handler, packet,
+                               encryption_passphrase=None):
+    """Backup apps from a filesystem snapshot to minimize downtime.
+
+    Services are stopped and apps are locked only while the pre-backup hooks
+    run and the snapshot is taken. The archive is then created by reading
+    from the read-only snapshot while the apps are running again.
+
+    """
+    with quiesce_apps(packet.components):
+        _run_hooks('backup_pre', packet)
+        snapshot = _take_snapshot()
 
-    if snapshotted:
+    try:
+        packet.root = snapshot['mount_path']
+        backup_handler(packet, encryption_passphrase=encryption_passphrase)
+        _run_hooks('backup_post', packet)
+    finally:
         _delete_snapshot(snapshot)
-    else:
-        _restore_services(original_state)
-        _lockdown_apps(components, lockdown=False)
 
 
 def restore_apps(restore_handler, app_ids=None, create_subvolume=True,
@@ -146,7 +172,7 @@ def restore_apps(restore_handler, app_ids=None, create_subvolume=True,
 
     _install_apps_before_restore(components)
 
-    if _is_snapshot_available() and create_subvolume:
+    if create_subvolume and _is_subvolume_available():
         subvolume = _create_subvolume(empty=False)
         restore_root = subvolume['mount_path']
     else:
@@ -227,8 +253,67 @@ def _lockdown_apps(components, lockdown):
         component.app.locked = lockdown
 
 
+@contextlib.contextmanager
+def quiesce_apps(components):
+    """Lock apps and stop their services for the duration of the context.
+
+    Uses are reference counted per component. When multiple backups of the
+    same apps overlap, such as scheduled backups to several repositories, the
+    services are stopped only once and are restarted after the last backup is
+    done.
+
+    """
+    with _quiesce_lock:
+        new_components = []
+        for component in components:
+            if component.component_id in _quiesced_components:
+                _quiesced_components[component.component_id][0] += 1
+            else:
+                new_components.append(component)
+
+        _lockdown_apps(new_components, lockdown=True)
+        # Stop in the reverse order of the components listing
+        for component in reversed(new_components):
+            state = _shutdown_services([component])
+            _quiesced_components[component.component_id] = [1, state]
+
+    try:
+        yield
+    finally:
+        with _quiesce_lock:
+            done_components = []
+            for component in components:
+                entry = _quiesced_components[component.component_id]
+                entry[0] -= 1
+                if not entry[0]:
+                    del _quiesced_components[component.component_id]
+                    done_components.append(component)
+                    _restore_services(entry[1])
+
+            _lockdown_apps(done_components, lockdown=False)
+
+
 def _is_snapshot_available():
     """Return whether it is possible to take filesystem snapshots."""
+    try:
+        snapshot_app = app_module.App.get('snapshot')
+    except KeyError:
+        return False
+
+    if snapshot_app.needs_setup():
+        return False
+
+    from plinth.modules import snapshot as snapshot_module
+    return snapshot_module.is_supported()
+
+
+def _is_subvolume_available():
+    """Return whether it is possible to restore into a new subvolume.
+
+    Switching to a restored subvolume is not implemented yet.
+
+    """
+    return False
 
 
 def _take_snapshot():
@@ -242,7 +327,15 @@ def _take_snapshot():
     the snapshot later.
 
     """
-    raise NotImplementedError
+    output = actions.superuser_run(
+        'snapshot', ['create', '--description', 'backup', '--print-number'])
+    number = output.strip()
+    # Snapper creates read-only snapshots of / and makes them available under
+    # the .snapshots subvolume which is always mounted.
+    return {
+        'number': number,
+        'mount_path': f'/.snapshots/{number}/snapshot',
+    }
 
 
 def _create_subvolume(empty=True):
@@ -262,7 +355,7 @@ def _create_subvolume(empty=True):
 
 def _delete_snapshot(snapshot):
     """Delete a snapshot given information captured when snapshot was taken."""
-    raise NotImplementedError
+    actions.superuser_run('snapshot', ['delete', snapshot['number']])
 
 
 def _switch_to_subvolume(subvolume):
@@ -5,23 +5,46 @@ Decorators for the backup views.
 
 import functools
 import os
+import time
 
-from . import SESSION_PATH_VARIABLE
+from . import SESSION_PATH_VARIABLE, SESSION_UPLOAD_VARIABLE
+
+# Interrupted uploads not written to for this long can't be resumed anymore
+UPLOAD_EXPIRY = 24 * 3600
 
 
 def delete_tmp_backup_file(function):
     """Decorator to delete uploaded backup files.
 
+    An unfinished upload is kept so that it can be resumed unless it has not
+    been written to for UPLOAD_EXPIRY seconds.
+
     XXX: Implement a better way to delete uploaded files.
 
     """
     @functools.wraps(function)
     def wrapper(request, *args, **kwargs):
         path = request.session.get(SESSION_PATH_VARIABLE, None)
-        if path:
+        if path and not _is_resumable_upload(request.session, path):
             if os.path.isfile(path):
                 os.remove(path)
             del request.session[SESSION_PATH_VARIABLE]
+            request.session.pop(SESSION_UPLOAD_VARIABLE, None)
         return function(request, *args, **kwargs)
 
     return wrapper
+
+
+def _is_resumable_upload(session, path):
+    """Return whether a file is a recent and unfinished chunked upload."""
+    upload_info = session.get(SESSION_UPLOAD_VARIABLE)
+    if not upload_info:
+        return False
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+
+    return stat.st_size < int(upload_info['size']) and \
+        time.time() - stat.st_mtime < UPLOAD_EXPIRY
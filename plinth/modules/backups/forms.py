@@ -94,6 +94,30 @@ class ScheduleForm(forms.Form):
         ]
 
 
+class RepositorySettingsForm(forms.Form):
+    """Form to edit settings of a backup repository."""
+
+    compression = forms.ChoiceField(
+        label=_('Compression'), choices=[
+            ('lz4', _('LZ4: Fast, low compression (default)')),
+            ('auto,zstd,3',
+             _('Zstandard level 3, only for data that compresses well')),
+            ('zstd,3', _('Zstandard level 3: Good compression')),
+            ('zstd,10', _('Zstandard level 10: Better compression, slower')),
+            ('none', _('No compression')),
+        ], help_text=_('Compression used for new backups. On slow devices, '
+                       'LZ4 or automatic Zstandard keep backups fast.'))
+
+    chunker_params = forms.ChoiceField(
+        label=_('Chunk size'), required=False, choices=[
+            ('', _('Default')),
+            ('19,23,22,4095', _('Large: Less memory and CPU usage')),
+            ('10,23,16,4095', _('Small: Better deduplication, more memory')),
+        ], help_text=_('Size of the pieces that backed up files are split '
+                       'into. Changing this reduces deduplication with '
+                       'existing backups.'))
+
+
 class CreateArchiveForm(forms.Form):
     repository = forms.ChoiceField(label=_('Repository'))
     name = forms.RegexField(
@@ -132,12 +156,16 @@ class RestoreForm(forms.Form):
         ]
 
 
+backup_file_validator = FileExtensionValidator(
+    ['gz', 'zst', 'tar'],
+    _('Backup files have to be in .tar.gz, .tar.zst or .tar format'))
+
+
 class UploadForm(forms.Form):
     file = forms.FileField(
-        label=_('Upload File'), required=True, validators=[
-            FileExtensionValidator(
-                ['gz'], _('Backup files have to be in .tar.gz format'))
-        ], help_text=_('Select the backup file you want to upload'))
+        label=_('Upload File'), required=True,
+        validators=[backup_file_validator],
+        help_text=_('Select the backup file you want to upload'))
 
 
 def repository_validator(path):
@@ -5,11 +5,14 @@ Remote and local Borg backup repositories
 
 import abc
 import contextlib
+import functools
 import io
 import json
 import logging
 import os
 import re
+import threading
+import time
 from uuid import uuid1
 
 import paramiko
@@ -25,6 +28,17 @@ from .schedule import Schedule
 
 logger = logging.getLogger(__name__)
 
+# Locks to prevent overlapping write operations on a repository, by UUID
+_repository_locks = {}
+_repository_locks_lock = threading.Lock()
+
+# Remote repositories mounted by FreedomBox for its own operations, by UUID,
+# with the time they were last used. The mounts are kept around for reuse by
+# later operations and unmounted once they have been idle for a while.
+SSH_SESSION_IDLE_TIMEOUT = 15 * 60
+_ssh_sessions = {}
+_ssh_sessions_lock = threading.Lock()
+
 # known errors that come up when remotely accessing a borg repository
 # 'errors' are error strings to look for in the stacktrace.
 KNOWN_ERRORS = [
@@ -81,11 +95,18 @@ class BaseBorgRepository(abc.ABC):
     known_credentials = []
 
     def __init__(self, path, credentials=None, uuid=None, schedule=None,
-                 **kwargs):
-        """Instantiate a new repository."""
+                 compression=None, chunker_params=None, **kwargs):
+        """Instantiate a new repository.
+
+        'compression' and 'chunker_params' are passed to borg when creating
+        archives. When not set, borg's defaults are used.
+
+        """
         self._path = path
         self.credentials = credentials or {}
         self.uuid = uuid or str(uuid1())
+        self.compression = compression
+        self.chunker_params = chunker_params
         self.kwargs = kwargs
         schedule = schedule or {}
         schedule['repository_uuid'] = self.uuid
@@ -124,6 +145,17 @@ class BaseBorgRepository(abc.ABC):
         """Return whether the repository is ready to be used."""
         return True
 
+    @property
+    def lock(self):
+        """Return the lock serializing write operations on the repository.
+
+        The lock is re-entrant so that a scheduled backup holding the lock may
+        create and delete archives.
+
+        """
+        with _repository_locks_lock:
+            return _repository_locks.setdefault(self.uuid, threading.RLock())
+
     @property
     def borg_path(self):
         """Return the repository that the backups action script should use."""
@@ -171,24 +203,93 @@ class BaseBorgRepository(abc.ABC):
         """Remove a borg repository"""
 
     def list_archives(self):
-        """Return list of archives in this repository."""
-        output = self.run(['list-repo', '--path', self.borg_path])
-        archives = json.loads(output)['archives']
-        return sorted(archives, key=lambda archive: archive['start'],
+        """Return list of archives in this repository.
+
+        Archives are read from the archive index stored in the database. borg
+        is queried only if the index is not available yet.
+
+        """
+        index = store.get_archive_index(self.uuid)
+        if index is None:
+            index = self.refresh_archive_index()
+
+        return sorted(index['archives'], key=lambda archive: archive['start'],
                       reverse=True)
 
+    def refresh_archive_index(self):
+        """Query borg for the list of archives and store it as the index."""
+        output = self.run(['list-repo', '--path', self.borg_path])
+        output = json.loads(output)
+        archives = output['archives']
+
+        # Retain statistics recorded by FreedomBox, borg does not list them
+        repository_id = output.get('repository', {}).get('id')
+        with self.lock:
+            old_index = store.get_archive_index(self.uuid, repository_id) or {
+                'archives': []
+            }
+            old_archives = {
+                archive['name']: archive
+                for archive in old_index['archives']
+            }
+            for archive in archives:
+                old_archive = old_archives.get(archive['name'], {})
+                for key in ('stats', 'export_stats'):
+                    if key in old_archive:
+                        archive[key] = old_archive[key]
+
+            index = {'repository_id': repository_id, 'archives': archives}
+            store.set_archive_index(self.uuid, index)
+
+        return index
+
+    def _set_archive_stats(self, archive_name, key, stats):
+        """Record statistics for an archive in the archive index."""
+        # Don't overwrite the index when it is being refreshed
+        with self.lock:
+            index = store.get_archive_index(self.uuid)
+            if index is None:
+                return
+
+            for archive in index['archives']:
+                if archive['name'] == archive_name:
+                    archive[key] = stats
+
+            store.set_archive_index(self.uuid, index)
+
     def create_archive(self, archive_name, app_ids, archive_comment=None):
         """Create a new archive in this repository with given name."""
         archive_path = self._get_archive_path(archive_name)
         passphrase = self.credentials.get('encryption_passphrase', None)
-        api.backup_apps(_backup_handler, path=archive_path, app_ids=app_ids,
-                        encryption_passphrase=passphrase,
-                        archive_comment=archive_comment)
+        backup_handler = functools.partial(_backup_handler,
+                                           compression=self.compression,
+                                           chunker_params=self.chunker_params)
+        with self.lock:
+            packet = api.backup_apps(backup_handler, path=archive_path,
+                                     app_ids=app_ids,
+                                     encryption_passphrase=passphrase,
+                                     archive_comment=archive_comment)
+            self.refresh_archive_index()
+            if packet and packet.archive_info:
+                stats = _get_archive_stats(packet.archive_info)
+                self._set_archive_stats(archive_name, 'stats', stats)
+                return stats
+
+        return None
 
     def delete_archive(self, archive_name):
         """Delete an archive with given name from this repository."""
         archive_path = self._get_archive_path(archive_name)
-        self.run(['delete-archive', '--path', archive_path])
+        with self.lock:
+            self.run(['delete-archive', '--path', archive_path])
+
+            index = store.get_archive_index(self.uuid)
+            if index is not None:
+                index['archives'] = [
+                    archive for archive in index['archives']
+                    if archive['name'] != archive_name
+                ]
+                store.set_archive_index(self.uuid, index)
 
     def initialize(self):
         """Initialize / create a borg repository."""
@@ -203,7 +304,14 @@ class BaseBorgRepository(abc.ABC):
         except errors.BorgRepositoryExists:
             pass
 
-        self.get_info()  # If password is incorrect raise an error early.
+        # If password is incorrect raise an error early.
+        info = self.get_info()
+
+        # Discard the archive index of a previous repository at this location
+        index = store.get_archive_index(self.uuid)
+        if index and index.get('repository_id') != \
+           info.get('repository', {}).get('id'):
+            store.delete_archive_index(self.uuid)
 
     def _get_encryption_data(self):
         """Return additional dictionary data to send to backups call."""
@@ -233,8 +341,15 @@ class BaseBorgRepository(abc.ABC):
         return self._run('backups', arguments, superuser=superuser,
                          input=input_data.encode())
 
-    def get_download_stream(self, archive_name):
-        """Return an stream of .tar.gz binary data for a backup archive."""
+    def get_download_stream(self, archive_name, export_format='gzip'):
+        """Return a stream of binary tar data for a backup archive.
+
+        'export_format' is the compression of the tar data, one of 'gzip',
+        'zstd' or 'none'. Throughput of the export is recorded in the archive
+        index once the stream is fully read.
+
+        """
+        repository = self
 
         class BufferedReader(io.BufferedReader):
             """Improve performance of buffered binary streaming.
@@ -250,15 +365,59 @@ class BaseBorgRepository(abc.ABC):
 
             """
 
+            start_time = None
+            size = 0
+
             def __next__(self):
                 """Override to call read() instead of readline()."""
+                if self.start_time is None:
+                    self.start_time = time.monotonic()
+
                 chunk = self.read(io.DEFAULT_BUFFER_SIZE)
                 if not chunk:
+                    self._check_process()
+                    self._record_stats()
                     raise StopIteration
 
+                self.size += len(chunk)
                 return chunk
 
-        args = ['export-tar', '--path', self._get_archive_path(archive_name)]
+            @staticmethod
+            def _check_process():
+                """Fail the download if export or compression failed.
+
+                Raising an error aborts the response so that the client does
+                not take the truncated data as a complete archive.
+
+                """
+                error = proc.stderr.read().decode()
+                if proc.wait() != 0:
+                    logger.error('Exporting archive %s failed: %s',
+                                 archive_name, error)
+                    raise ActionError('backups', '', error)
+
+            def _record_stats(self):
+                """Record the size and throughput of the finished export."""
+                duration = time.monotonic() - self.start_time
+                stats = {
+                    'format': export_format,
+                    'size': self.size,
+                    'duration': duration,
+                    'throughput': self.size / duration if duration else 0
+                }
+                logger.info('Exported archive %s, %d bytes in %.1f seconds',
+                            archive_name, self.size, duration)
+                try:
+                    repository._set_archive_stats(archive_name, 'export_stats',
+                                                  stats)
+                except Exception as exception:
+                    logger.warning('Unable to record export statistics: %s',
+                                   exception)
+
+        args = [
+            'export-tar', '--path',
+            self._get_archive_path(archive_name), '--format', export_format
+        ]
         input_data = json.dumps(self._get_encryption_data())
         proc = self._run('backups', args, run_in_background=True)
         proc.stdin.write(input_data.encode())
@@ -309,7 +468,9 @@ class BaseBorgRepository(abc.ABC):
             'storage_type': self.storage_type,
             'added_by_module': 'backups',
             'credentials': self.credentials,
-            'schedule': self.schedule.get_storage_format()
+            'schedule': self.schedule.get_storage_format(),
+            'compression': self.compression,
+            'chunker_params': self.chunker_params,
         }
         if self.uuid:
             storage['uuid'] = self.uuid
@@ -393,16 +554,40 @@ class SshBorgRepository(BaseBorgRepository):
         return self._mountpoint
 
     def prepare(self):
-        """Prepare the repository for operations by mounting."""
+        """Prepare the repository for operations by mounting.
+
+        An existing mount is reused if it is still responding. Mounts made
+        here are unmounted by unmount_idle_ssh_sessions() after being idle.
+
+        """
         if not self.is_usable():
             raise errors.SshfsError('Remote host not verified')
 
-        self._umount_ignore_errors()  # In case the connection is stale.
-        self.mount()
+        with self.lock:
+            if self.is_healthy:
+                self._touch_session()
+                return
+
+            was_mounted = self.is_mounted
+            self._umount_ignore_errors()  # In case the connection is stale.
+            self.mount()
+            with _ssh_sessions_lock:
+                if not was_mounted or self.uuid in _ssh_sessions:
+                    _ssh_sessions[self.uuid] = time.monotonic()
 
     def cleanup(self):
-        """Cleanup the repository after operations by unmounting."""
-        self._umount_ignore_errors()
+        """Cleanup the repository after operations.
+
+        The mount is kept for reuse and only marked as recently used.
+
+        """
+        self._touch_session()
+
+    def _touch_session(self):
+        """Update the last used time of the mount made by prepare()."""
+        with _ssh_sessions_lock:
+            if self.uuid in _ssh_sessions:
+                _ssh_sessions[self.uuid] = time.monotonic()
 
     @property
     def hostname(self):
@@ -422,6 +607,13 @@ class SshBorgRepository(BaseBorgRepository):
                            ['is-mounted', '--mountpoint', self._mountpoint])
         return json.loads(output)
 
+    @property
+    def is_healthy(self):
+        """Return whether remote path is mounted and responding."""
+        output = self._run('sshfs',
+                           ['is-healthy', '--mountpoint', self._mountpoint])
+        return json.loads(output)
+
     def initialize(self):
         """Initialize the repository after mounting the target directory."""
         self._ensure_remote_directory()
@@ -444,6 +636,9 @@ class SshBorgRepository(BaseBorgRepository):
 
     def umount(self):
         """Unmount the remote path that was mounted locally using sshfs."""
+        with _ssh_sessions_lock:
+            _ssh_sessions.pop(self.uuid, None)
+
         if not self.is_mounted:
             return
 
@@ -507,6 +702,20 @@ class SshBorgRepository(BaseBorgRepository):
                     sftp_client.mkdir(dir_path)
 
 
+def _get_archive_stats(archive_info):
+    """Return statistics of a created archive from borg's information."""
+    stats = archive_info.get('stats', {})
+    duration = archive_info.get('duration', 0)
+    original_size = stats.get('original_size', 0)
+    return {
+        'duration': duration,
+        'original_size': original_size,
+        'compressed_size': stats.get('compressed_size', 0),
+        'deduplicated_size': stats.get('deduplicated_size', 0),
+        'throughput': original_size / duration if duration else 0
+    }
+
+
 @contextlib.contextmanager
 def _ssh_connection(hostname, username, password):
     """Context manager to create and close an SSH connection."""
@@ -520,6 +729,33 @@ def _ssh_connection(hostname, username, password):
         ssh_client.close()
 
 
+def unmount_idle_ssh_sessions():
+    """Unmount remote repositories mounted by prepare() and no longer used."""
+    now = time.monotonic()
+    with _ssh_sessions_lock:
+        idle_uuids = [
+            uuid for uuid, last_used in _ssh_sessions.items()
+            if now - last_used > SSH_SESSION_IDLE_TIMEOUT
+        ]
+
+    for uuid in idle_uuids:
+        try:
+            repository = get_instance(uuid)
+        except KeyError:  # Repository has been removed
+            with _ssh_sessions_lock:
+                _ssh_sessions.pop(uuid, None)
+            continue
+
+        if not repository.lock.acquire(blocking=False):
+            continue  # An operation is in progress, try again later
+
+        try:
+            logger.info('Unmounting idle repository %s', uuid)
+            repository._umount_ignore_errors()
+        finally:
+            repository.lock.release()
+
+
 def get_repositories():
     """Get all repositories of a given storage type."""
     repositories = []
@@ -183,28 +183,49 @@ class Schedule:
         scheduled.
 
         """
-        if not self.enabled:
+        periods = self.get_due_periods()
+        if not periods:
             return False
 
+        self.run_backup(periods)
+        return True
+
+    def get_due_periods(self):
+        """Return the set of periods for which a backup is due now.
+
+        The repository is prepared for operations if the schedule is enabled.
+
+        """
+        if not self.enabled:
+            return set()
+
         repository = self._get_repository()
         repository.prepare()
 
         recent_backup_times = self._get_recent_backup_times(repository)
         if self._is_backup_too_soon(recent_backup_times):
-            return False
+            return set()
 
         too_long_periods = self._too_long_since_last_backup(
             recent_backup_times)
         time_for_periods = self._time_for_periods()
         disabled_periods = self._get_disabled_periods()
         periods = set(too_long_periods).union(time_for_periods)
-        periods = periods.difference(disabled_periods)
-        if not periods:
-            return False
+        return periods.difference(disabled_periods)
 
+    def run_backup(self, periods):
+        """Take a backup for the given periods and cleanup old backups."""
+        repository = self._get_repository()
         self._run_backup(periods)
         self._run_cleanup(repository)
-        return True
+
+    def get_components(self):
+        """Return the backup components of apps selected for the schedule."""
+        from . import api
+        return [
+            component for component in api.get_all_components_for_backup()
+            if component.app_id not in self.unselected_apps
+        ]
 
     def _get_repository(self):
         """Return the repository to which this schedule is assigned."""
@@ -277,7 +298,6 @@ class Schedule:
         logger.info('Running backup for repository %s, periods %s',
                     self.repository_uuid, periods)
 
-        from . import api
         periods = list(periods)
         periods.sort()
         name = 'scheduled: {periods}: {datetime}'.format(
@@ -287,11 +307,7 @@ class Schedule:
             'type': 'scheduled',
             'periods': periods
         })
-        app_ids = [
-            component.app_id
-            for component in api.get_all_components_for_backup()
-            if component.app_id not in self.unselected_apps
-        ]
+        app_ids = [component.app_id for component in self.get_components()]
 
         repository = self._get_repository()
         repository.create_archive(name, app_ids, archive_comment=comment)
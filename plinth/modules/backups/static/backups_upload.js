@@ -0,0 +1,124 @@
+// SPDX-License-Identifier: AGPL-3.0-or-later
+/**
+ * @licstart The following is the entire license notice for the JavaScript
+ * code in this page.
+ *
+ * This file is part of FreedomBox.
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU Affero General Public License as
+ * published by the Free Software Foundation, either version 3 of the
+ * License, or (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU Affero General Public License for more details.
+ *
+ * You should have received a copy of the GNU Affero General Public License
+ * along with this program.  If not, see <http://www.gnu.org/licenses/>.
+ *
+ * @licend The above is the entire license notice for the JavaScript code
+ * in this page.
+ */
+
+/*
+ * Upload backup files in chunks. Failed chunks are retried and an upload
+ * interrupted earlier is resumed from where it stopped. Without JavaScript,
+ * the form is submitted as a whole.
+ */
+(function($) {
+    var CHUNK_SIZE = 8 * 1024 * 1024;
+    var MAX_RETRIES = 10;
+    var RETRY_DELAY = 3000;
+
+    var form = $('#backups-upload-form');
+    var chunkUrl = form.data('chunk-url');
+    var csrfToken = form.find('input[name=csrfmiddlewaretoken]').val();
+    var progress = $('#backups-upload-progress');
+    var progressBar = progress.find('.progress-bar');
+    var errorBox = $('#backups-upload-error');
+
+    function getUrl(file, offset) {
+        var params = {name: file.name, size: file.size};
+        if (offset !== undefined) {
+            params.offset = offset;
+        }
+
+        return chunkUrl + '?' + $.param(params);
+    }
+
+    function showProgress(file, offset) {
+        var percent = file.size ? Math.floor(offset * 100 / file.size) : 100;
+        progressBar.css('width', percent + '%');
+        progressBar.attr('aria-valuenow', percent);
+        progressBar.text(percent + '%');
+    }
+
+    function showError(message) {
+        errorBox.text(message).removeClass('d-none');
+        progress.addClass('d-none');
+        form.find('input[type=submit]').prop('disabled', false);
+    }
+
+    function uploadChunk(file, offset, retries) {
+        var chunk = file.slice(offset, offset + CHUNK_SIZE);
+        $.ajax({
+            url: getUrl(file, offset),
+            method: 'POST',
+            data: chunk,
+            processData: false,
+            contentType: 'application/octet-stream',
+            headers: {'X-CSRFToken': csrfToken},
+        }).done(function(response) {
+            showProgress(file, response.offset);
+            if (response.redirect) {
+                window.location.href = response.redirect;
+            } else {
+                uploadChunk(file, response.offset, 0);
+            }
+        }).fail(function(xhr) {
+            var response = xhr.responseJSON || {};
+            if (xhr.status === 409) {
+                // Server has a different amount of data, continue from there
+                uploadChunk(file, response.offset, retries);
+            } else if (response.error) {
+                showError(response.error);
+            } else if (retries < MAX_RETRIES) {
+                setTimeout(function() {
+                    resumeUpload(file, retries + 1);
+                }, RETRY_DELAY);
+            } else {
+                showError(xhr.statusText);
+            }
+        });
+    }
+
+    function resumeUpload(file, retries) {
+        $.getJSON(getUrl(file)).done(function(response) {
+            showProgress(file, response.offset);
+            uploadChunk(file, response.offset, retries);
+        }).fail(function(xhr) {
+            if (retries < MAX_RETRIES) {
+                setTimeout(function() {
+                    resumeUpload(file, retries + 1);
+                }, RETRY_DELAY);
+            } else {
+                showError(xhr.statusText);
+            }
+        });
+    }
+
+    form.on('submit', function(event) {
+        var input = form.find('input[type=file]')[0];
+        if (!input.files || !input.files.length || !Blob.prototype.slice) {
+            return;  // Upload whole file with regular form submission
+        }
+
+        event.preventDefault();
+        errorBox.addClass('d-none');
+        progress.removeClass('d-none');
+        form.find('input[type=submit]').prop('disabled', true);
+        resumeUpload(input.files[0], 0);
+    });
+})(jQuery);
@@ -10,6 +10,8 @@ from plinth import kvstore
 
 # kvstore key for repository store
 STORAGE_KEY = 'network_storage'
+# kvstore key prefix for the per-repository archive index
+ARCHIVE_INDEX_KEY_PREFIX = 'backups_archive_index_'
 REQUIRED_FIELDS = ['path', 'storage_type', 'added_by_module']
 
 
@@ -55,7 +57,45 @@ def update_or_add(storage):
 
 
 def delete(uuid):
-    """Remove a repository from store."""
+    """Remove a repository and its archive index from store."""
     storages = get_storages()
     del storages[uuid]
     kvstore.set(STORAGE_KEY, json.dumps(storages))
+    delete_archive_index(uuid)
+
+
+def get_archive_index(uuid, repository_id=None):
+    """Return the archive index of a repository or None if not available.
+
+    The index is a dictionary with the borg 'repository_id' and the list of
+    'archives' as returned by borg.
+
+    If 'repository_id' is given and the index belongs to a different borg
+    repository, such as one that was initialized again at the same location,
+    the index is removed and None is returned.
+
+    """
+    index = kvstore.get_default(ARCHIVE_INDEX_KEY_PREFIX + uuid, None)
+    if index:
+        index = json.loads(index)
+
+    if index and repository_id and \
+       index.get('repository_id') != repository_id:
+        delete_archive_index(uuid)
+        return None
+
+    return index
+
+
+def set_archive_index(uuid, index):
+    """Store the archive index of a repository."""
+    kvstore.set(ARCHIVE_INDEX_KEY_PREFIX + uuid, json.dumps(index))
+
+
+def delete_archive_index(uuid):
+    """Remove the archive index of a repository, if any."""
+    from plinth.models import KVStore
+    try:
+        kvstore.delete(ARCHIVE_INDEX_KEY_PREFIX + uuid)
+    except KVStore.DoesNotExist:
+        pass
@@ -92,6 +92,37 @@ class TestBackupProcesses:
                         path=repository.RootBorgRepository.PATH)
         backup_handler.assert_called_once()
 
+    @staticmethod
+    @patch('plinth.modules.backups.api._delete_snapshot')
+    @patch('plinth.modules.backups.api._take_snapshot')
+    @patch('plinth.modules.backups.api._restore_services')
+    @patch('plinth.modules.backups.api._shutdown_services')
+    @patch('plinth.modules.backups.api._is_snapshot_available')
+    @patch('plinth.modules.backups.api.get_all_components_for_backup')
+    def test_backup_apps_from_snapshot(get_all_components_for_backup,
+                                       is_snapshot_available,
+                                       shutdown_services, restore_services,
+                                       take_snapshot, delete_snapshot):
+        """Test that services are only stopped while taking a snapshot."""
+        get_all_components_for_backup.return_value = [
+            _get_test_app('test-app-1').components['test-app-1-component']
+        ]
+        is_snapshot_available.return_value = True
+        snapshot = {'number': '10', 'mount_path': '/.snapshots/10/snapshot'}
+        take_snapshot.return_value = snapshot
+        shutdown_services.return_value = ['test-state']
+
+        def backup_handler(packet, encryption_passphrase=None):
+            assert packet.root == '/.snapshots/10/snapshot'
+            restore_services.assert_called_once_with(['test-state'])
+            delete_snapshot.assert_not_called()
+
+        handler = MagicMock(side_effect=backup_handler)
+        api.backup_apps(handler, path=repository.RootBorgRepository.PATH)
+        handler.assert_called_once()
+        shutdown_services.assert_called_once()
+        delete_snapshot.assert_called_once_with(snapshot)
+
     @staticmethod
     @patch('plinth.modules.backups.api._install_apps_before_restore')
     def test_restore_apps(mock_install):
@@ -190,6 +221,32 @@ class TestBackupProcesses:
         ]
         run.assert_has_calls(calls)
 
+    @staticmethod
+    @patch('plinth.modules.backups.api._restore_services')
+    @patch('plinth.modules.backups.api._shutdown_services')
+    def test_quiesce_apps(shutdown_services, restore_services):
+        """Test that overlapping uses stop and restart services once."""
+        apps = [_get_test_app('test-app-1'), _get_test_app('test-app-2')]
+        components = [
+            apps[0].components['test-app-1-component'],
+            apps[1].components['test-app-2-component']
+        ]
+        shutdown_services.side_effect = lambda components: [components[0]]
+
+        with api.quiesce_apps(components):
+            assert apps[0].locked and apps[1].locked
+            with api.quiesce_apps(components[1:]):
+                pass
+
+            restore_services.assert_not_called()
+            assert apps[1].locked
+
+        shutdown_services.assert_has_calls(
+            [call([components[1]]), call([components[0]])])
+        restore_services.assert_has_calls(
+            [call([components[0]]), call([components[1]])])
+        assert not apps[0].locked and not apps[1].locked
+
     @staticmethod
     @patch('plinth.actions.superuser_run')
     def test__restore_services(run):
@@ -254,3 +311,11 @@ class TestBackupModule:
         form = forms.UploadForm({}, {'file': archive_file})
         form.is_valid()
         assert form.is_valid()
+
+        # posting zstd compressed and uncompressed archives should work
+        for file_name in ('backup.tar.zst', 'backup.tar'):
+            archive_file = SimpleUploadedFile(
+                file_name, b"file_content",
+                content_type="application/octet-stream")
+            form = forms.UploadForm({}, {'file': archive_file})
+            assert form.is_valid()
@@ -67,3 +67,27 @@ def test_update():
     store.update_or_add(storage)
     _storage = store.get(uuid)
     assert _storage['path'] == new_path
+
+
+def test_archive_index():
+    """Store, retrieve and remove archive index of a repository."""
+    uuid = store.update_or_add(dict(_storages[0]))
+    assert store.get_archive_index(uuid) is None
+
+    index = {'repository_id': 'test-id', 'archives': [{'name': 'test'}]}
+    store.set_archive_index(uuid, index)
+    assert store.get_archive_index(uuid) == index
+
+    store.delete(uuid)
+    assert store.get_archive_index(uuid) is None
+    store.delete_archive_index(uuid)
+
+
+def test_archive_index_repository_id():
+    """Test that index of a different borg repository is discarded."""
+    uuid = store.update_or_add(dict(_storages[1]))
+    index = {'repository_id': 'test-id', 'archives': [{'name': 'test'}]}
+    store.set_archive_index(uuid, index)
+    assert store.get_archive_index(uuid, 'test-id') == index
+    assert store.get_archive_index(uuid, 'other-id') is None
+    assert store.get_archive_index(uuid) is None
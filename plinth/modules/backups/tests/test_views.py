@@ -0,0 +1,113 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Test module for backups views.
+"""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+from django import urls
+from django.http import HttpResponse
+
+from plinth import module_loader
+from plinth.modules.backups import (SESSION_PATH_VARIABLE,
+                                    SESSION_UPLOAD_VARIABLE, views)
+
+# For all tests, use plinth.urls instead of urls configured for testing
+pytestmark = pytest.mark.urls('plinth.urls')
+
+
+@pytest.fixture(autouse=True, scope='module')
+def fixture_app_urls():
+    """Make sure app's URLs are part of plinth.urls."""
+    with patch('plinth.module_loader._modules_to_load', new=[]) as modules, \
+            patch('plinth.urls.urlpatterns', new=[]):
+        modules.append('plinth.modules.backups')
+        module_loader.include_urls()
+        yield
+
+
+@pytest.fixture(name='session')
+def fixture_session():
+    """Return a session and remove any uploaded file afterwards."""
+    session = {}
+    yield session
+    path = session.get(SESSION_PATH_VARIABLE)
+    if path and os.path.isfile(path):
+        os.remove(path)
+
+
+@pytest.fixture(autouse=True)
+def fixture_exported_archive_apps():
+    """Accept uploaded data as a valid archive."""
+    with patch('plinth.modules.backups.get_exported_archive_apps',
+               return_value=['test-app']):
+        yield
+
+
+def _upload_chunk(rf, session, data, offset, size=10):
+    """Post a chunk of an upload and return the response."""
+    url = urls.reverse('backups:upload-chunk')
+    request = rf.post(f'{url}?name=test.tar.gz&size={size}&offset={offset}',
+                      data=data, content_type='application/octet-stream')
+    request.session = session
+    return views.UploadArchiveChunkView.as_view()(request)
+
+
+def _get_offset(rf, session):
+    """Return the offset to resume the upload from."""
+    request = rf.get(urls.reverse('backups:upload-chunk'), {
+        'name': 'test.tar.gz',
+        'size': '10'
+    })
+    request.session = session
+    response = views.UploadArchiveChunkView.as_view()(request)
+    return json.loads(response.content)['offset']
+
+
+def _visit_index(rf, session):
+    """Show the backups index page."""
+    request = rf.get(urls.reverse('backups:index'))
+    request.session = session
+    with patch.object(views.BackupsView, 'get', return_value=HttpResponse()):
+        views.BackupsView.as_view()(request)
+
+
+def test_resume_upload_after_index(rf, session):
+    """Test that an upload can be resumed after visiting the index."""
+    response = _upload_chunk(rf, session, b'12345', 0)
+    assert json.loads(response.content)['offset'] == 5
+
+    _visit_index(rf, session)
+    assert _get_offset(rf, session) == 5
+
+    response = _upload_chunk(rf, session, b'67890', 5)
+    assert json.loads(response.content)['offset'] == 10
+    path = session[SESSION_PATH_VARIABLE]
+    with open(path, 'rb') as upload_file:
+        assert upload_file.read() == b'1234567890'
+
+    # Finished upload is removed when not restored
+    _visit_index(rf, session)
+    assert not os.path.exists(path)
+    assert session == {}
+
+
+def test_expired_upload_deleted(rf, session):
+    """Test that an interrupted upload is deleted after a while."""
+    _upload_chunk(rf, session, b'12345', 0)
+    path = session[SESSION_PATH_VARIABLE]
+    os.utime(path, (0, 0))
+    _visit_index(rf, session)
+    assert not os.path.exists(path)
+    assert SESSION_UPLOAD_VARIABLE not in session
+    assert _get_offset(rf, session) == 0
+
+
+def test_oversized_upload_deleted(rf, session):
+    """Test that an upload larger than announced is deleted."""
+    response = _upload_chunk(rf, session, b'12345', 0, size=3)
+    assert response.status_code == 400
+    assert session == {}
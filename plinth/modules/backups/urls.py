@@ -7,14 +7,17 @@ from django.urls import re_path
 
 from .views import (AddRemoteRepositoryView, AddRepositoryView, BackupsView,
                     CreateArchiveView, DeleteArchiveView, DownloadArchiveView,
-                    RemoveRepositoryView, RestoreArchiveView,
-                    RestoreFromUploadView, ScheduleView, UploadArchiveView,
+                    RemoveRepositoryView, RepositorySettingsView,
+                    RestoreArchiveView, RestoreFromUploadView, ScheduleView,
+                    UploadArchiveChunkView, UploadArchiveView,
                     VerifySshHostkeyView, mount_repository, umount_repository)
 
 urlpatterns = [
     re_path(r'^sys/backups/$', BackupsView.as_view(), name='index'),
     re_path(r'^sys/backups/(?P<uuid>[^/]+)/schedule/$', ScheduleView.as_view(),
             name='schedule'),
+    re_path(r'^sys/backups/(?P<uuid>[^/]+)/settings/$',
+            RepositorySettingsView.as_view(), name='repository-settings'),
     re_path(r'^sys/backups/create/$', CreateArchiveView.as_view(),
             name='create'),
     re_path(r'^sys/backups/(?P<uuid>[^/]+)/download/(?P<name>[^/]+)/$',
@@ -23,6 +26,8 @@ urlpatterns = [
             DeleteArchiveView.as_view(), name='delete'),
     re_path(r'^sys/backups/upload/$', UploadArchiveView.as_view(),
             name='upload'),
+    re_path(r'^sys/backups/upload/chunk/$', UploadArchiveChunkView.as_view(),
+            name='upload-chunk'),
     re_path(r'^sys/backups/(?P<uuid>[^/]+)/restore-archive/(?P<name>[^/]+)/$',
             RestoreArchiveView.as_view(), name='restore-archive'),
     re_path(r'^sys/backups/restore-from-upload/$',
@@ -5,6 +5,7 @@ Views for the backups app.
 
 import logging
 import os
+import shutil
 import tempfile
 from datetime import datetime
 from urllib.parse import unquote
@@ -12,20 +13,23 @@ from urllib.parse import unquote
 import paramiko
 from django.contrib import messages
 from django.contrib.messages.views import SuccessMessageMixin
-from django.http import Http404, StreamingHttpResponse
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect
+from django.template.defaultfilters import filesizeformat
 from django.urls import reverse, reverse_lazy
 from django.utils.decorators import method_decorator
 from django.utils.translation import gettext as _
 from django.utils.translation import gettext_lazy
 from django.views.generic import FormView, TemplateView, View
 
-from plinth.errors import PlinthError
+from plinth.errors import ActionError, PlinthError
 from plinth.modules import backups, storage
 from plinth.views import AppView
 
-from . import (SESSION_PATH_VARIABLE, api, forms, get_known_hosts_path,
-               is_ssh_hostkey_verified)
+from . import (SESSION_PATH_VARIABLE, SESSION_UPLOAD_VARIABLE, api, forms,
+               get_known_hosts_path, is_ssh_hostkey_verified)
 from .decorators import delete_tmp_backup_file
 from .repository import (BorgRepository, SshBorgRepository, get_instance,
                          get_repositories)
@@ -99,6 +103,39 @@ class ScheduleView(SuccessMessageMixin, FormView):
         return super().form_valid(form)
 
 
+class RepositorySettingsView(SuccessMessageMixin, FormView):
+    """View to edit the settings of a repository."""
+    form_class = forms.RepositorySettingsForm
+    prefix = 'backups_settings'
+    template_name = 'backups_form.html'
+    success_url = reverse_lazy('backups:index')
+    success_message = gettext_lazy('Backup location settings updated.')
+
+    def get_initial(self):
+        """Return the values to fill in the form."""
+        initial = super().get_initial()
+        repository = get_instance(self.kwargs['uuid'])
+        initial.update({
+            'compression': repository.compression or 'lz4',
+            'chunker_params': repository.chunker_params or '',
+        })
+        return initial
+
+    def get_context_data(self, **kwargs):
+        """Return additional context for rendering the template."""
+        context = super().get_context_data(**kwargs)
+        context['title'] = _('Backup Location Settings')
+        return context
+
+    def form_valid(self, form):
+        """Update the repository settings."""
+        repository = get_instance(self.kwargs['uuid'])
+        repository.compression = form.cleaned_data['compression']
+        repository.chunker_params = form.cleaned_data['chunker_params'] or None
+        repository.save()
+        return super().form_valid(form)
+
+
 class CreateArchiveView(SuccessMessageMixin, FormView):
     """View to create a new archive."""
     form_class = forms.CreateArchiveForm
@@ -122,7 +159,16 @@ class CreateArchiveView(SuccessMessageMixin, FormView):
         name = form.cleaned_data['name'] or datetime.now().strftime(
             '%Y-%m-%d:%H:%M')
         selected_apps = form.cleaned_data['selected_apps']
-        repository.create_archive(name, selected_apps)
+        stats = repository.create_archive(name, selected_apps)
+        if stats:
+            messages.info(
+                self.request,
+                _('Backed up {size} in {duration:.0f} seconds '
+                  '({throughput}/s).').format(
+                      size=filesizeformat(stats['original_size']),
+                      duration=stats['duration'],
+                      throughput=filesizeformat(stats['throughput'])))
+
         return super().form_valid(form)
 
 
@@ -180,13 +226,128 @@ class UploadArchiveView(SuccessMessageMixin, FormView):
 
     def form_valid(self, form):
         """store uploaded file."""
+        uploaded_file = self.request.FILES['backups-file']
         with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
             self.request.session[SESSION_PATH_VARIABLE] = tmp_file.name
-            for chunk in self.request.FILES['backups-file'].chunks():
-                tmp_file.write(chunk)
+            if not hasattr(uploaded_file, 'temporary_file_path'):
+                for chunk in uploaded_file.chunks():
+                    tmp_file.write(chunk)
+
+        if hasattr(uploaded_file, 'temporary_file_path'):
+            # Large uploads are already on disk, avoid copying them again
+            shutil.move(uploaded_file.temporary_file_path(), tmp_file.name)
+
         return super().form_valid(form)
 
 
+class UploadArchiveChunkView(View):
+    """Receive a backup file in chunks so that uploads can be resumed.
+
+    Each chunk is sent as the raw body of a POST request with the file 'name',
+    total 'size' and the 'offset' of the chunk as query parameters. It is
+    written directly to the file that is later restored from. A GET request
+    with 'name' and 'size' returns the offset to resume an upload from.
+
+    """
+
+    def get(self, request):
+        """Return the offset to resume the upload from."""
+        return JsonResponse({'offset': self._get_offset(request)})
+
+    def post(self, request):
+        """Append a chunk to the uploaded file."""
+        try:
+            name = request.GET['name']
+            size = int(request.GET['size'])
+            chunk_offset = int(request.GET['offset'])
+        except (KeyError, ValueError):
+            return JsonResponse({'error': _('Invalid request.')}, status=400)
+
+        if chunk_offset == 0:
+            try:
+                forms.backup_file_validator(File(None, name))
+            except ValidationError as exception:
+                return JsonResponse({'error': ' '.join(exception.messages)},
+                                    status=400)
+
+            self._start_upload(request, name, size)
+        elif chunk_offset != self._get_offset(request):
+            return JsonResponse({'offset': self._get_offset(request)},
+                                status=409)
+
+        path = request.session[SESSION_PATH_VARIABLE]
+        with open(path, 'ab') as upload_file:
+            while True:
+                chunk = request.read(1024 * 1024)
+                if not chunk:
+                    break
+
+                upload_file.write(chunk)
+
+            offset = upload_file.tell()
+
+        if offset > size:
+            self._discard_upload(request)
+            return JsonResponse({'error': _('Invalid request.')}, status=400)
+
+        response = {'offset': offset, 'apps': None}
+        # Validate the archive as soon as first data arrives. The manifest is
+        # stored at the start of archives and is then usually available.
+        if chunk_offset == 0:
+            try:
+                response['apps'] = backups.get_exported_archive_apps(
+                    path, partial=offset < size)
+            except ActionError:
+                self._discard_upload(request)
+                return JsonResponse(
+                    {'error': _('Uploaded file is not a valid backup.')},
+                    status=400)
+
+        if offset == size:
+            response['redirect'] = reverse('backups:restore-from-upload')
+
+        return JsonResponse(response)
+
+    @staticmethod
+    def _get_offset(request):
+        """Return size of the partially uploaded file for given name/size."""
+        upload_info = request.session.get(SESSION_UPLOAD_VARIABLE)
+        path = request.session.get(SESSION_PATH_VARIABLE)
+        if not upload_info or not path or upload_info != {
+                'name': request.GET.get('name'),
+                'size': request.GET.get('size')
+        }:
+            return 0
+
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _start_upload(request, name, size):
+        """Discard any previous upload and start a new one."""
+        path = request.session.get(SESSION_PATH_VARIABLE)
+        if path and os.path.isfile(path):
+            os.remove(path)
+
+        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
+            request.session[SESSION_PATH_VARIABLE] = tmp_file.name
+
+        request.session[SESSION_UPLOAD_VARIABLE] = {
+            'name': name,
+            'size': str(size)
+        }
+
+    @staticmethod
+    def _discard_upload(request):
+        """Remove the uploaded file so that the upload can't be resumed."""
+        path = request.session.pop(SESSION_PATH_VARIABLE)
+        request.session.pop(SESSION_UPLOAD_VARIABLE, None)
+        if os.path.isfile(path):
+            os.remove(path)
+
+
 class BaseRestoreView(SuccessMessageMixin, FormView):
     """View to restore files from an archive."""
     form_class = forms.RestoreForm
@@ -266,12 +427,25 @@ class RestoreArchiveView(BaseRestoreView):
 class DownloadArchiveView(View):
     """View to export and download an archive as stream."""
 
+    # File extension and content type of exported archive for each format
+    formats = {
+        'gzip': ('.tar.gz', 'application/gzip'),
+        'zstd': ('.tar.zst', 'application/zstd'),
+        'none': ('.tar', 'application/x-tar'),
+    }
+
     def get(self, request, uuid, name):
+        export_format = request.GET.get('format', 'gzip')
+        if export_format not in self.formats:
+            raise Http404
+
         repository = get_instance(uuid)
-        filename = f'{name}.tar.gz'
+        extension, content_type = self.formats[export_format]
+        filename = f'{name}{extension}'
 
-        response = StreamingHttpResponse(repository.get_download_stream(name),
-                                         content_type='application/gzip')
+        response = StreamingHttpResponse(
+            repository.get_download_stream(name, export_format),
+            content_type=content_type)
         response['Content-Disposition'] = 'attachment; filename="%s"' % \
             filename
         return response
@@ -484,5 +658,12 @@ def mount_repository(request, uuid):
     else:
         if not repository.is_mounted:
             messages.error(request, _('Mounting failed'))
+        else:
+            # Remote repository may have changed while it was not mounted.
+            try:
+                repository.refresh_archive_index()
+            except Exception as exception:
+                logger.warning('Unable to refresh archive index: %s',
+                               exception)
 
     return redirect('backups:index')
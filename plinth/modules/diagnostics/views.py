@@ -11,6 +11,7 @@ from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.http import require_POST
 
+from plinth import profiler
 from plinth.app import App
 from plinth.modules import diagnostics
 from plinth.views import AppView
@@ -42,6 +43,7 @@ class DiagnosticsView(AppView):
         context['is_task_running'] = is_task_running
         context['results'] = results
         context['refresh_page_sec'] = 3 if is_task_running else None
+        context['startup'] = profiler.get_results()
         return context
 
 
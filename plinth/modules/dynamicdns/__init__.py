@@ -3,12 +3,15 @@
 FreedomBox app to configure ez-ipupdate client.
 """
 
+import concurrent.futures
 import json
 import logging
 import subprocess
+import threading
 import time
 import urllib
 
+import requests
 from django.utils.translation import gettext_lazy as _
 
 from plinth import actions
@@ -115,26 +118,74 @@ class DynamicDNSApp(app_module.App):
             actions.superuser_run('dynamicdns', ['clean'])
 
 
+# Maximum number of domains to update in parallel
+MAX_PARALLEL_UPDATES = 8
+
+# Even if the local network did not change, the external address may change
+# (for example, on a router performing NAT). So check at least this often.
+FORCE_CHECK_INTERVAL = 30 * 60
+
+HTTP_TIMEOUT = 3
+HTTP_RETRIES = 2
+
+_status_lock = threading.Lock()
+
+# Local addresses and time when all domains were last found to be up-to-date
+_last_update = {'local_addresses': None, 'time': 0}
+
+
+class _AddressFamilyAdapter(requests.adapters.HTTPAdapter):
+    """HTTP adapter to connect only using IPv4 or only using IPv6.
+
+    Connecting from the unspecified address of one family makes connections
+    to addresses of the other family fail and those are skipped.
+
+    """
+
+    def __init__(self, use_ipv6, **kwargs):
+        """Initialize the adapter."""
+        self.source_address = ('::', 0) if use_ipv6 else ('0.0.0.0', 0)
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        """Create connection pools that connect from the source address."""
+        kwargs['source_address'] = self.source_address
+        super().init_poolmanager(*args, **kwargs)
+
+
+def _get_http_session(use_ipv6):
+    """Return an HTTP session using the given IP address family."""
+    session = requests.Session()
+    adapter = _AddressFamilyAdapter(use_ipv6, max_retries=HTTP_RETRIES)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
 def _query_external_address(domain):
     """Return the IP address by querying an external server."""
     if not domain['ip_lookup_url']:
         return None
 
-    ip_option = '-6' if domain['use_ipv6'] else '-4'
     try:
-        ip_address = subprocess.check_output([
-            'wget', ip_option, '-o', '/dev/null', '-t', '3', '-T', '3', '-O',
-            '-', domain['ip_lookup_url']
-        ])
-        return ip_address.decode().strip().lower()
-    except subprocess.CalledProcessError as exception:
+        with _get_http_session(domain['use_ipv6']) as session:
+            response = session.get(domain['ip_lookup_url'],
+                                   timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+            return response.text.strip().lower()
+    except requests.RequestException as exception:
         logger.warning('Unable to lookup external IP with URL %s: %s',
                        domain['ip_lookup_url'], exception)
         return None
 
 
 def _query_dns_address(domain):
-    """Return the IP address in the DNS records."""
+    """Return the IP address in the DNS records.
+
+    The DNS servers are queried directly instead of using the system resolver
+    as the latter may answer from /etc/hosts or a local cache.
+
+    """
     ip_option = 'AAAA' if domain['use_ipv6'] else 'A'
     try:
         output = subprocess.check_output(
@@ -162,34 +213,42 @@ def _update_using_url(domain, external_address):
     if domain['password']:
         update_url = update_url.replace('<Pass>', quote(domain['password']))
 
-    options = ['-o', '/dev/null', '-t', '3', '-T', '3']
+    auth = None
     if domain['use_http_basic_auth']:
-        options += [
-            '--user', domain['username'], '--password', domain['password']
-        ]
+        auth = (domain['username'], domain['password'])
 
-    if domain['disable_ssl_cert_check']:
-        options += ['--no-check-certificate']
+    try:
+        with _get_http_session(domain['use_ipv6']) as session:
+            response = session.get(
+                update_url, auth=auth, timeout=HTTP_TIMEOUT,
+                verify=not domain['disable_ssl_cert_check'])
+            result = response.ok
+    except requests.RequestException as exception:
+        logger.warning('Unable to update dynamic domain %s: %s',
+                       domain['domain'], exception)
+        result = False
 
-    if domain['use_ipv6']:
-        options += ['-6']
-    else:
-        options += ['-4']
+    return result, external_address
 
-    command = ['wget', '-O', '/dev/null'] + options + [update_url]
-    process = subprocess.run(command, check=False)
-    return process.returncode == 0, external_address
 
+def _update_dns_for_domain(domain, external_address_future=None):
+    """Update DNS records for a single domain.
 
-def _update_dns_for_domain(domain):
-    """Update DNS records for a single domain."""
+    If the external address is being looked up by another task, it is
+    provided as a future. Return whether the update was successful.
+
+    """
     result = False
     ip_address = None
     error = None
 
     try:
         dns_address = _query_dns_address(domain)
-        external_address = _query_external_address(domain)
+        if external_address_future:
+            external_address = external_address_future.result()
+        else:
+            external_address = _query_external_address(domain)
+
         if dns_address == external_address and dns_address is not None:
             logger.info('Dynamic domain %s is up-to-date: %s',
                         domain['domain'], dns_address)
@@ -214,18 +273,79 @@ def _update_dns_for_domain(domain):
         error = exception
 
     set_status(domain, result, ip_address, error)
+    return result
+
+
+def _get_local_addresses():
+    """Return the IP addresses of the machine as known to NetworkManager.
+
+    Return None if they could not be retrieved.
+
+    """
+    try:
+        from plinth import network
+        addresses = set()
+        for device in network.get_nm_client().get_devices():
+            for ip_config in (device.get_ip4_config(),
+                              device.get_ip6_config()):
+                if ip_config:
+                    addresses.update(address.get_address()
+                                     for address in ip_config.get_addresses())
+    except Exception as exception:
+        logger.warning('Unable to get local addresses: %s', exception)
+        return None
+
+    return sorted(addresses)
 
 
 def update_dns(_data):
-    """For all configured domains, check and up to date DNS records."""
+    """For all configured domains, check and up to date DNS records.
+
+    Domains are checked in parallel and the external address is looked up only
+    once for all domains using the same lookup URL and address family. If all
+    domains were up-to-date recently and the local addresses did not change
+    since, nothing is done.
+
+    """
     config = get_config()
     app = app_module.App.get('dynamicdns')
     if not app.is_enabled():
         return
 
-    # Update for each domain
-    for domain in config['domains'].values():
-        _update_dns_for_domain(domain)
+    domains = list(config['domains'].values())
+    if not domains:
+        return
+
+    local_addresses = _get_local_addresses()
+    if local_addresses is not None and \
+       local_addresses == _last_update['local_addresses'] and \
+       time.monotonic() - _last_update['time'] < FORCE_CHECK_INTERVAL:
+        logger.debug('Local addresses did not change, skipping dynamic DNS '
+                     'update')
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=MAX_PARALLEL_UPDATES) as executor:
+        # Lookups are submitted first so that they are never blocked by the
+        # updates waiting for them.
+        lookups = {}
+        for domain in domains:
+            key = (domain['ip_lookup_url'], domain['use_ipv6'])
+            if key not in lookups:
+                lookups[key] = executor.submit(_query_external_address,
+                                               domain)
+
+        results = executor.map(
+            lambda domain: _update_dns_for_domain(
+                domain, lookups[(domain['ip_lookup_url'], domain['use_ipv6'])]
+            ), domains)
+        success = all(list(results))
+
+    if success:
+        _last_update['local_addresses'] = local_addresses
+        _last_update['time'] = time.monotonic()
+    else:
+        _last_update['local_addresses'] = None
 
 
 def get_status():
@@ -238,18 +358,19 @@ def get_status():
 
 def set_status(domain, result, ip_address, error=None):
     """Set the status of most recent update."""
-    status = kvstore.get_default('dynamicdns_status', '{}')
-    status = json.loads(status)
-    domains = status.setdefault('domains', {})
-    domains[domain['domain']] = {
-        'domain': domain['domain'],
-        'result': result,
-        'ip_address': ip_address,
-        'error_code': error.__class__.__name__ if error else None,
-        'error_message': error.args[0] if error and error.args else None,
-        'timestamp': int(time.time()),
-    }
-    kvstore.set('dynamicdns_status', json.dumps(status))
+    with _status_lock:
+        status = kvstore.get_default('dynamicdns_status', '{}')
+        status = json.loads(status)
+        domains = status.setdefault('domains', {})
+        domains[domain['domain']] = {
+            'domain': domain['domain'],
+            'result': result,
+            'ip_address': ip_address,
+            'error_code': error.__class__.__name__ if error else None,
+            'error_message': error.args[0] if error and error.args else None,
+            'timestamp': int(time.time()),
+        }
+        kvstore.set('dynamicdns_status', json.dumps(status))
 
 
 def get_config():
@@ -273,6 +394,7 @@ def _fix_corrupt_config(config):
 def set_config(config):
     """Set a new configuration."""
     kvstore.set('dynamicdns_config', json.dumps(config))
+    _last_update['local_addresses'] = None  # Check with new configuration
 
 
 def notify_domain_added(domain_name):
@@ -0,0 +1,233 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Test module for dynamic DNS updates.
+"""
+
+from unittest.mock import Mock, call, patch
+
+import pytest
+import requests
+
+from plinth.modules import dynamicdns
+
+
+def _get_domain(name='test.example.com', **kwargs):
+    """Return configuration of a domain."""
+    domain = {
+        'service_type': 'other',
+        'domain': name,
+        'server': None,
+        'username': 'test-user',
+        'password': 'test-password',
+        'ip_lookup_url': 'https://ddns.example.com/ip',
+        'update_url': 'https://ddns.example.com/update?'
+                      'domain=<Domain>&ip=<Ip>',
+        'use_http_basic_auth': False,
+        'disable_ssl_cert_check': False,
+        'use_ipv6': False,
+    }
+    domain.update(kwargs)
+    return domain
+
+
+@pytest.fixture(name='last_update', autouse=True)
+def fixture_last_update():
+    """Start each test without any previous update."""
+    last_update = {'local_addresses': None, 'time': 0}
+    with patch('plinth.modules.dynamicdns._last_update', last_update):
+        yield last_update
+
+
+@pytest.fixture(name='domains')
+def fixture_domains():
+    """Configure and enable the app with two domains."""
+    domains = {
+        'test1.example.com': _get_domain('test1.example.com'),
+        'test2.example.com': _get_domain('test2.example.com'),
+    }
+    app = Mock()
+    app.is_enabled.return_value = True
+    with patch('plinth.app.App.get', return_value=app), \
+            patch('plinth.modules.dynamicdns.get_config',
+                  return_value={'domains': domains}):
+        yield domains
+
+
+@patch('plinth.modules.dynamicdns._get_local_addresses')
+@patch('plinth.modules.dynamicdns._update_dns_for_domain')
+@patch('plinth.modules.dynamicdns._query_external_address')
+def test_update_dns_skip_unchanged(query_external_address,
+                                   update_dns_for_domain, get_local_addresses,
+                                   domains):
+    """Test that update is skipped if local addresses did not change."""
+    get_local_addresses.return_value = ['192.168.0.2']
+    update_dns_for_domain.return_value = True
+    dynamicdns.update_dns(None)
+    assert update_dns_for_domain.call_count == 2
+    query_external_address.assert_called_once()
+
+    update_dns_for_domain.reset_mock()
+    dynamicdns.update_dns(None)
+    update_dns_for_domain.assert_not_called()
+
+    get_local_addresses.return_value = ['192.168.0.3']
+    dynamicdns.update_dns(None)
+    assert update_dns_for_domain.call_count == 2
+
+
+@patch('plinth.modules.dynamicdns.time.monotonic')
+@patch('plinth.modules.dynamicdns._get_local_addresses')
+@patch('plinth.modules.dynamicdns._update_dns_for_domain')
+@patch('plinth.modules.dynamicdns._query_external_address')
+def test_update_dns_forced_after_interval(query_external_address,
+                                          update_dns_for_domain,
+                                          get_local_addresses, monotonic,
+                                          domains):
+    """Test that update is done after an interval even if nothing changed."""
+    get_local_addresses.return_value = ['192.168.0.2']
+    update_dns_for_domain.return_value = True
+    monotonic.return_value = 1000
+    dynamicdns.update_dns(None)
+
+    update_dns_for_domain.reset_mock()
+    monotonic.return_value = 1000 + dynamicdns.FORCE_CHECK_INTERVAL - 1
+    dynamicdns.update_dns(None)
+    update_dns_for_domain.assert_not_called()
+
+    monotonic.return_value = 1000 + dynamicdns.FORCE_CHECK_INTERVAL
+    dynamicdns.update_dns(None)
+    assert update_dns_for_domain.call_count == 2
+
+
+@patch('plinth.modules.dynamicdns._get_local_addresses')
+@patch('plinth.modules.dynamicdns._update_dns_for_domain')
+@patch('plinth.modules.dynamicdns._query_external_address')
+def test_update_dns_failure(query_external_address, update_dns_for_domain,
+                            get_local_addresses, domains, last_update):
+    """Test that update is retried after a failure or without addresses."""
+    get_local_addresses.return_value = ['192.168.0.2']
+    update_dns_for_domain.side_effect = [True, False, True, True]
+    dynamicdns.update_dns(None)
+    assert last_update['local_addresses'] is None
+
+    dynamicdns.update_dns(None)
+    assert update_dns_for_domain.call_count == 4
+    assert last_update['local_addresses'] == ['192.168.0.2']
+
+    # Local addresses could not be retrieved
+    get_local_addresses.return_value = None
+    update_dns_for_domain.side_effect = None
+    update_dns_for_domain.return_value = True
+    dynamicdns.update_dns(None)
+    assert update_dns_for_domain.call_count == 6
+
+
+@patch('plinth.modules.dynamicdns._get_local_addresses')
+@patch('plinth.modules.dynamicdns._update_dns_for_domain')
+@patch('plinth.modules.dynamicdns._query_external_address')
+def test_update_dns_shared_lookups(query_external_address,
+                                   update_dns_for_domain, get_local_addresses,
+                                   domains):
+    """Test that external address is looked up once per URL and family."""
+    domains['test3.example.com'] = _get_domain('test3.example.com',
+                                               use_ipv6=True)
+    get_local_addresses.return_value = None
+    update_dns_for_domain.return_value = True
+    dynamicdns.update_dns(None)
+    assert query_external_address.call_count == 2
+    futures = {
+        args[0]['domain']: args[1]
+        for args, _ in update_dns_for_domain.call_args_list
+    }
+    assert futures['test1.example.com'] is futures['test2.example.com']
+    assert futures['test1.example.com'] is not futures['test3.example.com']
+
+
+@patch('plinth.modules.dynamicdns.set_status')
+@patch('plinth.modules.dynamicdns._update_using_url')
+@patch('plinth.modules.dynamicdns._query_external_address')
+@patch('plinth.modules.dynamicdns._query_dns_address')
+def test_update_dns_for_domain(query_dns_address, query_external_address,
+                               update_using_url, set_status):
+    """Test updating a single domain."""
+    domain = _get_domain()
+    query_dns_address.return_value = '1.2.3.4'
+    query_external_address.return_value = '1.2.3.4'
+    assert dynamicdns._update_dns_for_domain(domain)
+    update_using_url.assert_not_called()
+    assert set_status.call_args[0][:3] == (domain, True, '1.2.3.4')
+
+    query_external_address.return_value = '1.2.3.5'
+    update_using_url.return_value = (True, '1.2.3.5')
+    assert dynamicdns._update_dns_for_domain(domain)
+    update_using_url.assert_called_once_with(domain, '1.2.3.5')
+    set_status.assert_called_with(domain, True, '1.2.3.5', None)
+
+    update_using_url.return_value = (False, '1.2.3.5')
+    assert not dynamicdns._update_dns_for_domain(domain)
+    set_status.assert_called_with(domain, False, '1.2.3.5', None)
+
+    # Address looked up by another task
+    future = Mock()
+    future.result.return_value = '1.2.3.4'
+    query_external_address.reset_mock()
+    assert dynamicdns._update_dns_for_domain(domain, future)
+    query_external_address.assert_not_called()
+
+    error = RuntimeError('test-error')
+    query_dns_address.side_effect = error
+    assert not dynamicdns._update_dns_for_domain(domain)
+    set_status.assert_called_with(domain, False, None, error)
+
+
+@patch('plinth.modules.dynamicdns.requests.Session.get')
+def test_query_external_address(session_get):
+    """Test looking up the external address."""
+    assert dynamicdns._query_external_address(
+        _get_domain(ip_lookup_url=None)) is None
+    session_get.assert_not_called()
+
+    session_get.return_value.text = ' 2001:DB8::1\n'
+    assert dynamicdns._query_external_address(_get_domain()) == '2001:db8::1'
+    session_get.assert_called_once_with('https://ddns.example.com/ip',
+                                        timeout=dynamicdns.HTTP_TIMEOUT)
+
+    session_get.side_effect = requests.ConnectionError()
+    assert dynamicdns._query_external_address(_get_domain()) is None
+
+    session_get.side_effect = None
+    session_get.return_value.raise_for_status.side_effect = \
+        requests.HTTPError()
+    assert dynamicdns._query_external_address(_get_domain()) is None
+
+
+@patch('plinth.modules.dynamicdns.requests.Session.get')
+def test_update_using_url(session_get):
+    """Test updating a domain using an update URL."""
+    domain = _get_domain(use_http_basic_auth=True)
+    session_get.return_value.ok = True
+    result = dynamicdns._update_using_url(domain, '1.2.3.4')
+    assert result == (True, '1.2.3.4')
+    assert session_get.call_args == call(
+        'https://ddns.example.com/update?domain=test.example.com&ip=1.2.3.4',
+        auth=('test-user', 'test-password'), timeout=dynamicdns.HTTP_TIMEOUT,
+        verify=True)
+
+    session_get.return_value.ok = False
+    result = dynamicdns._update_using_url(domain, '1.2.3.4')
+    assert result == (False, '1.2.3.4')
+
+    session_get.side_effect = requests.Timeout()
+    result = dynamicdns._update_using_url(domain, '1.2.3.4')
+    assert result == (False, '1.2.3.4')
+
+
+@pytest.mark.parametrize('use_ipv6,source_address', [(False, '0.0.0.0'),
+                                                     (True, '::')])
+def test_http_session_address_family(use_ipv6, source_address):
+    """Test that HTTP connections are made from the chosen address family."""
+    session = dynamicdns._get_http_session(use_ipv6)
+    adapter = session.get_adapter('https://ddns.example.com/')
+    assert adapter.poolmanager.connection_pool_kw['source_address'] == \
+        (source_address, 0)
+    assert adapter.max_retries.total == dynamicdns.HTTP_RETRIES
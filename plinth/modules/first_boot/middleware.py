@@ -13,7 +13,7 @@ from django.utils.deprecation import MiddlewareMixin
 
 from plinth import setup
 from plinth.modules import first_boot
-from plinth.utils import is_user_admin
+from plinth.utils import is_user_admin, reverse_cached
 
 LOGGER = logging.getLogger(__name__)
 
@@ -25,12 +25,13 @@ class FirstBootMiddleware(MiddlewareMixin):
         """Handle a request as Django middleware request handler."""
         # Don't interfere with login page
         user_requests_login = request.path.startswith(
-            reverse(settings.LOGIN_URL))
+            reverse_cached(settings.LOGIN_URL))
         if user_requests_login:
             return
 
         # Don't interfere with help pages
-        user_requests_help = request.path.startswith(reverse('help:index'))
+        user_requests_help = request.path.startswith(
+            reverse_cached('help:index'))
         if user_requests_help:
             return
 
@@ -47,7 +48,8 @@ class FirstBootMiddleware(MiddlewareMixin):
         # If user requests a step other than the welcome step, verify that they
         # indeed completed the secret verification by looking at the session.
         if (user_requests_firstboot and
-                not request.path.startswith(reverse('first_boot:welcome')) and
+                not request.path.startswith(
+                    reverse_cached('first_boot:welcome')) and
                 first_boot.firstboot_wizard_secret_exists() and
                 not request.session.get('firstboot_secret_provided', False) and
                 not is_user_admin(request)):
@@ -3,8 +3,11 @@
 FreedomBox app to configure Gitweb.
 """
 
-import json
+import configparser
+import datetime
+import logging
 import os
+import threading
 
 from django.utils.translation import gettext_lazy as _
 
@@ -17,9 +20,10 @@ from plinth.modules.backups.components import BackupRestore
 from plinth.modules.firewall.components import Firewall
 from plinth.modules.users.components import UsersAndGroups
 from plinth.package import Packages
+from plinth.utils import import_from_gi
 
 from . import manifest
-from .forms import is_repo_url
+from .forms import get_name_from_url, is_repo_url
 from .manifest import GIT_REPO_PATH
 
 _description = [
@@ -35,6 +39,15 @@ _description = [
 ]
 
 
+logger = logging.getLogger(__name__)
+
+# Information about repositories by directory name. It is built on first use
+# and kept up-to-date by monitoring the repository directories.
+_repo_index = None
+_repo_index_lock = threading.RLock()
+_monitors = {}
+
+
 class GitwebApp(app_module.App):
     """FreedomBox app for Gitweb."""
 
@@ -96,6 +109,7 @@ class GitwebApp(app_module.App):
     def post_init(self):
         """Perform post initialization operations."""
         if not self.needs_setup():
+            _start_monitoring()
             self.update_service_access()
 
     def set_shortcut_login_required(self, login_required):
@@ -131,6 +145,7 @@ class GitwebApp(app_module.App):
         super().setup(old_version)
         actions.superuser_run('gitweb', ['setup'])
         self.enable()
+        _start_monitoring()
 
 
 class GitwebWebserverAuth(Webserver):
@@ -188,50 +203,220 @@ def create_repo(repo, repo_description, owner, is_private):
         # start cloning in background
         actions.superuser_run('gitweb', args + ['--skip-prepare'],
                               run_in_background=True)
+        _update_repo_index(get_name_from_url(repo))
     else:
         args = ['create-repo', '--name', repo] + args
         actions.superuser_run('gitweb', args)
+        _update_repo_index(repo)
 
 
 def get_repo_list():
     """List all git repositories."""
-    repos = []
-    if os.path.exists(GIT_REPO_PATH):
-        for repo in os.listdir(GIT_REPO_PATH):
-            if not repo.endswith('.git') or repo.startswith('.'):
-                continue
-
-            repo_info = {}
-            repo_info['name'] = repo[:-4]
-
-            private_file = os.path.join(GIT_REPO_PATH, repo, 'private')
-            if os.path.exists(private_file):
-                repo_info['access'] = 'private'
-            else:
-                repo_info['access'] = 'public'
-
-            progress_file = os.path.join(GIT_REPO_PATH, repo, 'clone_progress')
-            if os.path.exists(progress_file):
-                with open(progress_file, encoding='utf-8') as file_handle:
-                    clone_progress = file_handle.read()
-                    repo_info['clone_progress'] = clone_progress
+    with _repo_index_lock:
+        if _repo_index is None or not _monitors:
+            # Without monitoring, the index can't be trusted to be current
+            _build_repo_index()
 
-            repos.append(repo_info)
+        repos = [dict(repo) for repo in _repo_index.values()]
 
     return sorted(repos, key=lambda repo: repo['name'])
 
 
 def repo_info(repo):
     """Get information about repository."""
-    output = actions.run('gitweb', ['repo-info', '--name', repo])
-    info = json.loads(output)
-    if info['access'] == 'private':
-        info['is_private'] = True
+    for info in get_repo_list():
+        if info['name'] == repo:
+            break
+    else:
+        raise ActionError('gitweb', '', 'Repository not found')
+
+    return {
+        'name': info['name'],
+        'description': info['description'],
+        'owner': info['owner'],
+        'is_private': info['access'] == 'private',
+        'default_branch': info['default_branch'],
+    }
+
+
+def _build_repo_index():
+    """Read information about all the repositories."""
+    global _repo_index
+    with _repo_index_lock:
+        _repo_index = {}
+        if os.path.exists(GIT_REPO_PATH):
+            for repo in os.listdir(GIT_REPO_PATH):
+                _update_repo_index_entry(repo)
+
+
+def _update_repo_index(name):
+    """Update the index after a repository has been changed by us."""
+    if not name.endswith('.git'):
+        name = name + '.git'
+
+    with _repo_index_lock:
+        if _repo_index is not None:
+            _update_repo_index_entry(name)
+
+
+def _update_repo_index_entry(repo):
+    """Read information about a repository given its directory name."""
+    repo_path = os.path.join(GIT_REPO_PATH, repo)
+    if repo.endswith('.git') and not repo.startswith('.') and \
+       os.path.isdir(repo_path):
+        try:
+            _repo_index[repo] = _get_repo_info(repo)
+        except OSError:
+            # Repository is being removed or is not readable
+            _repo_index.pop(repo, None)
+        else:
+            _monitor_repo(repo)
+            return
+
+    _repo_index.pop(repo, None)
+    monitor = _monitors.pop(repo, None)
+    if monitor:
+        monitor.cancel()
+
+
+def _get_repo_info(repo):
+    """Return information about a repository read from its directory."""
+    repo_path = os.path.join(GIT_REPO_PATH, repo)
+    repo_info = {'name': repo[:-4]}
+
+    private_file = os.path.join(repo_path, 'private')
+    if os.path.exists(private_file):
+        repo_info['access'] = 'private'
     else:
-        info['is_private'] = False
-    del info['access']
+        repo_info['access'] = 'public'
+
+    progress_file = os.path.join(repo_path, 'clone_progress')
+    if os.path.exists(progress_file):
+        with open(progress_file, encoding='utf-8') as file_handle:
+            repo_info['clone_progress'] = file_handle.read()
+
+    description_file = os.path.join(repo_path, 'description')
+    repo_info['description'] = ''
+    if os.path.exists(description_file):
+        with open(description_file, encoding='utf-8') as file_handle:
+            repo_info['description'] = file_handle.read()
+
+    config = configparser.ConfigParser(strict=False)
+    config.read(os.path.join(repo_path, 'config'))
+    repo_info['owner'] = config.get('gitweb', 'owner', fallback='')
+
+    repo_info['default_branch'] = ''
+    head_file = os.path.join(repo_path, 'HEAD')
+    if os.path.exists(head_file):
+        with open(head_file, encoding='utf-8') as file_handle:
+            head = file_handle.read().strip()
+
+        if head.startswith('ref: refs/heads/'):
+            repo_info['default_branch'] = head[len('ref: refs/heads/'):]
+
+    repo_info['size'] = _get_pack_size(repo_path)
+    repo_info['last_push'] = _get_last_push_time(repo_path)
+    return repo_info
+
+
+def _get_pack_size(repo_path):
+    """Return the size of the pack files of a repository.
+
+    Pushed objects are stored in packs. Loose objects, which are usually few,
+    are not counted to avoid walking the object directories.
+
+    """
+    size = 0
+    pack_path = os.path.join(repo_path, 'objects', 'pack')
+    try:
+        entries = list(os.scandir(pack_path))
+    except FileNotFoundError:
+        return size
 
-    return info
+    for entry in entries:
+        try:
+            size += entry.stat(follow_symlinks=False).st_size
+        except FileNotFoundError:
+            pass
+
+    return size
+
+
+def _get_last_push_time(repo_path):
+    """Return the time when references of a repository were last updated.
+
+    Updating a reference replaces its file, which changes the modification
+    time of the directory containing it. Only the common reference
+    directories are checked instead of every reference.
+
+    """
+    last_push = None
+    for path in ('packed-refs', 'refs', 'refs/heads', 'refs/tags'):
+        try:
+            modified_time = os.stat(os.path.join(repo_path, path)).st_mtime
+        except FileNotFoundError:
+            continue
+
+        last_push = max(last_push or modified_time, modified_time)
+
+    if last_push is None:
+        return None
+
+    return datetime.datetime.fromtimestamp(last_push, datetime.timezone.utc)
+
+
+def _start_monitoring():
+    """Keep the repository index up-to-date by monitoring for changes.
+
+    The root directory is monitored for repositories being added, removed and
+    renamed. Each repository directory is monitored for changes to its
+    settings. Pushes update files inside subdirectories and are not noticed,
+    so the size and last push time of a repository may be out-of-date.
+
+    """
+    if None in _monitors:
+        return
+
+    try:
+        gio = import_from_gi('Gio', '2.0')
+        root = gio.File.new_for_path(GIT_REPO_PATH)
+        monitor = root.monitor_directory(gio.FileMonitorFlags.WATCH_MOVES,
+                                         None)
+    except Exception as exception:
+        logger.warning('Unable to monitor git repositories: %s', exception)
+        return
+
+    monitor.connect('changed', _on_directory_changed, None)
+    with _repo_index_lock:
+        _monitors[None] = monitor
+        _build_repo_index()
+
+
+def _monitor_repo(repo):
+    """Start monitoring a repository directory for changes."""
+    if None not in _monitors or repo in _monitors:
+        return
+
+    gio = import_from_gi('Gio', '2.0')
+    directory = gio.File.new_for_path(os.path.join(GIT_REPO_PATH, repo))
+    monitor = directory.monitor_directory(gio.FileMonitorFlags.NONE, None)
+    monitor.connect('changed', _on_directory_changed, repo)
+    _monitors[repo] = monitor
+
+
+def _on_directory_changed(_monitor, file, other_file, _event_type, repo):
+    """Update the index when a repository directory changes."""
+    with _repo_index_lock:
+        if _repo_index is None:
+            return
+
+        if repo:
+            _update_repo_index_entry(repo)
+            return
+
+        _update_repo_index_entry(file.get_basename())
+        if other_file:  # Repository renamed
+            _update_repo_index_entry(other_file.get_basename())
 
 
 def _rename_repo(oldname, newname):
@@ -282,6 +467,7 @@ def edit_repo(form_initial, form_cleaned):
 
     if form_cleaned['name'] != repo:
         _rename_repo(repo, form_cleaned['name'])
+        _update_repo_index(repo)
         repo = form_cleaned['name']
 
     if form_cleaned['description'] != form_initial['description']:
@@ -299,7 +485,10 @@ def edit_repo(form_initial, form_cleaned):
     if form_cleaned['default_branch'] != form_initial['default_branch']:
         _set_default_branch(repo, form_cleaned['default_branch'])
 
+    _update_repo_index(repo)
+
 
 def delete_repo(repo):
     """Delete a repository."""
     actions.superuser_run('gitweb', ['delete-repo', '--name', repo])
+    _update_repo_index(repo)
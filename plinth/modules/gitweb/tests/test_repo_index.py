@@ -0,0 +1,48 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for the gitweb repository index.
+"""
+
+import datetime
+import os
+from unittest.mock import patch
+
+from plinth.modules import gitweb
+
+
+def test_get_repo_info(tmp_path):
+    """Test reading information about a repository from its directory."""
+    repo_path = tmp_path / 'test.git'
+    (repo_path / 'objects' / 'pack').mkdir(parents=True)
+    (repo_path / 'objects' / 'pack' / 'pack-1.pack').write_bytes(b'x' * 100)
+    (repo_path / 'objects' / 'pack' / 'pack-1.idx').write_bytes(b'x' * 10)
+    (repo_path / 'refs' / 'heads').mkdir(parents=True)
+    (repo_path / 'HEAD').write_text('ref: refs/heads/main\n')
+    (repo_path / 'description').write_text('Test repository')
+    (repo_path / 'private').touch()
+    os.utime(repo_path / 'refs', (100, 100))
+    os.utime(repo_path / 'refs' / 'heads', (200, 200))
+
+    with patch('plinth.modules.gitweb.GIT_REPO_PATH', str(tmp_path)):
+        repo_info = gitweb._get_repo_info('test.git')
+
+    assert repo_info == {
+        'name': 'test',
+        'access': 'private',
+        'description': 'Test repository',
+        'owner': '',
+        'default_branch': 'main',
+        'size': 110,
+        'last_push': datetime.datetime(1970, 1, 1, 0, 3, 20,
+                                       tzinfo=datetime.timezone.utc),
+    }
+
+
+def test_get_repo_info_empty(tmp_path):
+    """Test reading information about a repository without any pushes."""
+    (tmp_path / 'test.git').mkdir()
+    with patch('plinth.modules.gitweb.GIT_REPO_PATH', str(tmp_path)):
+        repo_info = gitweb._get_repo_info('test.git')
+
+    assert repo_info['size'] == 0
+    assert repo_info['last_push'] is None
@@ -73,11 +73,7 @@ def gitweb_patch():
             patch('plinth.app.App.get') as app_get, \
             patch('plinth.actions.superuser_run', side_effect=action_run), \
             patch('plinth.actions.run', side_effect=action_run):
-        get_repo_list.return_value = [{
-            'name': EXISTING_REPOS[0]['name']
-        }, {
-            'name': EXISTING_REPOS[1]['name']
-        }]
+        get_repo_list.return_value = EXISTING_REPOS
         app = Mock()
         app_get.return_value = app
         app.update_service_access.return_value = None
@@ -102,14 +98,21 @@ def test_repos_view(rf):
         view = views.GitwebAppView.as_view()
         response, _ = make_request(rf.get(''), view)
 
-        assert response.context_data['repos'] == [{
-            'name': EXISTING_REPOS[0]['name']
-        }, {
-            'name': EXISTING_REPOS[1]['name']
-        }]
+        assert response.context_data['repos'] == EXISTING_REPOS
         assert response.status_code == 200
 
 
+def test_repos_view_search(rf):
+    """Test that repo list is filtered by search query."""
+    with patch('plinth.views.AppView.get_context_data',
+               return_value={'is_enabled': True}):
+        view = views.GitwebAppView.as_view()
+        response, _ = make_request(rf.get('', {'q': 'THING2'}), view)
+
+        assert response.context_data['repos'] == [EXISTING_REPOS[1]]
+        assert response.context_data['query'] == 'THING2'
+
+
 def test_create_repo_view(rf):
     """Test that repo create view sends correct success message."""
     form_data = {
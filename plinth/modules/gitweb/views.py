@@ -5,6 +5,7 @@ Django views for Gitweb.
 
 from django.contrib import messages
 from django.contrib.messages.views import SuccessMessageMixin
+from django.core.paginator import Paginator
 from django.http import Http404
 from django.shortcuts import redirect
 from django.template.response import TemplateResponse
@@ -20,6 +21,8 @@ from plinth.modules import gitweb
 
 from .forms import CreateRepoForm, EditRepoForm
 
+REPOS_PER_PAGE = 50
+
 
 class GitwebAppView(views.AppView):
     """Serve configuration page."""
@@ -28,15 +31,32 @@ class GitwebAppView(views.AppView):
     template_name = 'gitweb_configure.html'
 
     def get_context_data(self, *args, **kwargs):
-        """Add repositories to the context data."""
+        """Add a page of repositories matching the search to context data."""
         context = super().get_context_data(*args, **kwargs)
         repos = gitweb.get_repo_list()
-        context['repos'] = repos
         context['cloning'] = any('clone_progress' in repo for repo in repos)
         context['refresh_page_sec'] = 3 if context['cloning'] else None
+
+        query = self.request.GET.get('q', '').strip()
+        if query:
+            repos = [repo for repo in repos if _repo_matches(repo, query)]
+
+        paginator = Paginator(repos, REPOS_PER_PAGE)
+        page = paginator.get_page(self.request.GET.get('page'))
+        context['repos'] = page.object_list
+        context['page_obj'] = page
+        context['query'] = query
         return context
 
 
+def _repo_matches(repo, query):
+    """Return whether a repository matches a search query."""
+    query = query.lower()
+    return any(
+        query in repo.get(field, '').lower()
+        for field in ('name', 'description', 'owner'))
+
+
 class CreateRepoView(SuccessMessageMixin, FormView):
     """View to create a new repository."""
 
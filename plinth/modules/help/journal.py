@@ -0,0 +1,240 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Read entries from the systemd journal using a privileged action.
+"""
+
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+
+from plinth import actions
+from plinth.errors import ActionError
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of clients following the journal at the same time. Each of
+# them keeps a web server thread busy.
+MAX_FOLLOWERS = 3
+
+# Maximum number of new entries waiting to be sent to a slow client
+MAX_QUEUED_ENTRIES = 1000
+
+# Seconds to wait for the privileged process to answer a request
+REQUEST_TIMEOUT = 30
+
+# Seconds after which the privileged process is stopped if not used
+IDLE_TIMEOUT = 300
+
+
+class TooManyFollowersError(Exception):
+    """Raised when the journal is already followed by too many clients."""
+
+
+def get_entries(units=None, priority=7, before_cursor=None,
+                after_cursor=None, lines=100):
+    """Return journal entries, oldest first.
+
+    By default, the latest entries are returned. With before_cursor, the
+    entries just before the one with the given cursor are returned for paging
+    backwards. With after_cursor, the entries just after it are returned.
+
+    """
+    return reader.get_entries(units, priority, before_cursor, after_cursor,
+                              lines)
+
+
+def get_unit_name(unit):
+    """Return the full name of a systemd unit as recorded in the journal."""
+    return unit if '.' in unit else unit + '.service'
+
+
+def entry_matches(entry, units=None, priority=7):
+    """Return whether an entry matches the given filters."""
+    if units and entry['unit'] not in {get_unit_name(unit) for unit in units}:
+        return False
+
+    return entry['priority'] <= priority
+
+
+class JournalReader:
+    """Share a single privileged process reading the journal.
+
+    The process prints new journal entries as they are written and answers
+    requests for older entries sent to it one at a time. New entries are put
+    in a queue for each following client which does its own filtering. None
+    is put in the queues if the process exits unexpectedly.
+
+    The process is started when first needed and is stopped once nobody
+    follows the journal and no requests have been made for IDLE_TIMEOUT
+    seconds.
+
+    """
+
+    def __init__(self):
+        """Initialize the reader."""
+        self._lock = threading.Lock()
+        self._request_lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._responses = queue.Queue()
+        self._queues = set()
+        self._process = None
+        self._last_used_time = 0
+        self._stop_timer = None
+
+    def follow(self):
+        """Return a new queue receiving new journal entries."""
+        with self._lock:
+            if len(self._queues) >= MAX_FOLLOWERS:
+                raise TooManyFollowersError()
+
+            entries = queue.Queue(maxsize=MAX_QUEUED_ENTRIES)
+            self._queues.add(entries)
+            self._get_process()
+
+        return entries
+
+    def unfollow(self, entries):
+        """Stop sending new entries to a queue."""
+        with self._lock:
+            self._queues.discard(entries)
+            self._last_used_time = time.monotonic()
+
+    def get_entries(self, units=None, priority=7, before_cursor=None,
+                    after_cursor=None, lines=100):
+        """Return journal entries read by the privileged process.
+
+        Raise ActionError if the request is invalid, such as with an unknown
+        cursor, or the process does not answer.
+
+        """
+        request_id = next(self._request_ids)
+        request = {
+            'id': request_id,
+            'units': units or [],
+            'priority': priority,
+            'before_cursor': before_cursor,
+            'after_cursor': None if before_cursor else after_cursor,
+            'lines': lines
+        }
+        with self._request_lock:
+            with self._lock:
+                process = self._get_process()
+
+            try:
+                process.stdin.write(json.dumps(request).encode() + b'\n')
+                process.stdin.flush()
+            except (OSError, ValueError):
+                raise ActionError('help', '', 'Journal reader is not running')
+
+            response = self._get_response(request_id)
+
+        if 'error' in response:
+            raise ActionError('help', '', response['error'])
+
+        return response['entries']
+
+    def _get_response(self, request_id):
+        """Wait for the response to a request."""
+        end_time = time.monotonic() + REQUEST_TIMEOUT
+        while True:
+            try:
+                response = self._responses.get(
+                    timeout=max(end_time - time.monotonic(), 0))
+            except queue.Empty:
+                raise ActionError('help', '', 'Journal reader did not answer')
+
+            if response is None:
+                raise ActionError('help', '', 'Journal reader exited')
+
+            if response.get('id') == request_id:
+                return response
+
+            # Late response to an earlier request that timed out
+
+    def _get_process(self):
+        """Return the privileged process, starting it if necessary."""
+        self._last_used_time = time.monotonic()
+        if not self._process:
+            self._start()
+
+        return self._process
+
+    def _start(self):
+        """Start the privileged process and read from it in threads."""
+        self._process = actions.superuser_run('help', ['serve-logs'],
+                                              run_in_background=True)
+        self._responses = queue.Queue()
+        threading.Thread(target=self._read,
+                         args=(self._process, self._responses),
+                         daemon=True).start()
+        threading.Thread(target=self._log_errors, args=(self._process, ),
+                         daemon=True).start()
+        self._schedule_stop(IDLE_TIMEOUT)
+
+    def _schedule_stop(self, delay):
+        """Check after a delay whether the process is no longer used."""
+        if self._stop_timer:
+            self._stop_timer.cancel()
+
+        self._stop_timer = threading.Timer(delay, self._stop_if_idle)
+        self._stop_timer.daemon = True
+        self._stop_timer.start()
+
+    def _stop_if_idle(self):
+        """Stop the privileged process if it has not been used for a while."""
+        with self._lock:
+            if not self._process:
+                return
+
+            idle_time = time.monotonic() - self._last_used_time
+            if self._queues or self._request_lock.locked() or \
+               idle_time < IDLE_TIMEOUT:
+                self._schedule_stop(max(IDLE_TIMEOUT - idle_time, 1))
+                return
+
+            self._process.stdin.close()
+            self._process.terminate()
+            self._process = None
+
+    def _read(self, process, responses):
+        """Read output of the process and distribute entries to queues."""
+        for line in process.stdout:
+            message = json.loads(line)
+            if 'entry' not in message:
+                responses.put(message)
+                continue
+
+            with self._lock:
+                for entries in self._queues:
+                    try:
+                        entries.put_nowait(message['entry'])
+                    except queue.Full:
+                        pass  # Client is not keeping up, drop the entry
+
+        process.wait()
+        responses.put(None)
+        with self._lock:
+            if self._process is not process:
+                return  # Stopped as requested
+
+            logger.warning('Journal reader exited with code %s',
+                           process.returncode)
+            self._process = None
+            for entries in self._queues:
+                try:
+                    entries.put_nowait(None)
+                except queue.Full:
+                    pass
+
+    @staticmethod
+    def _log_errors(process):
+        """Log errors of the process so that it does not block writing."""
+        for line in process.stderr:
+            logger.warning('Journal reader: %s',
+                           line.decode(errors='replace').rstrip())
+
+
+reader = JournalReader()
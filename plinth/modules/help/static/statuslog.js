@@ -0,0 +1,110 @@
+// SPDX-License-Identifier: AGPL-3.0-or-later
+/**
+ * @licstart The following is the entire license notice for the JavaScript
+ * code in this page.
+ *
+ * This file is part of FreedomBox.
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU Affero General Public License as
+ * published by the Free Software Foundation, either version 3 of the
+ * License, or (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU Affero General Public License for more details.
+ *
+ * You should have received a copy of the GNU Affero General Public License
+ * along with this program.  If not, see <http://www.gnu.org/licenses/>.
+ *
+ * @licend The above is the entire license notice for the JavaScript code
+ * in this page.
+ */
+
+/*
+ * Page backwards through older status log entries and show new entries as
+ * they are logged using server-sent events. Without JavaScript, the latest
+ * entries are shown.
+ */
+(function($) {
+    var log = $('.status-log');
+    if (!log.length) {
+        return;
+    }
+
+    var query = log.data('query');
+    var cursors = new Set();
+    var source = null;
+
+    log.find('.status-log-entry').each(function() {
+        cursors.add($(this).data('cursor'));
+    });
+
+    function getUrl(url, cursorParam, cursor) {
+        var params = new URLSearchParams(query);
+        if (cursor) {
+            params.set(cursorParam, cursor);
+        }
+
+        return url + '?' + params.toString();
+    }
+
+    function createEntry(entry) {
+        cursors.add(entry.cursor);
+        return $('<span class="status-log-entry">')
+            .attr('data-cursor', entry.cursor)
+            .text(entry.time + ' ' + entry.identifier + ': ' +
+                  entry.message + '\n');
+    }
+
+    function clearEmpty() {
+        if (!log.find('.status-log-entry').length) {
+            log.empty();
+        }
+    }
+
+    $('#status-log-older').removeClass('d-none').on('click', function() {
+        var button = $(this);
+        var first = log.find('.status-log-entry').first().data('cursor');
+        button.prop('disabled', true);
+        $.getJSON(getUrl(log.data('entries-url'), 'before', first))
+            .done(function(data) {
+                clearEmpty();
+                var entries = data.entries.filter(function(entry) {
+                    return !cursors.has(entry.cursor);
+                });
+                log.prepend(entries.map(createEntry));
+                button.prop('disabled', entries.length === 0);
+            })
+            .fail(function() {
+                button.prop('disabled', false);
+            });
+    });
+
+    $('.status-log-follow').removeClass('d-none');
+    $('#status-log-follow').on('change', function() {
+        if (source) {
+            source.close();
+            source = null;
+        }
+
+        if (!this.checked) {
+            return;
+        }
+
+        var last = log.find('.status-log-entry').last().data('cursor');
+        source = new EventSource(
+            getUrl(log.data('stream-url'), 'after', last));
+        source.onmessage = function(event) {
+            var entry = JSON.parse(event.data);
+            if (cursors.has(entry.cursor)) {
+                return;
+            }
+
+            clearEmpty();
+            log.append(createEntry(entry));
+            window.scrollTo(0, document.body.scrollHeight);
+        };
+    });
+})(jQuery);
@@ -0,0 +1,90 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for reading the journal with a shared privileged process.
+"""
+
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from plinth.errors import ActionError
+from plinth.modules.help import journal
+
+# Stands in for the 'serve-logs' action. Writes plenty to stderr first to
+# ensure that it is read.
+FAKE_ACTION = '''
+import json
+import sys
+
+sys.stderr.write('x' * 100000 + '\\n')
+sys.stderr.flush()
+print(json.dumps({'entry': {'cursor': 'c1'}}), flush=True)
+for line in sys.stdin:
+    request = json.loads(line)
+    if request['after_cursor'] == 'invalid':
+        response = {'id': request['id'], 'error': 'Invalid cursor'}
+    else:
+        response = {'id': request['id'], 'entries': [request]}
+
+    print(json.dumps(response), flush=True)
+'''
+
+
+@pytest.fixture(name='superuser_run')
+def fixture_superuser_run():
+    """Run a fake action instead of the privileged action."""
+
+    def _run(*args, **kwargs):
+        return subprocess.Popen([sys.executable, '-c', FAKE_ACTION],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+
+    with patch('plinth.actions.superuser_run',
+               side_effect=_run) as superuser_run, \
+            patch('plinth.modules.help.journal.logger'), \
+            patch('plinth.modules.help.journal.REQUEST_TIMEOUT', 10):
+        yield superuser_run
+
+
+def test_get_entries(superuser_run):
+    """Test that requests are answered by a single process."""
+    reader = journal.JournalReader()
+    entries = reader.get_entries(['plinth'], 4, after_cursor='c0', lines=10)
+    assert entries == [{
+        'id': 0,
+        'units': ['plinth'],
+        'priority': 4,
+        'before_cursor': None,
+        'after_cursor': 'c0',
+        'lines': 10
+    }]
+
+    entries = reader.get_entries(before_cursor='c2')
+    assert entries[0]['before_cursor'] == 'c2'
+    superuser_run.assert_called_once_with('help', ['serve-logs'],
+                                          run_in_background=True)
+
+    with pytest.raises(ActionError):
+        reader.get_entries(after_cursor='invalid')
+
+    reader._last_used_time = 0
+    reader._stop_if_idle()
+    assert reader._process is None
+
+
+def test_follow(superuser_run):
+    """Test that new entries are sent to followers."""
+    reader = journal.JournalReader()
+    entries = reader.follow()
+    assert entries.get(timeout=10) == {'cursor': 'c1'}
+
+    reader._last_used_time = 0
+    reader._stop_if_idle()
+    assert reader._process is not None
+
+    reader.unfollow(entries)
+    reader._last_used_time = 0
+    reader._stop_if_idle()
+    assert reader._process is None
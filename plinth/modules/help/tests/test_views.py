@@ -5,8 +5,6 @@ Design: - Make tests independent from URL policy by using Django names instead
           of URLs to call the help module. For this, some additional fixture
           work is needed: pytestmark and fixture_app_urls().
 
-Pending: - status log
-
 """
 
 import json
@@ -20,6 +18,7 @@ from django.conf import settings
 from django.http import Http404
 
 from plinth import module_loader
+from plinth.errors import ActionError
 from plinth.modules.help import views
 
 # For all tests, use plinth.urls instead of urls configured for testing
@@ -304,7 +303,105 @@ def test_download_full_manual_file(rf, tmp_path):
         response = views.download_manual(request)
         assert response.status_code == 200
         file = tmp_path / (name + '.pdf')
-        file.write_bytes(response.content)
+        file.write_bytes(response.getvalue())
 
     _diff('fallback.pdf', 'unspecified.pdf', same=True)
     _diff('fallback.pdf', 'translated.pdf', same=False)
+
+
+def test_download_manual_range(rf, tmp_path):
+    """Test conditional and partial downloads of the manual."""
+    manual_file = tmp_path / 'manual' / 'en' / 'freedombox-manual.pdf'
+    manual_file.parent.mkdir(parents=True)
+    manual_file.write_bytes(b'0123456789')
+    url = urls.reverse('help:download-manual')
+    with patch('plinth.cfg.doc_dir', str(tmp_path)):
+        response = views.download_manual(rf.get(url))
+        assert response.status_code == 200
+        assert response['Accept-Ranges'] == 'bytes'
+        assert response.getvalue() == b'0123456789'
+
+        etag = response['ETag']
+        response = views.download_manual(
+            rf.get(url, HTTP_IF_NONE_MATCH=etag))
+        assert response.status_code == 304
+
+        response = views.download_manual(rf.get(url, HTTP_RANGE='bytes=2-4'))
+        assert response.status_code == 206
+        assert response['Content-Range'] == 'bytes 2-4/10'
+        assert response.getvalue() == b'234'
+
+        response = views.download_manual(rf.get(url, HTTP_RANGE='bytes=-3'))
+        assert response.getvalue() == b'789'
+
+        response = views.download_manual(
+            rf.get(url, HTTP_RANGE='bytes=2-', HTTP_IF_RANGE='"old"'))
+        assert response.status_code == 200
+
+        response = views.download_manual(rf.get(url, HTTP_RANGE='bytes=20-'))
+        assert response.status_code == 416
+        assert response['Content-Range'] == 'bytes */10'
+
+
+@patch('plinth.modules.help.views.is_user_admin')
+@patch('plinth.modules.help.journal.get_entries')
+def test_status_log_non_admin(get_entries, is_user_admin, rf):
+    """Test that non-admin users only get the log of this web interface."""
+    is_user_admin.return_value = False
+    get_entries.return_value = []
+    request = rf.get(urls.reverse('help:status-log'), {
+        'app': 'test-app',
+        'priority': '4'
+    })
+    response = views.status_log(request)
+    assert response.status_code == 200
+    get_entries.assert_called_once_with(['plinth'], 4, lines=100)
+
+
+@patch('plinth.modules.help.journal.reader')
+@patch('plinth.modules.help.journal.get_entries')
+def test_status_log_stream(get_entries, reader):
+    """Test that streamed entries are filtered and not repeated."""
+    entry1 = {
+        'cursor': 'c1',
+        'timestamp': 0,
+        'unit': 'plinth.service',
+        'identifier': 'plinth',
+        'priority': 6,
+        'message': 'message1'
+    }
+    entry2 = dict(entry1, cursor='c2', message='message2')
+    entry3 = dict(entry1, cursor='c3', unit='other.service')
+    get_entries.return_value = [entry1]
+    entries = reader.follow.return_value
+    entries.get.side_effect = [entry1, entry3, entry2, None]
+
+    events = list(
+        views._stream_status_log(entries, ['plinth'], 7, after_cursor='c0'))
+    assert [event.splitlines()[0] for event in events] == ['id: c1', 'id: c2']
+
+
+@pytest.mark.django_db
+@patch('plinth.modules.help.journal.reader')
+def test_status_log_stream_closed(reader, rf):
+    """Test that following stops when the response is closed."""
+    entries = reader.follow.return_value
+    request = rf.get(urls.reverse('help:status-log-stream'))
+    response = views.status_log_stream(request)
+    assert response.status_code == 200
+    response.close()
+    reader.unfollow.assert_called_once_with(entries)
+
+    reader.follow.side_effect = views.journal.TooManyFollowersError
+    response = views.status_log_stream(request)
+    assert response.status_code == 503
+
+
+@patch('plinth.modules.help.journal.get_entries')
+def test_status_log_entries_invalid_cursor(get_entries, rf):
+    """Test that an invalid cursor is a bad request."""
+    get_entries.side_effect = ActionError('help', '', 'Invalid cursor')
+    request = rf.get(urls.reverse('help:status-log-entries'),
+                     {'after': 'invalid'})
+    response = views.status_log_entries(request)
+    assert response.status_code == 400
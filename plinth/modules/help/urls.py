@@ -26,4 +26,10 @@ urlpatterns = [
             name='download-manual'),
     re_path(r'^help/status-log/$', non_admin_view(views.status_log),
             name='status-log'),
+    re_path(r'^help/status-log/entries/$',
+            non_admin_view(views.status_log_entries),
+            name='status-log-entries'),
+    re_path(r'^help/status-log/stream/$',
+            non_admin_view(views.status_log_stream),
+            name='status-log-stream'),
 ]
@@ -3,23 +3,58 @@
 Help app for FreedomBox.
 """
 
+import collections
+import datetime
 import gzip
 import json
 import mimetypes
 import os
 import pathlib
+import queue
+import re
+import threading
+import time
 
 import apt
 import requests
-from django.core.files.base import File
-from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseBadRequest, HttpResponseRedirect,
+                         JsonResponse, StreamingHttpResponse)
 from django.template.response import TemplateResponse
 from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.utils.translation import get_language_from_request
 from django.utils.translation import gettext as _
+from django.views.decorators.gzip import gzip_page
 
-from plinth import __version__, actions, cfg
+from plinth import __version__
+from plinth import app as app_module
+from plinth import cfg
+from plinth.daemon import Daemon, RelatedDaemon
+from plinth.errors import ActionError
 from plinth.modules.upgrades import views as upgrades_views
+from plinth.utils import is_user_admin
+
+from . import journal
+
+# Number of journal entries shown at once in the status log
+STATUS_LOG_LINES = 100
+
+# Duration after which a status log stream is closed for the browser to
+# reconnect. Keeps web server threads from being held up indefinitely.
+STATUS_LOG_STREAM_DURATION = 60
+
+STATUS_LOG_HEARTBEAT_INTERVAL = 15
+
+# Number of manual pages kept in memory
+MANUAL_PAGE_CACHE_SIZE = 32
+
+# Manual pages by file path, least recently used first
+_manual_page_cache = collections.OrderedDict()
+_manual_page_cache_lock = threading.Lock()
+
+RANGE_CHUNK_SIZE = 64 * 1024
 
 
 def index(request):
@@ -101,6 +136,7 @@ def about(request):
     return TemplateResponse(request, 'help_about.html', context)
 
 
+@gzip_page
 def manual(request, lang=None, page=None):
     """Serve the manual page from the 'doc' directory"""
     if not lang or lang == '-':
@@ -111,20 +147,17 @@ def manual(request, lang=None, page=None):
 
         return HttpResponseRedirect(reverse('help:manual', kwargs=kwargs))
 
-    def read_file(lang, file_name):
-        """Read the page from disk and return contents or None."""
-        page_file = pathlib.Path(cfg.doc_dir) / 'manual' / lang / file_name
-        return page_file.read_text() if page_file.exists() else None
-
     page = page or 'freedombox-manual'
-    content = read_file(lang, f'{page}.part.html')
-    if not content:
+    page_file = pathlib.Path(cfg.doc_dir, 'manual', lang, f'{page}.part.html')
+    manual_page = _read_manual_page(page_file)
+    if not manual_page:
         if lang != 'en':
             return HttpResponseRedirect(
                 reverse('help:manual-page', kwargs=dict(lang='en', page=page)))
 
         raise Http404
 
+    content, _modified_time = manual_page
     return TemplateResponse(
         request, 'help_manual.html', {
             'title': _('{box_name} Manual').format(box_name=_(cfg.box_name)),
@@ -132,6 +165,34 @@ def manual(request, lang=None, page=None):
         })
 
 
+def _read_manual_page(page_file):
+    """Return the contents and modified time of a manual page or None.
+
+    Pages are kept in memory and read again from disk only if modified.
+
+    """
+    try:
+        modified_time = page_file.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    key = str(page_file)
+    with _manual_page_cache_lock:
+        cached = _manual_page_cache.get(key)
+        if cached and cached[1] == modified_time:
+            _manual_page_cache.move_to_end(key)
+            return cached
+
+    manual_page = (page_file.read_text(), modified_time)
+    with _manual_page_cache_lock:
+        _manual_page_cache[key] = manual_page
+        _manual_page_cache.move_to_end(key)
+        while len(_manual_page_cache) > MANUAL_PAGE_CACHE_SIZE:
+            _manual_page_cache.popitem(last=False)
+
+    return manual_page
+
+
 def download_manual(request):
     """Serve the PDF version of the manual from the 'doc' directory"""
     language_code = get_language_from_request(request)
@@ -151,18 +212,253 @@ def download_manual(request):
     if not manual_file_name:
         raise Http404
 
-    (content_type, encoding) = mimetypes.guess_type(manual_file_name)
+    return _serve_file(request, manual_file_name)
 
-    with open(manual_file_name, 'rb') as file_handle:
-        response = HttpResponse(File(file_handle), content_type=content_type)
-        if encoding:
-            response['Content-Encoding'] = encoding
 
+def _serve_file(request, file_name):
+    """Serve a file supporting conditional and range requests.
+
+    Whole files are served with FileResponse which lets the web server use
+    sendfile() if it is able to. A single range of bytes can be requested to
+    resume an interrupted download.
+
+    """
+    (content_type, encoding) = mimetypes.guess_type(file_name)
+    stat = os.stat(file_name)
+    size = stat.st_size
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=last_modified)
+    if response:
+        return response
+
+    byte_range = _get_byte_range(request, etag, last_modified, size)
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
         return response
 
+    file_handle = open(file_name, 'rb')  # Closed by response
+    if byte_range:
+        start, end = byte_range
+        file_handle.seek(start)
+        response = StreamingHttpResponse(
+            _read_file_range(file_handle, end - start + 1),
+            content_type=content_type, status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    else:
+        response = FileResponse(file_handle, content_type=content_type)
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def _get_byte_range(request, etag, last_modified, size):
+    """Return the (start, end) of a requested range of bytes.
+
+    Return None if the whole file is to be served and 'unsatisfiable' if the
+    range is outside the file.
+
+    """
+    match = re.fullmatch(r'bytes=(\d*)-(\d*)',
+                         request.headers.get('Range', '').strip())
+    if not match or match.groups() == ('', ''):
+        return None
+
+    # Serve the whole file if it changed since the client got the first part
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag and \
+       if_range != http_date(last_modified):
+        return None
+
+    start, end = match.groups()
+    if not start:  # Last N bytes
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end or size - 1), size - 1)
+
+    if start > end:
+        return 'unsatisfiable'
+
+    return start, end
+
+
+def _read_file_range(file_handle, length):
+    """Generate chunks of a file up to a length and close it."""
+    with file_handle:
+        while length > 0:
+            data = file_handle.read(min(RANGE_CHUNK_SIZE, length))
+            if not data:
+                break
+
+            length -= len(data)
+            yield data
+
 
 def status_log(request):
-    """Serve the last 100 lines of plinth's status log"""
-    output = actions.superuser_run('help', ['get-logs'])
-    context = {'num_lines': 100, 'data': output}
+    """Serve the latest entries of plinth's or an app's status log."""
+    units, priority = _get_status_log_filters(request)
+    try:
+        entries = journal.get_entries(units, priority,
+                                      lines=STATUS_LOG_LINES)
+    except ActionError:
+        entries = []
+
+    apps = []
+    if is_user_admin(request, cached=True):
+        apps = [(app.app_id, app.info.name) for app in app_module.App.list()
+                if _get_app_units(app)]
+
+    context = {
+        'num_lines': STATUS_LOG_LINES,
+        'entries': [_format_entry(entry) for entry in entries],
+        'apps': sorted(apps, key=lambda app: str(app[1])),
+        'app_id': request.GET.get('app', ''),
+        'priority': priority,
+        'priorities': [(0, _('Emergency')), (1, _('Alert')),
+                       (2, _('Critical')), (3, _('Error')), (4, _('Warning')),
+                       (5, _('Notice')), (6, _('Info')), (7, _('Debug'))],
+    }
     return TemplateResponse(request, 'statuslog.html', context)
+
+
+def status_log_entries(request):
+    """Return status log entries before or after a cursor as JSON."""
+    units, priority = _get_status_log_filters(request)
+    try:
+        entries = journal.get_entries(units, priority,
+                                      before_cursor=request.GET.get('before'),
+                                      after_cursor=request.GET.get('after'),
+                                      lines=STATUS_LOG_LINES)
+    except ActionError:
+        return HttpResponseBadRequest()
+
+    return JsonResponse(
+        {'entries': [_format_entry(entry) for entry in entries]})
+
+
+def status_log_stream(request):
+    """Stream new status log entries as server-sent events."""
+    units, priority = _get_status_log_filters(request)
+    after_cursor = request.headers.get('Last-Event-ID') or \
+        request.GET.get('after')
+    try:
+        entries = journal.reader.follow()
+    except journal.TooManyFollowersError:
+        return HttpResponse(status=503)
+
+    response = StreamingHttpResponse(
+        _StatusLogStream(entries, units, priority, after_cursor),
+        content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+class _StatusLogStream:
+    """Server-sent events for new journal entries received in a queue.
+
+    The web server closes the response even if streaming never started, so
+    the journal is no longer followed when closed.
+
+    """
+
+    def __init__(self, entries, units, priority, after_cursor):
+        """Initialize the stream."""
+        self._entries = entries
+        self._events = _stream_status_log(entries, units, priority,
+                                          after_cursor)
+
+    def __iter__(self):
+        """Return the iterator over the events."""
+        return self._events
+
+    def close(self):
+        """Stop generating events and stop following the journal."""
+        self._events.close()
+        journal.reader.unfollow(self._entries)
+
+
+def _stream_status_log(entries, units, priority, after_cursor):
+    """Generate server-sent events for new journal entries.
+
+    Entries written since the given cursor are sent first so that nothing is
+    missed when the browser reconnects.
+
+    """
+    sent_cursors = set()
+    if after_cursor:
+        try:
+            missed_entries = journal.get_entries(units, priority,
+                                                 after_cursor=after_cursor)
+        except ActionError:
+            missed_entries = []  # Invalid cursor, only send new entries
+
+        for entry in missed_entries:
+            sent_cursors.add(entry['cursor'])
+            yield _get_status_log_event(entry)
+
+    end_time = time.monotonic() + STATUS_LOG_STREAM_DURATION
+    while time.monotonic() < end_time:
+        try:
+            entry = entries.get(timeout=STATUS_LOG_HEARTBEAT_INTERVAL)
+        except queue.Empty:
+            yield ': heartbeat\n\n'
+            continue
+
+        if entry is None:
+            break
+
+        if entry['cursor'] not in sent_cursors and \
+           journal.entry_matches(entry, units, priority):
+            yield _get_status_log_event(entry)
+
+
+def _get_status_log_event(entry):
+    """Return a server-sent event for a journal entry."""
+    data = json.dumps(_format_entry(entry))
+    return f'id: {entry["cursor"]}\ndata: {data}\n\n'
+
+
+def _get_status_log_filters(request):
+    """Return the units and priority to filter status log entries with.
+
+    Only administrators may see logs other than that of this web interface.
+
+    """
+    try:
+        priority = min(max(int(request.GET.get('priority', 7)), 0), 7)
+    except ValueError:
+        priority = 7
+
+    units = ['plinth']
+    app_id = request.GET.get('app')
+    if app_id and is_user_admin(request, cached=True):
+        try:
+            app = app_module.App.get(app_id)
+        except KeyError:
+            raise Http404
+
+        units = _get_app_units(app)
+
+    return units, priority
+
+
+def _get_app_units(app):
+    """Return the systemd units of an app."""
+    components = list(app.get_components_of_type(Daemon)) + \
+        list(app.get_components_of_type(RelatedDaemon))
+    return [component.unit for component in components]
+
+
+def _format_entry(entry):
+    """Return a journal entry with a printable time."""
+    time_string = datetime.datetime.fromtimestamp(
+        entry['timestamp']).strftime('%b %d %H:%M:%S')
+    return dict(entry, time=time_string)
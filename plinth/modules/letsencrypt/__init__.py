@@ -6,6 +6,8 @@ FreedomBox app for using Let's Encrypt.
 import json
 import logging
 import pathlib
+import threading
+import time
 
 from django.utils.translation import gettext_lazy as _
 
@@ -42,6 +44,17 @@ LIVE_DIRECTORY = '/etc/letsencrypt/live/'
 CERTIFICATE_CHECK_DELAY = 120
 logger = logging.getLogger(__name__)
 
+# Validity of certificates as checked by certbot, including revocation, by
+# domain. Checking requires network access and is slow, so it is done in the
+# background and the result is reused until the certificate file changes.
+_revocation_status = {}
+_revocation_check_lock = threading.Lock()
+
+# Seconds to wait before checking revocation again after a failed check. The
+# wait is doubled after each further failure up to the maximum.
+REVOCATION_RETRY_INTERVAL = 300
+REVOCATION_MAX_RETRY_INTERVAL = 24 * 3600
+
 
 class LetsEncryptApp(app_module.App):
     """FreedomBox app for Let's Encrypt."""
@@ -139,6 +152,7 @@ def certificate_revoke(domain, really_revoke=True):
     """
     if really_revoke:
         actions.superuser_run('letsencrypt', ['revoke', '--domain', domain])
+        _check_revocation_status(blocking=True)
 
     components.on_certificate_event('revoked', [domain], None)
 
@@ -191,6 +205,7 @@ def get_status():
     """Get the current settings."""
     status = actions.superuser_run('letsencrypt', ['get-status'])
     status = json.loads(status)
+    _apply_revocation_status(status['domains'])
 
     for domain in names.components.DomainName.list():
         if domain.domain_type.can_have_certificate:
@@ -199,6 +214,91 @@ def get_status():
     return status
 
 
+def _apply_revocation_status(domains):
+    """Update status of certificates with last known revocation status.
+
+    If the current certificate of a domain has not been checked yet, or the
+    last check failed and its retry time has passed, start checking in the
+    background.
+
+    """
+    needs_check = False
+    now = time.monotonic()
+    for domain, domain_status in domains.items():
+        known_status = _revocation_status.get(domain)
+        if not known_status or \
+           known_status['modified_time'] != domain_status['modified_time'] \
+           or known_status.get('retry_time', float('inf')) <= now:
+            needs_check = True
+        elif known_status['validity'] and \
+                domain_status['validity'] == 'valid':
+            domain_status['validity'] = known_status['validity']
+
+    if needs_check and not _revocation_check_lock.locked():
+        modified_times = {
+            domain: domain_status['modified_time']
+            for domain, domain_status in domains.items()
+        }
+        thread = threading.Thread(target=_check_revocation_status,
+                                  args=(modified_times, ), daemon=True)
+        thread.start()
+
+
+def _check_revocation_status(modified_times=None, blocking=False):
+    """Check and remember the revocation status of all certificates.
+
+    A result is recorded for each domain in modified_times, even if certbot
+    does not report on its certificate or the check fails, so that it is not
+    checked again until the certificate changes or a retry is due.
+
+    """
+    if not _revocation_check_lock.acquire(blocking=blocking):
+        return
+
+    try:
+        output = actions.superuser_run('letsencrypt',
+                                       ['get-revocation-status'])
+    except Exception as exception:
+        logger.warning('Unable to check revocation status of '
+                       'certificates: %s', exception)
+        _record_revocation_check_failure(modified_times or {})
+    else:
+        status = json.loads(output)
+        for domain, modified_time in (modified_times or {}).items():
+            if status.get(domain, {}).get('modified_time') != modified_time:
+                status[domain] = {
+                    'validity': None,
+                    'modified_time': modified_time
+                }
+
+        _revocation_status.clear()
+        _revocation_status.update(status)
+    finally:
+        _revocation_check_lock.release()
+
+
+def _record_revocation_check_failure(modified_times):
+    """Remember when to check certificates again after a failed check."""
+    now = time.monotonic()
+    for domain, modified_time in modified_times.items():
+        known_status = _revocation_status.get(domain, {})
+        failures = 1
+        if known_status.get('modified_time') == modified_time:
+            if 'failures' not in known_status:
+                continue  # Result of an earlier check is still current
+
+            failures += known_status['failures']
+
+        interval = min(REVOCATION_RETRY_INTERVAL * 2**(failures - 1),
+                       REVOCATION_MAX_RETRY_INTERVAL)
+        _revocation_status[domain] = {
+            'validity': None,
+            'modified_time': modified_time,
+            'failures': failures,
+            'retry_time': now + interval
+        }
+
+
 def _certificate_handle_modified(**kwargs):
     """Generate events for certificates that got modified during downtime.
 
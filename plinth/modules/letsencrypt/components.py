@@ -3,16 +3,22 @@
 App component for other apps to use handle Let's Encrypt certificates.
 """
 
+import concurrent.futures
 import json
 import logging
 import pathlib
 import threading
+import time
 
 from plinth import actions, app
 from plinth.modules.names.components import DomainName
 
 logger = logging.getLogger(__name__)
 
+# Certificate copies and daemon restarts collected by components while a
+# certificate event is being handled in the current thread.
+_distribution = threading.local()
+
 
 class LetsEncrypt(app.FollowerComponent):
     """Component to receive Let's Encrypt renewal hooks.
@@ -168,8 +174,7 @@ class LetsEncrypt(app.FollowerComponent):
                 else:
                     self._copy_self_signed_certificates([domain])
 
-        for daemon in self.daemons:
-            actions.superuser_run('service', ['try-restart', daemon])
+        self._restart_daemons()
 
     def get_status(self):
         """Return the status of certificates for all interested domains.
@@ -213,8 +218,7 @@ class LetsEncrypt(app.FollowerComponent):
         if self.should_copy_certificates:
             self._copy_letsencrypt_certificates(interested_domains, lineage)
 
-        for daemon in self.daemons:
-            actions.superuser_run('service', ['try-restart', daemon])
+        self._restart_daemons()
 
     def on_certificate_renewed(self, domains, lineage):
         """Handle event when a certificate is renewed.
@@ -247,8 +251,7 @@ class LetsEncrypt(app.FollowerComponent):
         if self.should_copy_certificates:
             self._copy_self_signed_certificates(interested_domains)
 
-        for daemon in self.daemons:
-            actions.superuser_run('service', ['try-restart', daemon])
+        self._restart_daemons()
 
     def on_certificate_deleted(self, domains, lineage):
         """Handle event when a certificate is deleted.
@@ -323,10 +326,43 @@ class LetsEncrypt(app.FollowerComponent):
                                    self.private_key_path,
                                    self.certificate_path)
 
+    def _restart_daemons(self):
+        """Restart the daemons if they are running.
+
+        If a certificate event is being handled, the restart is done later
+        along with other components'.
+
+        """
+        distribution = getattr(_distribution, 'current', None)
+        if distribution:
+            distribution.add_daemons(self.daemons)
+            return
+
+        for daemon in self.daemons:
+            actions.superuser_run('service', ['try-restart', daemon])
+
     def _copy_certificate(self, source_private_key_path,
                           source_certificate_path, private_key_path,
                           certificate_path):
-        """Copy certificate for a single domain."""
+        """Copy certificate for a single domain.
+
+        If a certificate event is being handled, the copy is done later along
+        with other components'.
+
+        """
+        distribution = getattr(_distribution, 'current', None)
+        if distribution:
+            distribution.add_copy({
+                'managing_app': self.managing_app,
+                'user_owner': self.user_owner,
+                'group_owner': self.group_owner,
+                'source_private_key_path': str(source_private_key_path),
+                'source_certificate_path': str(source_certificate_path),
+                'private_key_path': private_key_path,
+                'certificate_path': certificate_path
+            })
+            return
+
         actions.superuser_run('letsencrypt', [
             'copy-certificate', '--managing-app', self.managing_app,
             '--user-owner', self.user_owner, '--group-owner', self.group_owner,
@@ -352,6 +388,66 @@ class LetsEncrypt(app.FollowerComponent):
         return json.loads(output)['result']
 
 
+class CertificateDistribution:
+    """Copy certificates and restart daemons for all apps together.
+
+    While a distribution is active in a thread, LetsEncrypt components collect
+    the certificates to copy and daemons to restart into it instead of doing
+    it one after the other. All copies are then done with a single privileged
+    action and each daemon is restarted once, in parallel with others.
+
+    """
+
+    def __init__(self):
+        """Initialize the distribution."""
+        self.copies = []
+        self.daemons = {}  # Ordered set
+
+    def __enter__(self):
+        """Start collecting operations in the current thread."""
+        _distribution.current = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop collecting and perform the collected operations."""
+        _distribution.current = None
+        self.run()
+
+    def add_copy(self, copy):
+        """Add a certificate copy to be performed."""
+        if copy not in self.copies:
+            self.copies.append(copy)
+
+    def add_daemons(self, daemons):
+        """Add daemons to be restarted."""
+        self.daemons.update(dict.fromkeys(daemons))
+
+    def run(self):
+        """Copy all the certificates and then restart all the daemons."""
+        if self.copies:
+            try:
+                actions.superuser_run(
+                    'letsencrypt', ['copy-certificates'],
+                    input=json.dumps(self.copies).encode())
+            except Exception as exception:
+                logger.exception('Error copying certificates: %s', exception)
+
+        if not self.daemons:
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=len(self.daemons)) as executor:
+            executor.map(self._restart_daemon, self.daemons)
+
+    @staticmethod
+    def _restart_daemon(daemon):
+        """Restart a daemon if it is running."""
+        try:
+            actions.superuser_run('service', ['try-restart', daemon])
+        except Exception as exception:
+            logger.exception('Error restarting %s: %s', daemon, exception)
+
+
 def on_certificate_event(event, domains, lineage):
     """Start a new thread to handle a LE certificate event.
 
@@ -382,15 +478,25 @@ def on_certificate_event_sync(event, domains, lineage):
 
     assert event in ('obtained', 'renewed', 'revoked', 'deleted')
 
-    for component in LetsEncrypt.list():
-        logger.info('Handling certificate event for %s: %s, %s, %s',
-                    component.component_id, event, domains, lineage)
-        try:
-            getattr(component, 'on_certificate_' + event)(domains, lineage)
-        except Exception as exception:
-            logger.exception(
-                'Error executing certificate hook for %s: %s, %s, %s: %s',
-                component.component_id, event, domains, lineage, exception)
+    start_time = time.monotonic()
+    with CertificateDistribution() as distribution:
+        for component in LetsEncrypt.list():
+            logger.info('Handling certificate event for %s: %s, %s, %s',
+                        component.component_id, event, domains, lineage)
+            try:
+                getattr(component, 'on_certificate_' + event)(domains,
+                                                              lineage)
+            except Exception as exception:
+                logger.exception(
+                    'Error executing certificate hook for %s: %s, %s, %s: %s',
+                    component.component_id, event, domains, lineage,
+                    exception)
+
+    logger.info(
+        'Certificate event %s for %s handled in %.1f seconds: %d '
+        'certificates copied, %d daemons restarted', event, domains,
+        time.monotonic() - start_time, len(distribution.copies),
+        len(distribution.daemons))
 
     if event in ('obtained', 'renewed'):
         from plinth.modules import letsencrypt
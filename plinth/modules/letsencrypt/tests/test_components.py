@@ -8,7 +8,8 @@ from unittest.mock import call, patch
 
 import pytest
 
-from plinth.modules.letsencrypt.components import LetsEncrypt
+from plinth.modules.letsencrypt.components import (LetsEncrypt,
+                                                   on_certificate_event_sync)
 from plinth.modules.names.components import DomainName, DomainType
 
 
@@ -409,3 +410,40 @@ def test_on_certificate_deleted_without_copy(superuser_run, component):
                                      '/etc/letsencrypt/live/valid.example/')
     _assert_copy_certificate_called(component, superuser_run, {})
     _assert_restarted_daemons(component.daemons, superuser_run)
+
+
+def test_on_certificate_event_sync(superuser_run, component):
+    """Test that certificates are copied together for all components."""
+    LetsEncrypt('test-component-2', domains=['valid.example'],
+                daemons=['test-daemon', 'test-daemon-2'],
+                should_copy_certificates=True,
+                private_key_path='/etc/test-app-2/private.path',
+                certificate_path='/etc/test-app-2/certificate.path',
+                user_owner='test-user-2', group_owner='test-group-2',
+                managing_app='test-app-2')
+    with patch('plinth.modules.letsencrypt.'
+               'certificate_set_last_seen_modified_time'):
+        on_certificate_event_sync('renewed', ['valid.example'],
+                                  '/etc/letsencrypt/live/valid.example')
+
+    copy_calls = [
+        mock_call for mock_call in superuser_run.mock_calls
+        if mock_call[1][0] == 'letsencrypt'
+    ]
+    assert len(copy_calls) == 1
+    assert copy_calls[0][1][1] == ['copy-certificates']
+    copies = json.loads(copy_calls[0][2]['input'])
+    assert [copy['certificate_path'] for copy in copies] == [
+        '/etc/test-app/valid.example/certificate.path',
+        '/etc/test-app-2/certificate.path'
+    ]
+
+    restart_calls = [
+        mock_call for mock_call in superuser_run.mock_calls
+        if mock_call[1][0] == 'service'
+    ]
+    assert len(restart_calls) == 2
+    superuser_run.assert_has_calls([
+        call('service', ['try-restart', 'test-daemon']),
+        call('service', ['try-restart', 'test-daemon-2'])
+    ], any_order=True)
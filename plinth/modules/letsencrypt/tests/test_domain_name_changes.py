@@ -3,12 +3,15 @@
 Tests for letsencrypt module.
 """
 
+import json
 from unittest.mock import call, patch
 
 import pytest
 
+from plinth.errors import ActionError
 from plinth.modules.names.components import DomainType
 
+from ... import letsencrypt
 from .. import on_domain_added, on_domain_removed
 
 
@@ -73,3 +76,111 @@ def test_remove_domain(certificate_revoke, domain, revoke, result):
             [call(domain, really_revoke=False)])
     else:
         certificate_revoke.assert_not_called()
+
+
+@patch('threading.Thread')
+@patch('plinth.modules.names.components.DomainName.list')
+@patch('plinth.actions.superuser_run')
+def test_get_status_revocation(superuser_run, domain_name_list, thread):
+    """Test that known revocation status is used until certificate changes."""
+    domain_name_list.return_value = []
+    superuser_run.return_value = json.dumps({
+        'domains': {
+            'domain1.tld': {
+                'validity': 'valid',
+                'modified_time': 100
+            },
+            'domain2.tld': {
+                'validity': 'valid',
+                'modified_time': 200
+            }
+        }
+    })
+    letsencrypt._revocation_status.clear()
+    letsencrypt._revocation_status.update({
+        'domain1.tld': {
+            'validity': 'revoked',
+            'modified_time': 100
+        },
+        'domain2.tld': {
+            'validity': 'revoked',
+            'modified_time': 150
+        }
+    })
+
+    status = letsencrypt.get_status()
+    assert status['domains']['domain1.tld']['validity'] == 'revoked'
+    assert status['domains']['domain2.tld']['validity'] == 'valid'
+    thread.return_value.start.assert_called_once_with()
+
+
+@patch('plinth.actions.superuser_run')
+def test_check_revocation_status(superuser_run):
+    """Test that a result is recorded for every checked certificate."""
+    superuser_run.return_value = json.dumps({
+        'domain1.tld': {
+            'validity': 'revoked',
+            'modified_time': 100
+        }
+    })
+    letsencrypt._revocation_status.clear()
+    letsencrypt._check_revocation_status({
+        'domain1.tld': 100,
+        'domain2.tld': 200
+    })
+    assert letsencrypt._revocation_status == {
+        'domain1.tld': {
+            'validity': 'revoked',
+            'modified_time': 100
+        },
+        'domain2.tld': {
+            'validity': None,
+            'modified_time': 200
+        }
+    }
+
+    domains = {'domain2.tld': {'validity': 'valid', 'modified_time': 200}}
+    with patch('threading.Thread') as thread:
+        letsencrypt._apply_revocation_status(domains)
+        thread.assert_not_called()
+
+    assert domains['domain2.tld']['validity'] == 'valid'
+
+
+@patch('time.monotonic')
+@patch('plinth.actions.superuser_run')
+def test_check_revocation_status_failure(superuser_run, monotonic):
+    """Test that failed checks are retried with increasing intervals."""
+    superuser_run.side_effect = ActionError('letsencrypt', '', 'error')
+    monotonic.return_value = 1000
+    letsencrypt._revocation_status.clear()
+    letsencrypt._revocation_status['domain1.tld'] = {
+        'validity': 'valid',
+        'modified_time': 100
+    }
+    modified_times = {'domain1.tld': 100, 'domain2.tld': 200}
+    letsencrypt._check_revocation_status(modified_times)
+    assert letsencrypt._revocation_status['domain1.tld'] == {
+        'validity': 'valid',
+        'modified_time': 100
+    }
+    assert letsencrypt._revocation_status['domain2.tld'] == {
+        'validity': None,
+        'modified_time': 200,
+        'failures': 1,
+        'retry_time': 1300
+    }
+
+    domains = {'domain2.tld': {'validity': 'valid', 'modified_time': 200}}
+    with patch('threading.Thread') as thread:
+        monotonic.return_value = 1299
+        letsencrypt._apply_revocation_status(domains)
+        thread.assert_not_called()
+
+        monotonic.return_value = 1300
+        letsencrypt._apply_revocation_status(domains)
+        thread.assert_called_once()
+
+    letsencrypt._check_revocation_status(modified_times)
+    assert letsencrypt._revocation_status['domain2.tld']['failures'] == 2
+    assert letsencrypt._revocation_status['domain2.tld']['retry_time'] == 1900
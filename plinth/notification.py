@@ -4,12 +4,17 @@ Module to provide API for showing notifications.
 """
 
 import copy
+import datetime
 import logging
+import threading
+import time
 
 from django.core.exceptions import ValidationError
-from django.db.models import Q
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, QuerySet, Value, When
 from django.template.exceptions import TemplateDoesNotExist
 from django.template.response import SimpleTemplateResponse
+from django.utils import timezone
 from django.utils.translation import gettext
 
 from plinth import cfg
@@ -17,9 +22,38 @@ from plinth import cfg
 from . import models
 
 severities = {'exception': 5, 'error': 4, 'warning': 3, 'info': 2, 'debug': 1}
+
+# Dismissed notifications not updated for this long are deleted
+RETENTION_PERIOD = datetime.timedelta(days=30)
+
+# Coalesced updates to a notification are written at most this often
+UPDATE_INTERVAL = 2
+
+# Updates not yet written to the database, indexed by notification ID
+_pending_updates = {}
+_last_write_times = {}
+_pending_updates_lock = threading.Lock()
+
 logger = logging.getLogger(__name__)
 
 
+def _forget_updates(keys):
+    """Drop pending updates and write times of deleted notifications."""
+    with _pending_updates_lock:
+        for key in keys:
+            _pending_updates.pop(key, None)
+            _last_write_times.pop(key, None)
+
+
+class NotificationQuerySet(QuerySet):
+    """Query set that forgets pending updates of deleted notifications."""
+
+    def delete(self):
+        """Delete notifications so that pending updates don't recreate them."""
+        _forget_updates(list(self.values_list('id', flat=True)))
+        return super().delete()
+
+
 class Notification(models.StoredNotification):
     """API to create persistent global notifications to users.
 
@@ -157,6 +191,8 @@ class Notification(models.StoredNotification):
 
     """
 
+    objects = NotificationQuerySet.as_manager()
+
     class Meta:  # pylint: disable=too-few-public-methods
         """Meta properties of the Notification model."""
         proxy = True
@@ -229,17 +265,102 @@ class Notification(models.StoredNotification):
 
         """
         id = kwargs.pop('id')
+        now = time.monotonic()
+        with _pending_updates_lock:
+            kwargs = dict(_pending_updates.pop(id, {}), **kwargs)
+            # Write times only matter for UPDATE_INTERVAL
+            for key, write_time in list(_last_write_times.items()):
+                if write_time + UPDATE_INTERVAL <= now:
+                    del _last_write_times[key]
+
+            _last_write_times[id] = now
+
         return Notification.objects.update_or_create(defaults=kwargs, id=id)[0]
 
+    @staticmethod
+    def update_or_create_coalesced(**kwargs):
+        """Update a notification, coalescing frequent updates.
+
+        Same as update_or_create() but if the notification was written to the
+        database within the last UPDATE_INTERVAL seconds, the update is kept in
+        memory and written along with any further updates at the end of the
+        interval. get() and list() return the pending updates.
+
+        """
+        kwargs = dict(kwargs)
+        id = kwargs.pop('id')
+        with _pending_updates_lock:
+            if id in _pending_updates:
+                _pending_updates[id].update(kwargs)
+                return
+
+            last_write_time = _last_write_times.get(id, -UPDATE_INTERVAL)
+            wait_time = last_write_time + UPDATE_INTERVAL - time.monotonic()
+            if wait_time > 0:
+                _pending_updates[id] = kwargs
+                timer = threading.Timer(wait_time, Notification._flush_later,
+                                        [id])
+                timer.daemon = True
+                timer.start()
+                return
+
+        Notification.update_or_create(id=id, **kwargs)
+
+    @staticmethod
+    def flush(key=None):
+        """Write pending updates of a notification or all notifications."""
+        with _pending_updates_lock:
+            keys = [key] if key else list(_pending_updates)
+            updates = {
+                id: _pending_updates.pop(id)
+                for id in keys if id in _pending_updates
+            }
+
+        for id, kwargs in updates.items():
+            Notification.update_or_create(id=id, **kwargs)
+
+    @staticmethod
+    def _flush_later(key):
+        """Write pending updates from a timer thread."""
+        try:
+            Notification.flush(key)
+        except Exception as exception:
+            logger.exception('Error writing notification %s: %s', key,
+                             exception)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _get_pending_updates():
+        """Return a copy of the changes not yet written to the database."""
+        with _pending_updates_lock:
+            return {
+                key: dict(updates)
+                for key, updates in _pending_updates.items()
+            }
+
+    def _apply_pending_updates(self, pending_updates):
+        """Update fields with changes not yet written to the database."""
+        for field, value in pending_updates.get(self.id, {}).items():
+            setattr(self, field, value)
+
+    def delete(self, *args, **kwargs):
+        """Delete the notification and forget about any pending updates."""
+        _forget_updates([self.id])
+        return super().delete(*args, **kwargs)
+
     @staticmethod
     def get(key):  # pylint: disable=redefined-builtin
         """Return a notification object with a matching ID."""
         # pylint: disable=no-member
         try:
-            return Notification.objects.get(pk=key)
+            note = Notification.objects.get(pk=key)
         except Notification.DoesNotExist:
             raise KeyError('No such notification')
 
+        note._apply_pending_updates(Notification._get_pending_updates())
+        return note
+
     @staticmethod
     def list(key=None, app_id=None, user=None, dismissed=False):
         """Return a list of notifications for a user.
@@ -272,10 +393,51 @@ class Notification(models.StoredNotification):
             filters.append(Q(user__isnull=True) | Q(user=user.username))
             filters.append(Q(group__isnull=True) | Q(group__in=groups))
 
+        pending_updates = Notification._get_pending_updates()
         if dismissed is not None:
-            filters.append(Q(dismissed=dismissed))
+            # Pending updates may change whether a notification is dismissed
+            pending_dismissed = {
+                key: updates['dismissed']
+                for key, updates in pending_updates.items()
+                if 'dismissed' in updates
+            }
+            matching = [
+                key for key, value in pending_dismissed.items()
+                if value == dismissed
+            ]
+            filters.append((Q(dismissed=dismissed)
+                            & ~Q(id__in=pending_dismissed))
+                           | Q(id__in=matching))
+
+        # Most severe and most recently updated notifications first
+        severity_rank = Case(
+            *(When(severity=severity, then=Value(value))
+              for severity, value in severities.items()),
+            default=Value(severities['info']), output_field=IntegerField())
+        notes = list(
+            Notification.objects.filter(*filters).annotate(
+                severity_rank=severity_rank).order_by(
+                    '-severity_rank', '-last_update_time', 'id')[0:10])
+        for note in notes:
+            note._apply_pending_updates(pending_updates)
+
+        return notes
 
-        return Notification.objects.filter(*filters)[0:10]
+    @staticmethod
+    def delete_dismissed(retention_period=RETENTION_PERIOD):
+        """Delete dismissed notifications of operations no longer updated.
+
+        Only notifications showing the progress of operations are deleted.
+        Apps keep other dismissed notifications to remember that they have
+        been shown, for example for the current version after an upgrade.
+        Return the number of notifications deleted.
+
+        """
+        threshold = timezone.now() - retention_period
+        count, _ = Notification.objects.filter(
+            id__endswith='-operation', dismissed=True,
+            last_update_time__lt=threshold).delete()
+        return count
 
     @staticmethod
     def _translate(string, data=None):
@@ -157,11 +157,23 @@ class Operation:
             'exception': str(self.exception) if self.exception else None,
             'name': 'translate:' + str(self.name),
         }
-        Notification.update_or_create(
-            id=self.app_id + '-operation', app_id=self.app_id,
-            severity=severity, title=app.info.name, message=self.message,
-            body_template='operation-notification.html', data=data,
-            group='admin', dismissed=False)
+        kwargs = {
+            'id': self.app_id + '-operation',
+            'app_id': self.app_id,
+            'severity': severity,
+            'title': app.info.name,
+            'message': self.message,
+            'body_template': 'operation-notification.html',
+            'data': data,
+            'group': 'admin',
+            'dismissed': False
+        }
+        if self.state == Operation.State.COMPLETED or self.exception:
+            # Show completion and errors immediately
+            Notification.update_or_create(**kwargs)
+        else:
+            # Progress updates may be frequent, avoid writing each one
+            Notification.update_or_create_coalesced(**kwargs)
 
 
 class OperationsManager:
@@ -0,0 +1,165 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Measure the time taken by each phase of startup.
+
+Each phase of startup and the loading, initialization and post
+initialization of each app is measured. Results are shown in the diagnostics
+app and are logged when started with --profile-startup.
+"""
+
+import contextlib
+import cProfile
+import logging
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_records = []
+_records_lock = threading.Lock()
+
+_subprocess_count = 0
+_subprocess_count_lock = threading.Lock()
+_thread_data = threading.local()
+_audit_hook_added = False
+
+_profile = None
+
+
+def _audit_hook(event, args):
+    """Count subprocesses started, overall and by each thread."""
+    global _subprocess_count
+    if event == 'subprocess.Popen':
+        with _subprocess_count_lock:
+            _subprocess_count += 1
+
+        _thread_data.subprocess_count = getattr(_thread_data,
+                                                'subprocess_count', 0) + 1
+
+
+def count_subprocesses():
+    """Start counting subprocesses started during measurements.
+
+    An audit hook can't be removed once added and is called for every audited
+    event in the process. So, this is only done when profiling is requested.
+
+    """
+    global _audit_hook_added
+    with _subprocess_count_lock:
+        if not _audit_hook_added:
+            sys.addaudithook(_audit_hook)
+            _audit_hook_added = True
+
+
+@contextlib.contextmanager
+def measure(phase, app_id=None):
+    """Record wall time, CPU time and subprocesses started during a block.
+
+    A phase of startup is measured for the entire process. A step for a
+    particular app is measured only for the current thread so that apps
+    initialized in parallel are accounted for separately. Subprocesses are
+    recorded as None unless counting them has been started.
+
+    """
+    stop = start_measuring(phase, app_id)
+    try:
+        yield
+    finally:
+        stop()
+
+
+def start_measuring(phase, app_id=None):
+    """Start measuring and return a function to call when done.
+
+    Unlike measure(), a phase of startup may end in a different thread than
+    the one it started in.
+
+    """
+    counting_subprocesses = _audit_hook_added
+    if app_id:
+        get_cpu_time = time.thread_time
+
+        def get_subprocess_count():
+            return getattr(_thread_data, 'subprocess_count', 0)
+    else:
+        get_cpu_time = time.process_time
+
+        def get_subprocess_count():
+            return _subprocess_count
+
+    start_wall_time = time.monotonic()
+    start_cpu_time = get_cpu_time()
+    start_subprocess_count = get_subprocess_count()
+
+    def stop():
+        """Record the measurement."""
+        subprocesses = None
+        if counting_subprocesses:
+            subprocesses = get_subprocess_count() - start_subprocess_count
+
+        end_wall_time = time.monotonic()
+        record = {
+            'phase': phase,
+            'app_id': app_id,
+            'start_time': start_wall_time,
+            'end_time': end_wall_time,
+            'wall_time': end_wall_time - start_wall_time,
+            'cpu_time': get_cpu_time() - start_cpu_time,
+            'subprocesses': subprocesses,
+        }
+        with _records_lock:
+            _records.append(record)
+
+    return stop
+
+
+def get_results():
+    """Return the phases of startup and the app steps, slowest first."""
+    with _records_lock:
+        records = list(_records)
+
+    phases = [record for record in records if not record['app_id']]
+    apps = [record for record in records if record['app_id']]
+    apps.sort(key=lambda record: record['wall_time'], reverse=True)
+    # Phases may overlap, such as apps being post initialized in the
+    # background while the web server starts.
+    total_time = 0
+    if phases:
+        total_time = max(phase['end_time'] for phase in phases) - \
+            min(phase['start_time'] for phase in phases)
+
+    return {'phases': phases, 'apps': apps, 'total_time': total_time}
+
+
+def log_results(num_apps=10):
+    """Log the time taken by phases of startup and the slowest apps."""
+    results = get_results()
+    logger.info('Startup took %.2f seconds', results['total_time'])
+    for record in results['phases'] + results['apps'][:num_apps]:
+        name = record['phase']
+        if record['app_id']:
+            name += ' - ' + record['app_id']
+
+        logger.info('%s: %.3fs wall, %.3fs CPU, %s subprocesses', name,
+                    record['wall_time'], record['cpu_time'],
+                    record['subprocesses'])
+
+
+def start_profiling():
+    """Start collecting cProfile statistics for the current thread."""
+    global _profile
+    _profile = cProfile.Profile()
+    _profile.enable()
+
+
+def stop_profiling(file_path):
+    """Stop collecting cProfile statistics and write them to a file."""
+    global _profile
+    if not _profile:
+        return
+
+    _profile.disable()
+    _profile.dump_stats(file_path)
+    _profile = None
+    logger.info('Startup profile written to %s', file_path)
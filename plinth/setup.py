@@ -185,6 +185,8 @@ def run_setup_in_background():
 
 def _run_setup_on_startup():
     """Run setup with retry till it succeeds."""
+    # Apps that are not essential may still be running post initialization
+    app_module.wait_for_apps_post_init()
     sleep_time = 10
     while True:
         try:
@@ -32,6 +32,11 @@ def test_call_syntax_checks(getuid, get_module_import_path, import_module,
     with pytest.raises(SyntaxError, match='Invalid module name'):
         call('foo.bar', 'x-action', {})
 
+    # Module not enabled
+    get_module_import_path.return_value = None
+    with pytest.raises(SyntaxError, match='Specified module not found'):
+        call('test_module', 'x-action', {})
+
     # Module import test
     get_module_import_path.return_value = 'plinth.modules.test_module'
     import_module.side_effect = ModuleNotFoundError
@@ -4,12 +4,14 @@ Test module for App, base class for all applications.
 """
 
 import collections
+import threading
 from unittest.mock import Mock, call, patch
 
 import pytest
 
 from plinth.app import (App, Component, EnableState, FollowerComponent, Info,
-                        LeaderComponent, apps_init)
+                        LeaderComponent, apps_init, apps_post_init,
+                        wait_for_apps_post_init)
 
 # pylint: disable=protected-access
 
@@ -530,3 +532,45 @@ def test_apps_init_circular_depends(loaded_modules):
 
     apps_init()
     assert list(App._all_apps.keys()) == ['app3']
+
+
+@patch('plinth.profiler._records', new_callable=list)
+@patch('plinth.app.post_app_loading')
+@patch('plinth.module_loader.loaded_modules')
+def test_apps_post_init(loaded_modules, post_app_loading, records):
+    """Test that apps are post initialized after their dependencies."""
+    loaded_modules.items.return_value = [('test1', ModuleTest1()),
+                                         ('test2', ModuleTest2())]
+    apps_init()
+
+    app3_started = threading.Event()
+    finish_app3 = threading.Event()
+    post_initialized = []
+
+    def _post_init(app_id):
+        if app_id == 'app3':
+            app3_started.set()
+            finish_app3.wait(10)
+
+        post_initialized.append(app_id)
+
+    for app in App.list():
+        app.post_init = lambda app_id=app.app_id: _post_init(app_id)
+        app.needs_setup = Mock(return_value=True)
+
+    apps_post_init()
+    assert post_initialized == ['app2']
+    assert app3_started.wait(10)
+    assert not wait_for_apps_post_init(timeout=0)
+    post_app_loading.send_robust.assert_not_called()
+    assert not [record for record in records if not record['app_id']]
+
+    finish_app3.set()
+    assert wait_for_apps_post_init(timeout=10)
+    assert post_initialized == ['app2', 'app3', 'app1']
+    post_app_loading.send_robust.assert_called_once_with(sender='app')
+    phases = [record for record in records if not record['app_id']]
+    assert [phase['phase'] for phase in phases] == \
+        ['app.apps_post_init (all apps)']
+    assert phases[0]['end_time'] >= \
+        max(record['end_time'] for record in records)
@@ -121,3 +121,14 @@ def compare_configurations(parser):
         str(cfg.use_x_forwarded_host)
 
     assert parser.get('Misc', 'box_name') == cfg.box_name
+
+    assert parser.get('Database', 'sqlite_journal_mode') == \
+        cfg.sqlite_journal_mode
+    assert parser.get('Database', 'sqlite_synchronous') == \
+        cfg.sqlite_synchronous
+    assert int(parser.get('Database', 'sqlite_cache_size')) == \
+        cfg.sqlite_cache_size
+    assert int(parser.get('Database', 'sqlite_mmap_size')) == \
+        cfg.sqlite_mmap_size
+    assert int(parser.get('Database', 'sqlite_busy_timeout')) == \
+        cfg.sqlite_busy_timeout
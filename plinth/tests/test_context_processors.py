@@ -25,7 +25,7 @@ def test_common(Notification, load_cfg):
     request = HttpRequest()
     request.path = '/aaa/bbb/ccc/'
     request.user = Mock()
-    request.user.groups.filter().exists = Mock(return_value=True)
+    request.user.groups.values_list.return_value = ['admin']
     request.session = MagicMock()
     response = cp.common(request)
     assert response is not None
@@ -52,7 +52,7 @@ def test_common_border_conditions(Notification):
     request = HttpRequest()
     request.path = ''
     request.user = Mock()
-    request.user.groups.filter().exists = Mock(return_value=True)
+    request.user.groups.values_list.return_value = ['admin']
     request.session = MagicMock()
     response = cp.common(request)
     assert response['active_menu_urls'] == []
@@ -48,6 +48,9 @@ def build_menu(size=5):
 def fixture_empty_menus():
     """Remove all menu entries before starting a test."""
     Menu._all_menus = set()
+    Menu._children.clear()
+    Menu._sorted_children.clear()
+    Menu._url_tries.clear()
 
 
 def test_init(rf):
@@ -150,3 +153,37 @@ def test_active_item_when_inside_subpath():
     request.path = expected_url + 'd/e/f/'
     item = menu.active_item(request)
     assert expected_url == item.url
+
+
+def test_active_item_longest_match():
+    """Verify that the most specific menu item is active."""
+    menu = Menu('menu-index', url_name='index')
+    apps_menu = Menu('menu-apps', url_name='apps', parent_url_name='index')
+    assert menu.active_item(HttpRequest()) is None
+
+    request = HttpRequest()
+    request.path = '/apps/test/'
+    assert menu.active_item(request) == apps_menu
+
+    test_menu = Menu('menu-test', url_name='test',
+                     url_kwargs={'a': 1, 'b': 2, 'c': 3},
+                     parent_url_name='index')
+    request.path = '/test/1/2/3/d/'
+    assert menu.active_item(request) == test_menu
+    request.path = '/test/1/2/'
+    assert menu.active_item(request) is None
+
+
+def test_remove():
+    """Verify that a removed menu item is no longer a child."""
+    menu = build_menu()
+    item = menu.sorted_items()[0]
+    request = HttpRequest()
+    request.path = str(item.url)
+    assert menu.active_item(request) == item
+
+    item.remove()
+    assert item not in menu.items
+    assert item not in menu.sorted_items()
+    assert len(menu.sorted_items()) == 4
+    assert menu.active_item(request) is None
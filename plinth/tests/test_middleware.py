@@ -186,6 +186,19 @@ class TestSetupMiddleware:
         assert not messages_error.called
         operation_manager.collect_results.assert_not_called()
 
+    @staticmethod
+    @patch('django.urls.resolve')
+    def test_resolver_match_reused(resolve, app, middleware, kwargs):
+        """Test that URL resolution done by Django is reused."""
+        request = RequestFactory().get('/plinth/mockapp')
+        request.user = AnonymousUser()
+        request.resolver_match = Mock(namespaces=['mockapp'])
+        with pytest.raises(PermissionDenied):
+            middleware.process_view(request, **kwargs)
+
+        resolve.assert_not_called()
+        assert request.app == app
+
 
 class TestAdminMiddleware:
     """Test cases for admin middleware."""
@@ -208,7 +221,7 @@ class TestAdminMiddleware:
     def test_that_admin_view_is_denied_for_usual_user(web_request, middleware,
                                                       kwargs):
         """Test that normal user is denied for an admin view"""
-        web_request.user.groups.filter().exists = Mock(return_value=False)
+        web_request.user.groups.values_list.return_value = []
         web_request.session = MagicMock()
         with pytest.raises(PermissionDenied):
             middleware.process_view(web_request, **kwargs)
@@ -217,7 +230,7 @@ class TestAdminMiddleware:
     def test_group_view_is_denied_for_non_group_user(web_request, middleware,
                                                      kwargs):
         """Test that group view is allowed for an admin user."""
-        web_request.user.groups.filter().exists = Mock(return_value=False)
+        web_request.user.groups.values_list.return_value = []
         web_request.session = MagicMock()
         with patch(
                 'plinth.middleware.AdminRequiredMiddleware.check_user_group',
@@ -229,7 +242,7 @@ class TestAdminMiddleware:
     def test_group_view_is_allowed_for_group_user(web_request, middleware,
                                                   kwargs):
         """Test that group view is allowed for an admin user."""
-        web_request.user.groups.filter().exists = Mock(return_value=False)
+        web_request.user.groups.values_list.return_value = []
         web_request.session = MagicMock()
         with patch(
                 'plinth.middleware.AdminRequiredMiddleware.check_user_group',
@@ -241,7 +254,7 @@ class TestAdminMiddleware:
     def test_that_admin_view_is_allowed_for_admin_user(web_request, middleware,
                                                        kwargs):
         """Test that admin user is allowed for an admin view"""
-        web_request.user.groups.filter().exists = Mock(return_value=True)
+        web_request.user.groups.values_list.return_value = ['admin']
         web_request.session = MagicMock()
         response = middleware.process_view(web_request, **kwargs)
         assert response is None
@@ -13,3 +13,36 @@ def test_get_module_import_path():
     """Returning the module import path."""
     import_path = module_loader.get_module_import_path('apache')
     assert import_path == 'plinth.modules.apache'
+
+
+def test_get_module_import_path_not_enabled(tmp_path):
+    """Test that a module without an enabled file has no import path."""
+    with patch('plinth.cfg.config_dir', str(tmp_path)):
+        assert module_loader.get_module_import_path('test1') is None
+
+
+@patch('plinth.cfg.develop', False)
+@patch('plinth.urls.urlpatterns', new_callable=list)
+def test_include_urls_lazily(urlpatterns):
+    """Test that URL modules are included without importing them."""
+    with patch('plinth.module_loader._modules_to_load',
+               new=['plinth.modules.help', 'plinth.tests']):
+        module_loader.include_urls()
+
+    assert len(urlpatterns) == 1
+    assert urlpatterns[0].urlconf_name == 'plinth.modules.help.urls'
+    assert urlpatterns[0].namespace == 'help'
+    assert urlpatterns[0].app_name == 'help'
+
+
+@patch('plinth.cfg.develop', False)
+@patch('plinth.urls.urlpatterns', new_callable=list)
+def test_include_urls_import_error(urlpatterns):
+    """Test that URL modules failing to import provide no URLs."""
+    with patch('plinth.module_loader._modules_to_load',
+               new=['plinth.modules.help']):
+        module_loader.include_urls()
+
+    with patch('django.urls.resolvers.import_module',
+               side_effect=ImportError('test')):
+        assert urlpatterns[0].url_patterns == []
@@ -4,12 +4,15 @@ Test module for Notification, API to show notificatoins.
 """
 
 import datetime
+import time
 from unittest.mock import patch
 
 import pytest
 from django.contrib.auth.models import Group, User
 from django.core.exceptions import ValidationError
 
+from plinth import notification
+from plinth.modules.upgrades import UpgradesApp
 from plinth.notification import Notification
 
 pytestmark = pytest.mark.django_db
@@ -281,6 +284,141 @@ def test_list_filter_dismissed(note):
     assert list(Notification.list(dismissed=None)) == [note]
 
 
+def test_list_order(note):
+    """Test that notifications are listed by severity and update time."""
+    error_note = Notification.update_or_create(id='test-error',
+                                               app_id='test-app',
+                                               severity='error', title='Error')
+    later_note = Notification.update_or_create(id='test-later',
+                                               app_id='test-app',
+                                               severity='info', title='Later')
+    assert list(Notification.list()) == [error_note, later_note, note]
+
+
+def test_delete_dismissed(note):
+    """Test that old dismissed operation notifications are deleted."""
+    operation_note = Notification.update_or_create(
+        id='test-app-operation', app_id='test-app', severity='info',
+        title='Operation')
+    other_note = Notification.update_or_create(id='test-other-operation',
+                                               app_id='test-app',
+                                               severity='info', title='Other')
+    assert Notification.delete_dismissed(datetime.timedelta()) == 0
+
+    note.dismiss()
+    operation_note.dismiss()
+    other_note.dismiss()
+    assert Notification.delete_dismissed() == 0
+    assert Notification.delete_dismissed(datetime.timedelta()) == 2
+    assert list(Notification.list(dismissed=None)) == [note]
+
+
+def test_delete_dismissed_new_release():
+    """Test that the dismissed notification for a release is retained."""
+    Notification.objects.all().delete()
+    with patch('plinth.__version__', '1.0'):
+        UpgradesApp._show_new_release_notification(None)
+
+    assert Notification.get('upgrades-new-release').dismissed
+    assert Notification.delete_dismissed(datetime.timedelta()) == 0
+
+    with patch('plinth.__version__', '2.0'):
+        UpgradesApp._show_new_release_notification(None)
+
+    note = Notification.get('upgrades-new-release')
+    assert not note.dismissed
+    assert note.data['version'] == '2.0'
+
+
+@patch('plinth.notification.threading.Timer')
+def test_update_or_create_coalesced(timer, note):
+    """Test that frequent updates are coalesced."""
+    with patch.dict('plinth.notification._last_write_times', clear=True), \
+            patch.dict('plinth.notification._pending_updates', clear=True):
+        Notification.update_or_create_coalesced(id='test-notification',
+                                                message='message1')
+        timer.assert_not_called()
+        assert Notification.objects.get(pk=note.id).message == 'message1'
+
+        Notification.update_or_create_coalesced(id='test-notification',
+                                                message='message2')
+        Notification.update_or_create_coalesced(id='test-notification',
+                                                title='title3')
+        timer.assert_called_once()
+        stored_note = Notification.objects.get(pk=note.id)
+        assert stored_note.message == 'message1'
+        assert stored_note.title == 'Test Title'
+        assert Notification.get(note.id).message == 'message2'
+        assert Notification.list()[0].title == 'title3'
+
+        Notification.flush()
+        stored_note = Notification.objects.get(pk=note.id)
+        assert stored_note.message == 'message2'
+        assert stored_note.title == 'title3'
+
+        # Timer firing after the updates are written has no effect
+        Notification.update_or_create_coalesced(id='test-notification',
+                                                message='message4')
+        Notification.update_or_create(id='test-notification',
+                                      message='message5')
+        Notification.flush('test-notification')
+        assert Notification.get(note.id).message == 'message5'
+
+
+@patch('plinth.notification.threading.Timer')
+def test_coalesced_delete(timer, note):
+    """Test that deleted notifications are not recreated by pending updates."""
+    with patch.dict('plinth.notification._last_write_times', clear=True), \
+            patch.dict('plinth.notification._pending_updates', clear=True):
+        for delete in (lambda: note.delete(),
+                       lambda: Notification.objects.all().delete()):
+            Notification.update_or_create(id='test-notification',
+                                          title='Test Title')
+            Notification.update_or_create_coalesced(id='test-notification',
+                                                    message='message1')
+            delete()
+            assert notification._pending_updates == {}
+            assert notification._last_write_times == {}
+
+            Notification.flush()
+            with pytest.raises(KeyError):
+                Notification.get('test-notification')
+
+
+def test_last_write_times_pruned(note):
+    """Test that old write times are forgotten."""
+    with patch.dict('plinth.notification._last_write_times', clear=True):
+        Notification.update_or_create(id='test-notification', message='1')
+        with patch('time.monotonic',
+                   return_value=time.monotonic() +
+                   notification.UPDATE_INTERVAL):
+            Notification.update_or_create(id='test-other', app_id='test-app',
+                                          severity='info', title='Other')
+
+        assert list(notification._last_write_times) == ['test-other']
+
+
+@patch('plinth.notification.threading.Timer')
+def test_list_dismissed_pending(timer, note):
+    """Test that filtering on dismissed uses pending updates."""
+    note.dismiss()
+    with patch.dict('plinth.notification._last_write_times', clear=True), \
+            patch.dict('plinth.notification._pending_updates', clear=True):
+        Notification.update_or_create_coalesced(id='test-notification',
+                                                message='message1')
+        Notification.update_or_create_coalesced(id='test-notification',
+                                                dismissed=False)
+        assert Notification.list(dismissed=True) == []
+        notes = Notification.list(dismissed=False)
+        assert notes == [note]
+        assert not notes[0].dismissed
+
+        Notification.update_or_create_coalesced(id='test-notification',
+                                                dismissed=True)
+        assert Notification.list(dismissed=False) == []
+        assert Notification.list(dismissed=True) == [note]
+
+
 def test_list_filter_user(note, user):
     """Test that list filter with user works."""
     # Invalid user set on notification
@@ -231,6 +231,29 @@ def test_update_notification(app_get):
     assert note.severity == 'error'
 
 
+@patch('plinth.notification.threading.Timer')
+@patch('plinth.app.App.get')
+@pytest.mark.django_db
+def test_update_notification_coalesced(app_get, timer):
+    """Test that progress updates to notification are coalesced."""
+    app_get.return_value = TestApp()
+    with patch.dict('plinth.notification._last_write_times', clear=True), \
+            patch.dict('plinth.notification._pending_updates', clear=True):
+        operation = Operation('testapp', 'op1', Mock(),
+                              show_notification=True)
+        operation.on_update('message1')
+        timer.assert_called_once()
+        note = Notification.objects.get(pk='testapp-operation')
+        assert note.message == 'Waiting to start: {name}'
+        assert Notification.get('testapp-operation').message == 'message1'
+
+        operation.state = Operation.State.COMPLETED
+        operation.on_update('message2')
+        note = Notification.objects.get(pk='testapp-operation')
+        assert note.message == 'message2'
+        assert note.data['state'] == 'completed'
+
+
 def test_manager_global_instance():
     """Test that single global instance of operation's manager is available."""
     assert isinstance(operation_module.manager, OperationsManager)
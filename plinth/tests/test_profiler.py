@@ -0,0 +1,107 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Test module for startup profiler.
+"""
+
+import subprocess
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from plinth import profiler
+
+
+@pytest.fixture(autouse=True)
+def fixture_empty_records():
+    """Start each test without any measurements."""
+    with patch('plinth.profiler._records', []):
+        yield
+
+
+@pytest.fixture(name='count_subprocesses')
+def fixture_count_subprocesses():
+    """Count subprocesses started during measurements."""
+    profiler.count_subprocesses()
+
+
+@pytest.mark.usefixtures('count_subprocesses')
+def test_measure_phase():
+    """Test measuring a phase of startup."""
+    with profiler.measure('test-phase'):
+        subprocess.run(['true'], check=True)
+
+    results = profiler.get_results()
+    assert results['apps'] == []
+    assert len(results['phases']) == 1
+    record = results['phases'][0]
+    assert record['phase'] == 'test-phase'
+    assert record['app_id'] is None
+    assert record['wall_time'] > 0
+    assert record['cpu_time'] >= 0
+    assert record['subprocesses'] == 1
+    assert results['total_time'] == record['wall_time']
+
+
+@pytest.mark.usefixtures('count_subprocesses')
+def test_measure_apps():
+    """Test that app steps only count subprocesses of their thread."""
+
+    def _run_in_thread():
+        with profiler.measure('test-phase', 'other-app'):
+            subprocess.run(['true'], check=True)
+            subprocess.run(['true'], check=True)
+
+    with profiler.measure('test-phase', 'test-app'):
+        thread = threading.Thread(target=_run_in_thread)
+        thread.start()
+        thread.join()
+
+    results = profiler.get_results()
+    assert results['phases'] == []
+    assert [record['app_id'] for record in results['apps']] == \
+        ['test-app', 'other-app']
+    assert results['apps'][0]['subprocesses'] == 0
+    assert results['apps'][1]['subprocesses'] == 2
+
+
+def test_measure_without_counting_subprocesses():
+    """Test that subprocesses are not counted unless requested."""
+    with patch('plinth.profiler._audit_hook_added', False):
+        with profiler.measure('test-phase'):
+            subprocess.run(['true'], check=True)
+
+    assert profiler.get_results()['phases'][0]['subprocesses'] is None
+
+
+def test_start_measuring():
+    """Test measuring a phase that ends in another thread."""
+    with profiler.measure('test-phase1'):
+        stop = profiler.start_measuring('test-phase2')
+
+    thread = threading.Thread(target=stop)
+    thread.start()
+    thread.join()
+
+    results = profiler.get_results()
+    assert [record['phase'] for record in results['phases']] == \
+        ['test-phase1', 'test-phase2']
+    phase1, phase2 = results['phases']
+    assert results['total_time'] == phase2['end_time'] - phase1['start_time']
+
+
+def test_measure_exception():
+    """Test that a block raising an exception is measured."""
+    with pytest.raises(RuntimeError):
+        with profiler.measure('test-phase'):
+            raise RuntimeError()
+
+    assert len(profiler.get_results()['phases']) == 1
+
+
+def test_profiling(tmp_path):
+    """Test writing cProfile statistics."""
+    output_file = tmp_path / 'startup.prof'
+    profiler.start_profiling()
+    profiler.stop_profiling(str(output_file))
+    assert output_file.exists()
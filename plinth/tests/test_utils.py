@@ -11,7 +11,8 @@ import ruamel.yaml
 from django.test.client import RequestFactory
 from ruamel.yaml.compat import StringIO
 
-from plinth.utils import YAMLFile, is_user_admin, is_valid_user_name
+from plinth.utils import (YAMLFile, get_user_groups, is_user_admin,
+                          is_valid_user_name)
 
 
 def test_is_valid_user_name():
@@ -51,9 +52,10 @@ class TestIsAdminUser:
     @staticmethod
     def test_values_for_authenticated_users(web_request):
         """Test correct return values for authenticated users."""
-        web_request.user.groups.filter().exists = Mock(return_value=False)
+        web_request.user.groups.values_list.return_value = []
         assert not is_user_admin(web_request)
-        web_request.user.groups.filter().exists = Mock(return_value=True)
+        web_request.user = Mock()
+        web_request.user.groups.values_list.return_value = ['admin']
         assert is_user_admin(web_request)
 
     @staticmethod
@@ -64,26 +66,49 @@ class TestIsAdminUser:
         session_mock.__setitem__.side_effect = session_dict.__setitem__
         session_mock.__getitem__.side_effect = session_dict.__getitem__
         session_mock.__contains__.side_effect = session_dict.__contains__
+        session_mock.get.side_effect = session_dict.get
         web_request.session = session_mock
 
-        mock = Mock(return_value=False)
-        web_request.user.groups.filter().exists = mock
+        values_list = web_request.user.groups.values_list
+        values_list.return_value = ['users']
         assert not is_user_admin(web_request)
-        mock.assert_called_once_with()
+        values_list.assert_called_once_with('name', flat=True)
         session_mock.__setitem__.assert_called_once_with(
             'cache_user_is_admin', False)
 
-        mock = Mock(return_value=False)
-        web_request.user.groups.filter().exists = mock
+        values_list.reset_mock()
         assert not is_user_admin(web_request, cached=True)
-        mock.assert_not_called()
+        values_list.assert_not_called()
         session_mock.__getitem__.assert_called_once_with('cache_user_is_admin')
 
-        mock = Mock(return_value=False)
-        web_request.user.groups.filter().exists = mock
+        # Groups are retrieved only once per request and the session is not
+        # modified when the value did not change.
         assert not is_user_admin(web_request, cached=False)
-        mock.assert_called_once_with()
-        session_mock.__getitem__.assert_called_once_with('cache_user_is_admin')
+        values_list.assert_not_called()
+        session_mock.__setitem__.assert_called_once()
+
+        # Groups are retrieved again for a different user
+        web_request.user = Mock()
+        web_request.user.groups.values_list.return_value = ['admin']
+        assert is_user_admin(web_request, cached=False)
+        web_request.user.groups.values_list.assert_called_once_with(
+            'name', flat=True)
+        assert session_dict['cache_user_is_admin']
+
+
+def test_get_user_groups():
+    """Test retrieving the groups of a user."""
+    web_request = RequestFactory().get('/plinth/mockapp')
+    web_request.user = Mock()
+    web_request.user.is_authenticated = False
+    assert get_user_groups(web_request) == frozenset()
+
+    web_request.user = Mock()
+    values_list = web_request.user.groups.values_list
+    values_list.return_value = ['admin', 'users']
+    assert get_user_groups(web_request) == {'admin', 'users'}
+    assert get_user_groups(web_request) == {'admin', 'users'}
+    values_list.assert_called_once_with('name', flat=True)
 
 
 class TestYAMLFileUtil:
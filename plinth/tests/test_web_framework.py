@@ -0,0 +1,61 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for Django web framework setup.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+
+from plinth import cfg, kvstore, web_framework
+
+pytestmark = pytest.mark.django_db
+
+
+def test_schema_fingerprint():
+    """Test that schema fingerprint changes with applied migrations."""
+    fingerprint = web_framework._get_schema_fingerprint()
+    assert fingerprint
+    assert web_framework._get_schema_fingerprint() == fingerprint
+
+    with patch('django.db.migrations.recorder.MigrationRecorder.'
+               'applied_migrations') as applied_migrations:
+        applied_migrations.return_value = {}
+        assert web_framework._get_schema_fingerprint() != fingerprint
+
+
+@patch('django.core.management.call_command')
+def test_migrate(call_command):
+    """Test that migrations are only run if schema changed."""
+    web_framework._migrate()
+    call_command.assert_called_once()
+    assert kvstore.get(web_framework.SCHEMA_FINGERPRINT_KEY) == \
+        web_framework._get_schema_fingerprint()
+
+    call_command.reset_mock()
+    web_framework._migrate()
+    call_command.assert_not_called()
+
+    kvstore.set(web_framework.SCHEMA_FINGERPRINT_KEY, 'outdated')
+    web_framework._migrate()
+    call_command.assert_called_once()
+
+
+@pytest.mark.django_db(transaction=True)
+@patch('plinth.cfg.sqlite_synchronous', 'full')
+@patch('plinth.cfg.sqlite_journal_mode', 'invalid')
+@patch('plinth.cfg.sqlite_cache_size', -4000)
+def test_tune_sqlite_connection():
+    """Test that SQLite connections are tuned as configured."""
+    assert web_framework._get_sqlite_pragmas() == [
+        'PRAGMA synchronous=FULL', 'PRAGMA cache_size=-4000',
+        f'PRAGMA mmap_size={cfg.sqlite_mmap_size}'
+    ]
+
+    web_framework._tune_sqlite_connection(None, connection)
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous')
+        assert cursor.fetchone()[0] == 2
+        cursor.execute('PRAGMA cache_size')
+        assert cursor.fetchone()[0] == -4000
@@ -13,6 +13,7 @@ from distutils.version import LooseVersion
 
 import markupsafe
 import ruamel.yaml
+from django import urls
 from django.utils.functional import lazy
 
 Version = LooseVersion  # Abstraction over distutils.version.LooseVersion
@@ -76,6 +77,24 @@ def is_valid_user_name(user_name):
     return True
 
 
+def get_user_groups(request):
+    """Return the names of groups of the user, querying once per request.
+
+    The result is remembered along with the user it was retrieved for as the
+    user may change during the request, for example, when logging in.
+    """
+    if not request.user.is_authenticated:
+        return frozenset()
+
+    cached = getattr(request, 'user_groups_cache', None)
+    if cached and cached[0] is request.user:
+        return cached[1]
+
+    groups = frozenset(request.user.groups.values_list('name', flat=True))
+    request.user_groups_cache = (request.user, groups)
+    return groups
+
+
 def is_user_admin(request, cached=False):
     """Return whether user is an administrator."""
     if not request.user.is_authenticated:
@@ -84,8 +103,11 @@ def is_user_admin(request, cached=False):
     if 'cache_user_is_admin' in request.session and cached:
         return request.session['cache_user_is_admin']
 
-    user_is_admin = request.user.groups.filter(name='admin').exists()
-    request.session['cache_user_is_admin'] = user_is_admin
+    user_is_admin = 'admin' in get_user_groups(request)
+    if request.session.get('cache_user_is_admin') != user_is_admin:
+        # Avoid saving the session when nothing changed
+        request.session['cache_user_is_admin'] = user_is_admin
+
     return user_is_admin
 
 
@@ -123,6 +145,23 @@ class YAMLFile:
         return os.stat(self.yaml_file).st_size == 0
 
 
+_reversed_urls = {}
+
+
+def reverse_cached(viewname):
+    """Return the URL of a view that takes no arguments, reversing only once.
+
+    The script prefix is part of the cache key as it is prepended to the URL.
+    """
+    key = (viewname, urls.get_script_prefix())
+    url = _reversed_urls.get(key)
+    if url is None:
+        url = urls.reverse(viewname)
+        _reversed_urls[key] = url
+
+    return url
+
+
 def random_string(size=8):
     """Generate a random alphanumeric string."""
     chars = (random.SystemRandom().choice(string.ascii_letters)
@@ -3,22 +3,38 @@
 Setup Django web framework.
 """
 
+import hashlib
+import importlib.util
 import logging
 import os
 import pathlib
 import random
 import stat
+import time
 
+import django
 import django.conf
 import django.core.management
 import django.core.wsgi
+from django.apps import apps
 from django.conf import global_settings
 from django.contrib.messages import constants as message_constants
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
 
-from . import cfg, glib, log, module_loader, settings
+from . import cfg, glib, kvstore, log, module_loader, settings
 
 logger = logging.getLogger(__name__)
 
+SCHEMA_FINGERPRINT_KEY = 'database_schema_fingerprint'
+
+SQLITE_JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL',
+                        'OFF')
+
+SQLITE_SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
 
 def init():
     """Setup Django configuration in the absence of .settings file"""
@@ -34,6 +50,8 @@ def init():
         settings.IPWARE_META_PRECEDENCE_ORDER = ('HTTP_X_FORWARDED_FOR', )
 
     settings.DATABASES['default']['NAME'] = cfg.store_file
+    settings.DATABASES['default']['OPTIONS']['timeout'] = \
+        cfg.sqlite_busy_timeout
     settings.DEBUG = cfg.develop
     settings.FORCE_SCRIPT_NAME = cfg.server_dir
     settings.INSTALLED_APPS += module_loader.get_modules_to_load()
@@ -51,6 +69,7 @@ def init():
         if setting.isupper():
             kwargs[setting] = getattr(settings, setting)
 
+    connection_created.connect(_tune_sqlite_connection)
     django.conf.settings.configure(**kwargs)
     django.setup(set_prefix=True)
 
@@ -60,14 +79,117 @@ def init():
 
 def post_init():
     """Perform operations after completing init of other modules."""
-    logger.debug('Creating or adding new tables to data file')
-    django.core.management.call_command('migrate', '--fake-initial',
-                                        interactive=False, verbosity=0)
+    _migrate()
     os.chmod(cfg.store_file, stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP)
 
     # Cleanup expired sessions every day
     glib.schedule(24 * 3600, _cleanup_expired_sessions, in_thread=True)
 
+    # Delete old dismissed notifications every day
+    glib.schedule(24 * 3600, _cleanup_dismissed_notifications, in_thread=True)
+
+    # Checkpoint and optimize the database every 6 hours
+    glib.schedule(6 * 3600, _optimize_database, in_thread=True)
+
+
+def _get_sqlite_pragmas():
+    """Return the PRAGMA statements to tune connections as configured."""
+    pragmas = []
+    journal_mode = cfg.sqlite_journal_mode.upper()
+    if journal_mode in SQLITE_JOURNAL_MODES:
+        pragmas.append(f'PRAGMA journal_mode={journal_mode}')
+    else:
+        logger.warning('Ignoring invalid SQLite journal mode: %s',
+                       cfg.sqlite_journal_mode)
+
+    synchronous = cfg.sqlite_synchronous.upper()
+    if synchronous in SQLITE_SYNCHRONOUS_LEVELS:
+        pragmas.append(f'PRAGMA synchronous={synchronous}')
+    else:
+        logger.warning('Ignoring invalid SQLite synchronous level: %s',
+                       cfg.sqlite_synchronous)
+
+    pragmas.append(f'PRAGMA cache_size={int(cfg.sqlite_cache_size)}')
+    pragmas.append(f'PRAGMA mmap_size={int(cfg.sqlite_mmap_size)}')
+    return pragmas
+
+
+def _tune_sqlite_connection(sender, connection, **kwargs):
+    """Apply configured SQLite settings to a new database connection."""
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        for pragma in _get_sqlite_pragmas():
+            cursor.execute(pragma)
+
+
+def _optimize_database(data):
+    """Checkpoint the write-ahead log and optimize the database."""
+    with connection.cursor() as cursor:
+        if cfg.sqlite_journal_mode.upper() == 'WAL':
+            cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+        cursor.execute('PRAGMA optimize')
+
+    connection.close()
+
+
+def _migrate():
+    """Create or add new tables to data file if schema is not current.
+
+    Loading all the migrations takes a while, so it is skipped if neither the
+    migration files nor the set of applied migrations changed since the last
+    run.
+
+    """
+    fingerprint = _get_schema_fingerprint()
+    if fingerprint and \
+       fingerprint == kvstore.get_default(SCHEMA_FINGERPRINT_KEY, None):
+        logger.debug('Database schema is current')
+        return
+
+    logger.debug('Creating or adding new tables to data file')
+    start_time = time.monotonic()
+    django.core.management.call_command('migrate', '--fake-initial',
+                                        interactive=False, verbosity=0)
+    logger.info('Applied database migrations in %.2f seconds',
+                time.monotonic() - start_time)
+    kvstore.set(SCHEMA_FINGERPRINT_KEY, _get_schema_fingerprint())
+
+
+def _get_schema_fingerprint():
+    """Return a hash of all migration files and the applied migrations.
+
+    Return None if migrations were never applied to the database.
+
+    """
+    recorder = MigrationRecorder(connection)
+    if not recorder.has_table():
+        return None
+
+    digest = hashlib.sha256(django.get_version().encode())
+    for app_config in sorted(apps.get_app_configs(),
+                             key=lambda app_config: app_config.label):
+        module_name, _ = MigrationLoader.migrations_module(app_config.label)
+        try:
+            spec = importlib.util.find_spec(module_name)
+        except ImportError:
+            spec = None
+
+        if not spec or not spec.submodule_search_locations:
+            continue
+
+        for directory in spec.submodule_search_locations:
+            for path in sorted(pathlib.Path(directory).glob('*.py')):
+                digest.update(f'{app_config.label}/{path.name}'.encode())
+                digest.update(path.read_bytes())
+
+    for app_label, name in sorted(recorder.applied_migrations()):
+        digest.update(f'applied:{app_label}/{name}'.encode())
+
+    return digest.hexdigest()
+
 
 def _get_secret_key():
     """Retrieve or create a new Django secret key."""
@@ -121,6 +243,14 @@ def _cleanup_expired_sessions(data):
     django.core.management.call_command('clearsessions', verbosity=verbosity)
 
 
+def _cleanup_dismissed_notifications(data):
+    """Delete dismissed notifications of operations no longer being updated."""
+    from plinth.notification import Notification
+    count = Notification.delete_dismissed()
+    if count:
+        logger.info('Deleted %d old dismissed operation notifications', count)
+
+
 def get_wsgi_application():
     """Return Django wsgi application."""
     return django.core.wsgi.get_wsgi_application()